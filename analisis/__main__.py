@@ -0,0 +1,8 @@
+"""
+Punto de entrada de linea de comandos: python -m analisis
+"""
+import sys
+
+from analisis.batch import main
+
+sys.exit(main())
@@ -1,6 +1,7 @@
 """
 Clasificador de riesgo basado en score ponderado
 """
+from analisis.models import severity_counts
 
 SEVERITY_SCORES = {
     "HIGH": 10,
@@ -14,7 +15,7 @@ THRESHOLD_ALTO = 30
 THRESHOLD_MEDIO = 15
 
 
-def classify_risk(vulnerabilities):
+def classify_risk(vulnerabilities, counts=None):
     """
     Clasifica el nivel de riesgo basado en score ponderado:
     - ALTA = 10 puntos
@@ -25,13 +26,19 @@ def classify_risk(vulnerabilities):
     - ALTO: >= 30 puntos
     - MEDIO: >= 15 puntos
     - BAJO: < 15 puntos
+
+    Con counts (recuentos por severidad ya calculados) no se vuelve a
+    recorrer la lista.
     """
     if not vulnerabilities:
         return "BAJO"
 
+    if counts is None:
+        counts = severity_counts(vulnerabilities)
+
     total_score = sum(
-        SEVERITY_SCORES.get(v.get("severity", "MEDIUM"), 5)
-        for v in vulnerabilities
+        SEVERITY_SCORES.get(severity, 5) * count
+        for severity, count in counts.items()
     )
 
     if total_score >= THRESHOLD_ALTO:
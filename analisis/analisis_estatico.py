@@ -3,7 +3,53 @@ Analisis estatico real de APKs usando androguard
 """
 import re
 import os
+import heapq
+import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
 from androguard.core.apk import APK
+from analisis.archive import MappedArchive
+from analisis.budget import Budget
+from analisis.dex import DexFormatError, iter_dex_strings
+from analisis.incremental import EntryResults
+from analisis.manifest import ManifestView, build_component_index
+from analisis.native import iter_library_strings
+from analisis.resources import parse_resource_id, resolve_string
+from analisis.rules import (
+    INPUT_DEX_STRINGS, INPUT_MANIFEST, INPUT_NATIVE_LIBS, INPUT_TEXT_RESOURCES,
+    RuleInputError, RuleRegistry, required_inputs
+)
+from analisis.streaming import CHUNK_SIZE, HTTP_URL_RE, scan_http_urls
+
+# Incrementar cuando cambien las reglas para invalidar resultados cacheados
+RULESET_VERSION = "5"
+
+# Ejecucion de detectores: "process" (los que escanean DEX, librerias y
+# recursos son de CPU y en hilos compiten por el GIL), "thread" o "serial"
+DETECTOR_EXECUTOR = os.environ.get("DSA_DETECTOR_EXECUTOR", "process")
+DETECTOR_WORKERS = int(os.environ.get("DSA_DETECTOR_WORKERS", 4))
+
+# Presupuesto de tiempo en segundos por analisis y por detector (0: sin limite)
+ANALYSIS_TIMEOUT = float(os.environ.get("DSA_ANALYSIS_TIMEOUT", 300))
+DETECTOR_TIMEOUT = float(os.environ.get("DSA_DETECTOR_TIMEOUT", 120))
+
+# Escaneo de secretos por entrada: "process" (las expresiones regulares
+# retienen el GIL), "thread" o "serial"
+SECRET_SCAN_EXECUTOR = os.environ.get("DSA_SECRET_EXECUTOR", "process")
+SECRET_SCAN_WORKERS = int(os.environ.get("DSA_SECRET_WORKERS", 4))
+# Entradas mas grandes (descomprimidas) o con mayor ratio de compresion se omiten
+SECRET_MAX_ENTRY_SIZE = int(os.environ.get("DSA_SECRET_MAX_ENTRY_SIZE", 16 * 1024 * 1024))
+SECRET_MAX_COMPRESSION_RATIO = 200
+
+SECRET_FILE_EXTENSIONS = (".xml", ".json", ".properties")
+
+# Entradas mas lentas que se indican en metadata["slowest_entries"]
+SLOWEST_ENTRIES = 5
+
+# Librerias nativas mas grandes (descomprimidas) no se escanean
+NATIVE_MAX_ENTRY_SIZE = int(os.environ.get("DSA_NATIVE_MAX_ENTRY_SIZE", 256 * 1024 * 1024))
 
 DANGEROUS_PERMISSIONS = [
     "android.permission.READ_SMS",
@@ -24,6 +70,8 @@ DANGEROUS_PERMISSIONS = [
     "android.permission.PROCESS_OUTGOING_CALLS",
 ]
 
+HTTP_URL_TEXT_RE = re.compile(r'http://[^\s\x00"\'<>]+')
+
 SECRET_PATTERNS = [
     (r'(?i)(api[_-]?key|apikey)\s*[=:]\s*["\']([^"\']+)["\']', "API Key"),
     (r'(?i)(password|passwd|pwd)\s*[=:]\s*["\']([^"\']+)["\']', "Password"),
@@ -31,97 +79,671 @@ SECRET_PATTERNS = [
     (r'(?i)(aws[_-]?access|aws[_-]?secret)', "AWS Credentials"),
 ]
 
+# Literales que toda coincidencia de SECRET_PATTERNS contiene
+SECRET_PREFILTER = re.compile(r'api|key|pass|pwd|secret|token|aws', re.IGNORECASE)
+
+
+def _compile_secret_matcher(patterns):
+    """Une los patrones en una alternancia con un grupo con nombre por patron"""
+    alternatives = []
+    for index, (pattern, _) in enumerate(patterns):
+        if pattern.startswith("(?i)"):
+            pattern = pattern[len("(?i)"):]
+        alternatives.append(f"(?P<s{index}>{pattern})")
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+SECRET_MATCHER = _compile_secret_matcher(SECRET_PATTERNS)
+
+# Reglas de analisis; cada detector se registra con las entradas que lee
+RULES = RuleRegistry()
+
+
+class AnalysisContext:
+    """
+    Contexto compartido de un analisis: el APK se parsea una sola vez.
+
+    Las entradas se leen de un MappedArchive (mmap), por lo que la memoria
+    depende de la mayor entrada procesada y no del tamano del APK; el
+    manifest se decodifica desde ese archivo (ver _parse_manifest).
+    inputs limita las entradas que pueden pedir los detectores (None:
+    todas); cada entrada se carga la primera vez que se pide. Con
+    entry_cache (PackageEntryCache) los detectores por entrada reutilizan
+    los resultados de la version previa del paquete, y con shared_cache
+    (SharedEntryCache) los de entradas identicas de otros APKs (ver
+    entry_results). budget (Budget) es el presupuesto de tiempo que los
+    detectores consultan con check_time().
+    """
+
+    def __init__(self, apk_path, apk=None, scan_mode="full", inputs=None,
+                 entry_cache=None, shared_cache=None, budget=None):
+        self.apk_path = apk_path
+        self.budget = budget if budget is not None else Budget()
+        self._read_lock = threading.Lock()
+        self._archive = None
+        self.apk = apk if apk is not None else self._parse_manifest()
+        self.scan_mode = scan_mode
+        self.inputs = None if inputs is None else frozenset(inputs)
+        self.entry_cache = entry_cache
+        self.shared_cache = shared_cache
+        self._inputs = {}
+        self._input_lock = threading.Lock()
+        self._entry_results = None
+        self._entry_lock = threading.Lock()
+        self._native_scans = {}
+        self._native_lock = threading.Lock()
+        # Segundos empleados por entrada del zip en detectores por entrada
+        self.entry_timings = {}
+        self._components = None
+        self._components_built = False
+
+    def check_time(self):
+        """Punto de control entre entradas: BudgetExceeded si vencio el plazo del detector"""
+        self.budget.check()
+
+    def read_file(self, name):
+        """Lee una entrada del APK; seguro entre hilos de detectores"""
+        with self._read_lock:
+            return self.apk.get_file(name)
+
+    def _parse_manifest(self):
+        """
+        Vista del manifest (ManifestView) leida del archivo mapeado. Si el
+        zip o el manifest no se pueden leer asi se usa APK de androguard,
+        que tolera zips malformados pero carga el APK entero en memoria;
+        no tras un MemoryError, que se propaga.
+        """
+        try:
+            return ManifestView.from_bytes(self.archive().read("AndroidManifest.xml"))
+        except MemoryError:
+            raise
+        except Exception:
+            return APK(self.apk_path)
+
+    def archive(self):
+        """MappedArchive del APK, abierto la primera vez que se pide"""
+        with self._read_lock:
+            if self._archive is None:
+                self._archive = MappedArchive(self.apk_path)
+            return self._archive
+
+    def iter_chunks(self, name, chunk_size=CHUNK_SIZE):
+        """Contenido de una entrada del APK en bloques (ver MappedArchive.iter_chunks)"""
+        return self.archive().iter_chunks(name, chunk_size)
+
+    def zip_entries(self):
+        """Entradas del directorio central (ZipInfo con tamanos y CRC)"""
+        return self.archive().infolist()
+
+    def dex_strings(self, name):
+        """
+        Constantes de string de un DEX, decodificadas a medida que se
+        recorren: ni el DEX ni sus strings se guardan en memoria. Lanza
+        DexFormatError (tambien a mitad del recorrido) si no es legible.
+        """
+        archive = self.archive()
+        with archive.open(name) as fp:
+            yield from iter_dex_strings(fp, size=archive.getinfo(name).file_size)
+
+    def input(self, name):
+        """
+        Entrada del APK declarada por una regla (ver analisis.rules),
+        cargada una sola vez. Pedir una entrada que el conjunto de reglas no
+        declara lanza RuleInputError.
+        """
+        if self.inputs is not None and name not in self.inputs:
+            raise RuleInputError(f"Entrada no declarada por las reglas activas: {name}")
+        with self._input_lock:
+            if name not in self._inputs:
+                self._inputs[name] = getattr(self, f"_load_{name}")()
+            return self._inputs[name]
+
+    def _load_manifest(self):
+        return self.apk
+
+    def _load_dex_strings(self):
+        """
+        Nombres de los DEX del APK. Sus strings se decodifican al pedirlos
+        con dex_strings(), de modo que un DEX sin cambios respecto a la
+        version previa (ver entry_results) no llega a descomprimirse.
+        """
+        return [name for name in self.archive().namelist() if name.endswith(".dex")]
+
+    def _load_text_resources(self):
+        """Entradas de texto candidatas a contener secretos, dentro de los limites"""
+        return [
+            info for info in self.zip_entries()
+            if info.filename.endswith(SECRET_FILE_EXTENSIONS)
+            and info.file_size <= SECRET_MAX_ENTRY_SIZE
+            and info.file_size <= SECRET_MAX_COMPRESSION_RATIO * max(info.compress_size, 1)
+        ]
+
+    def _load_native_libs(self):
+        """
+        Librerias nativas (lib/<abi>/*.so) del directorio central, dentro de
+        los limites. Las identicas en varias ABIs aparecen una sola vez, con
+        el nombre de la primera: CRC32, tamano y compresion solo preseleccionan
+        candidatas (se pueden falsificar) y se confirma con el hash de los
+        bytes guardados.
+        """
+        libs = []
+        candidates = {}
+        digests = {}
+
+        def digest(info):
+            if info.filename not in digests:
+                digests[info.filename] = self.archive().raw_digest(info)
+            return digests[info.filename]
+
+        for info in self.zip_entries():
+            if not (info.filename.startswith("lib/") and info.filename.endswith(".so")):
+                continue
+            if info.file_size > NATIVE_MAX_ENTRY_SIZE:
+                continue
+            if (info.compress_type != zipfile.ZIP_STORED
+                    and info.file_size > SECRET_MAX_COMPRESSION_RATIO * max(info.compress_size, 1)):
+                continue
+            same = candidates.setdefault((info.CRC, info.file_size, info.compress_type), [])
+            if same and any(digest(other) == digest(info) for other in same):
+                continue
+            same.append(info)
+            libs.append(info)
+        return libs
+
+    def native_scan(self, info):
+        """
+        URLs HTTP y tipos de secreto de los strings imprimibles de una
+        libreria nativa, extraidos una sola vez aunque los pidan varias
+        reglas. Las librerias sin comprimir se escanean sobre un mmap del
+        APK sin copiarlas a memoria.
+        """
+        key = info.filename
+        with self._native_lock:
+            result = self._native_scans.get(key)
+            if result is None:
+                strings = iter_library_strings(self.archive(), info)
+                result = self._native_scans[key] = _scan_native_strings(strings)
+            return result
+
+    def entry_results(self):
+        """
+        EntryResults del analisis: resultados por entrada reutilizables
+        entre versiones del mismo paquete y entre APKs. Sin caches, o si el
+        zip no se puede leer, todas las entradas se escanean.
+        """
+        with self._entry_lock:
+            if self._entry_results is None:
+                package = None
+                infos = []
+                if self.entry_cache is not None or self.shared_cache is not None:
+                    try:
+                        package = self.apk.get_package()
+                        infos = self.zip_entries()
+                    except MemoryError:
+                        raise
+                    except Exception:
+                        package = None
+                        infos = []
+                if not isinstance(package, str):
+                    package = None
+                self._entry_results = EntryResults(
+                    self.entry_cache, package, infos, self.shared_cache, self.apk_path
+                )
+            return self._entry_results
+
+    def save_entry_results(self):
+        """Guarda los resultados por entrada para la siguiente version del paquete"""
+        if self._entry_results is None:
+            return
+        try:
+            self._entry_results.save()
+        except (OSError, sqlite3.Error):
+            pass
+
+    def resource_string(self, res_id):
+        """String de resources.arsc resuelto de forma puntual (ver resolve_string)"""
+        return resolve_string(self.archive(), res_id)
+
+    def components(self):
+        """
+        Indice de componentes del manifest (ver build_component_index),
+        construido una vez; None si el manifest no es accesible.
+        """
+        with self._read_lock:
+            if not self._components_built:
+                self._components_built = True
+                try:
+                    self._components = build_component_index(
+                        self.apk.get_android_manifest_xml(), self.apk.get_package()
+                    )
+                except MemoryError:
+                    raise
+                except Exception:
+                    self._components = None
+            return self._components
+
+    def close(self):
+        """Cierra el archivo mapeado y los ficheros abiertos"""
+        if self._entry_results is not None:
+            self._entry_results.close()
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+
+def select_rules(profile="full"):
+    """
+    Reglas de un perfil de PROFILES o de una lista de nombres de regla, en
+    el orden del registro. Un perfil o regla desconocidos lanzan ValueError.
+    """
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(f"Perfil desconocido: {profile}")
+        return RULES.select(PROFILES[profile])
+    return RULES.select(profile)
+
+
+def open_context(apk_path, rules, scan_mode="full", entry_cache=None, shared_cache=None,
+                 budget=None):
+    """
+    Contexto limitado a las entradas que necesitan las reglas. Si solo
+    necesitan el manifest se extrae unicamente AndroidManifest.xml, sin
+    construir APK ni abrir DEX o recursos.
+    """
+    inputs = required_inputs(rules)
+    apk = None
+    if set(inputs) <= {INPUT_MANIFEST}:
+        apk = ManifestView.from_apk_file(apk_path)
+    return AnalysisContext(
+        apk_path, apk=apk, scan_mode=scan_mode, inputs=inputs,
+        entry_cache=entry_cache, shared_cache=shared_cache, budget=budget
+    )
+
+
+def analyze(apk_path, profile="full", entry_cache=None, shared_cache=None,
+            timeout=None, detector_timeout=None):
+    """
+    Parsea el APK una vez y devuelve (metadata, vulnerabilidades).
+
+    profile es un perfil de PROFILES o una lista de nombres de regla; solo
+    se cargan las entradas que necesitan esas reglas. Con entry_cache
+    (PackageEntryCache) solo se escanean las entradas que cambiaron desde
+    la version previa del mismo paquete, y con shared_cache
+    (SharedEntryCache) tampoco las ya escaneadas en otros APKs;
+    metadata["incremental"] indica cuantos resultados por entrada se
+    reutilizaron de cada cache y cuantos se calcularon.
+    metadata["slowest_entries"] lista las SLOWEST_ENTRIES entradas que mas
+    tardaron en escanearse (ver AnalysisContext.entry_timings).
+
+    El analisis dispone de timeout segundos y cada detector de
+    detector_timeout (por defecto ANALYSIS_TIMEOUT y DETECTOR_TIMEOUT; 0 es
+    sin limite). Si se agotan, se devuelven los hallazgos de los detectores
+    que terminaron, metadata["partial"] es True, metadata["skipped"] lista
+    los detectores sin completar y se anade un hallazgo INFO que lo indica.
+    MemoryError no se captura en ningun detector: bajo el limite de memoria
+    de SandboxPool el trabajo se da por caido en vez de devolver (y cachear)
+    un resultado sin hallazgos.
+    """
+    rules = select_rules(profile)
+    scan_mode = profile if isinstance(profile, str) else "custom"
+    budget = Budget.start(
+        ANALYSIS_TIMEOUT if timeout is None else timeout,
+        DETECTOR_TIMEOUT if detector_timeout is None else detector_timeout
+    )
+    try:
+        context = open_context(apk_path, rules, scan_mode, entry_cache, shared_cache, budget)
+    except MemoryError:
+        raise
+    except Exception as e:
+        return failed_analysis(apk_path, e)
+
+    try:
+        try:
+            metadata = _collect_metadata(context)
+        except MemoryError:
+            raise
+        except Exception as e:
+            metadata = _error_metadata(e)
+
+        vulnerabilities = _run_checks(context, detectors=_detectors(rules), budget=budget)
+        skipped = budget.skipped([rule.name for rule in rules])
+        if skipped:
+            metadata["partial"] = True
+            metadata["skipped"] = skipped
+        if entry_cache is not None or shared_cache is not None:
+            results = context.entry_results()
+            context.save_entry_results()
+            metadata["incremental"] = {
+                "reused": results.reused, "shared": results.shared, "scanned": results.scanned
+            }
+        if context.entry_timings:
+            metadata["slowest_entries"] = _slowest_entries(context.entry_timings)
+        return metadata, vulnerabilities
+    finally:
+        context.close()
+
+
+def quick_analyze(apk_path):
+    """
+    Analisis rapido de triaje: solo AndroidManifest.xml.
+
+    Ejecuta las reglas del perfil "quick", que solo leen el manifest, por
+    lo que se extrae unicamente esa entrada (sin construir APK ni leer DEX
+    o recursos). El resultado es parcial: metadata["scan_mode"] es "quick"
+    y se anade un hallazgo INFO que lo indica.
+    """
+    rules = select_rules("quick")
+    try:
+        context = open_context(apk_path, rules, "quick")
+    except MemoryError:
+        raise
+    except Exception as e:
+        return failed_analysis(apk_path, e)
+
+    try:
+        metadata = _collect_metadata(context)
+    except MemoryError:
+        raise
+    except Exception as e:
+        metadata = _error_metadata(e)
+
+    vulnerabilities = _run_detectors(context, _detectors(rules), "serial", 1)
+    vulnerabilities.append({
+        "title": "Analisis rapido (parcial)",
+        "description": (
+            "Solo se analizo AndroidManifest.xml. No se revisaron DEX ni recursos, "
+            "por lo que no se buscaron URLs HTTP ni secretos hardcodeados."
+        ),
+        "solution": "Ejecutar el analisis completo antes de dar la aplicacion por revisada.",
+        "file": "AndroidManifest.xml",
+        "method": "N/A",
+        "evidence": "scan_mode=quick",
+        "severity": "INFO",
+        "category": "config"
+    })
+
+    return metadata, vulnerabilities
+
 
 def analyze_apk(apk_path):
     """Analiza un APK y devuelve vulnerabilidades encontradas"""
-    vulnerabilities = []
-
     try:
-        apk = APK(apk_path)
+        context = AnalysisContext(apk_path)
+    except MemoryError:
+        raise
     except Exception as e:
-        return [{
-            "title": "Error al analizar APK",
-            "description": f"No se pudo analizar el archivo: {str(e)}",
-            "solution": "Verificar que el archivo APK es valido",
-            "file": apk_path,
-            "method": "N/A",
-            "evidence": str(e),
-            "severity": "INFO",
-            "category": "config"
-        }]
+        return [_error_finding(apk_path, e)]
 
-    # 1. Analizar permisos peligrosos
-    permissions = apk.get_permissions()
-    dangerous_found = [p for p in permissions if p in DANGEROUS_PERMISSIONS]
+    try:
+        return _run_checks(context)
+    finally:
+        context.close()
+
+
+def _slowest_entries(timings, count=None):
+    """Las entradas mas lentas de entry_timings, de mayor a menor tiempo"""
+    slowest = heapq.nlargest(
+        SLOWEST_ENTRIES if count is None else count, timings.items(), key=lambda item: item[1]
+    )
+    return [{"file": name, "seconds": round(seconds, 4)} for name, seconds in slowest]
 
-    if dangerous_found:
+
+def failed_analysis(apk_path, error):
+    """(metadata, vulnerabilidades) de un APK que no se pudo analizar"""
+    return _error_metadata(error), [_error_finding(apk_path, error)]
+
+
+def _error_finding(apk_path, error):
+    """Hallazgo INFO para un APK que no se pudo parsear"""
+    return {
+        "title": "Error al analizar APK",
+        "description": f"No se pudo analizar el archivo: {str(error)}",
+        "solution": "Verificar que el archivo APK es valido",
+        "file": apk_path,
+        "method": "N/A",
+        "evidence": str(error),
+        "severity": "INFO",
+        "category": "config"
+    }
+
+
+def _detectors(rules):
+    """Pares (nombre, detector) de las reglas"""
+    return [(rule.name, rule.check) for rule in rules]
+
+
+def _run_checks(context, executor=None, max_workers=None, detectors=None, budget=None):
+    """
+    Ejecuta los detectores (por defecto DETECTORS) sobre un APK ya parseado.
+
+    executor puede ser "thread", "process" o "serial" (por defecto
+    DETECTOR_EXECUTOR); con "process" los resultados por entrada y los
+    tiempos de cada proceso se combinan en entry_results y entry_timings
+    del contexto. Los hallazgos se combinan siempre en el orden de
+    los detectores, independientemente del orden en que terminen. Con
+    budget (Budget), si algun detector no termina a tiempo se anade un
+    hallazgo INFO con los detectores omitidos.
+    """
+    detectors = DETECTORS if detectors is None else detectors
+    vulnerabilities = _run_detectors(
+        context, detectors, executor or DETECTOR_EXECUTOR, max_workers or DETECTOR_WORKERS,
+        budget
+    )
+
+    skipped = budget.skipped([name for name, _ in detectors]) if budget is not None else []
+    if skipped:
         vulnerabilities.append({
-            "title": "Permisos peligrosos detectados",
+            "title": "Analisis parcial (tiempo agotado)",
             "description": (
-                f"La aplicacion solicita {len(dangerous_found)} permisos considerados "
-                "peligrosos que pueden comprometer la privacidad del usuario."
+                f"{len(skipped)} detectores no terminaron dentro del tiempo asignado; "
+                "sus hallazgos pueden estar incompletos o faltar."
             ),
             "solution": (
-                "Revisar si todos los permisos son necesarios. Aplicar el principio "
-                "de minimo privilegio."
-            ),
-            "file": "AndroidManifest.xml",
-            "method": "<uses-permission>",
-            "evidence": ", ".join([p.split(".")[-1] for p in dangerous_found]),
-            "severity": "HIGH" if len(dangerous_found) > 3 else "MEDIUM",
-            "category": "permissions"
-        })
-
-    # 2. Verificar modo debug
-    debuggable = apk.get_attribute_value("application", "debuggable")
-    if debuggable == "true":
-        vulnerabilities.append({
-            "title": "Aplicacion en modo debug",
-            "description": (
-                "La aplicacion tiene el flag debuggable activado, permitiendo "
-                "a atacantes depurar y extraer informacion sensible."
+                "Repetir el analisis con mas tiempo (DSA_ANALYSIS_TIMEOUT, "
+                "DSA_DETECTOR_TIMEOUT) antes de dar la aplicacion por revisada."
             ),
-            "solution": "Establecer android:debuggable='false' en el manifest.",
-            "file": "AndroidManifest.xml",
-            "method": "<application>",
-            "evidence": "android:debuggable='true'",
-            "severity": "HIGH",
+            "file": "N/A",
+            "method": "N/A",
+            "evidence": "Omitidos: " + ", ".join(skipped),
+            "severity": "INFO",
             "category": "config"
         })
 
-    # 3. Verificar backup permitido
-    allow_backup = apk.get_attribute_value("application", "allowBackup")
-    if allow_backup is None or allow_backup == "true":
+    # Si no se encontraron vulnerabilidades
+    if not vulnerabilities:
         vulnerabilities.append({
-            "title": "Backup de datos permitido",
-            "description": (
-                "La aplicacion permite backup de datos, lo que puede exponer "
-                "informacion sensible si el dispositivo es comprometido."
-            ),
-            "solution": "Establecer android:allowBackup='false' o implementar reglas de backup.",
-            "file": "AndroidManifest.xml",
-            "method": "<application>",
-            "evidence": "android:allowBackup='true'",
-            "severity": "MEDIUM",
+            "title": "Analisis completado",
+            "description": "No se detectaron vulnerabilidades obvias en el analisis estatico.",
+            "solution": "Considerar analisis dinamico para una evaluacion mas completa.",
+            "file": "N/A",
+            "method": "N/A",
+            "evidence": "Ninguna vulnerabilidad detectada",
+            "severity": "INFO",
             "category": "config"
         })
 
-    # 4. Buscar URLs HTTP inseguras
+    return vulnerabilities
+
+
+def _run_detectors(context, detectors, executor, max_workers, budget=None):
+    """
+    Ejecuta los detectores indicados y combina sus hallazgos en orden.
+
+    Con budget cada detector se ejecuta con su plazo (ver Budget.run). Al
+    vencer el plazo del analisis ya no se esperan los que siguen en
+    marcha: se anotan como omitidos y no aportan hallazgos (el hilo o
+    proceso termina en su siguiente punto de control).
+    """
+    budget = budget if budget is not None else Budget()
+    if executor == "serial":
+        results = [budget.run(name, detector, context) for name, detector in detectors]
+        return [finding for findings in results for finding in findings]
+
+    if executor == "process":
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        futures = [
+            pool.submit(
+                _run_detector_in_process, context.apk_path, name, context.inputs,
+                context.scan_mode, budget.deadline, budget.detector_timeout,
+                context.entry_cache, context.shared_cache
+            )
+            for name, _ in detectors
+        ]
+    else:
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [
+            pool.submit(budget.run, name, detector, context) for name, detector in detectors
+        ]
+
+    pending = futures
+    try:
+        done, pending = wait(futures, timeout=budget.deadline.remaining())
+        results = []
+        for (name, _), future in zip(detectors, futures):
+            if future not in done:
+                future.cancel()
+                budget.skip(name)
+                continue
+            findings = future.result()
+            if executor == "process":
+                findings, skipped, entry_state, timings = findings
+                if skipped:
+                    budget.skip(name)
+                if entry_state is not None:
+                    context.entry_results().merge(entry_state)
+                context.entry_timings.update(timings)
+            results.append(findings)
+    finally:
+        pool.shutdown(wait=not pending)
+
+    return [finding for findings in results for finding in findings]
+
+
+# Contexto parseado por proceso worker cuando DETECTOR_EXECUTOR es "process"
+_process_context = {}
+
+
+def _run_detector_in_process(apk_path, name, inputs=None, scan_mode="full",
+                             deadline=None, detector_timeout=None, entry_cache=None,
+                             shared_cache=None):
+    """
+    Ejecuta un detector en un proceso worker reutilizando su APK parseado.
+    Devuelve (hallazgos, True si no termino dentro de su plazo, resultados
+    por entrada nuevos (ver EntryResults.export) o None sin caches,
+    segundos por entrada escaneada).
+    """
+    key = (apk_path, inputs)
+    context = _process_context.get(key)
+    if context is None:
+        for previous in _process_context.values():
+            previous.close()
+        _process_context.clear()
+        apk = None
+        if inputs is not None and inputs <= {INPUT_MANIFEST}:
+            apk = ManifestView.from_apk_file(apk_path)
+        context = _process_context[key] = AnalysisContext(
+            apk_path, apk=apk, scan_mode=scan_mode, inputs=inputs,
+            entry_cache=entry_cache, shared_cache=shared_cache
+        )
+    context.budget = Budget(deadline, detector_timeout)
+    findings = context.budget.run(name, dict(DETECTORS)[name], context)
+    entry_state = None
+    if entry_cache is not None or shared_cache is not None:
+        entry_state = context.entry_results().export()
+    timings, context.entry_timings = context.entry_timings, {}
+    return findings, bool(context.budget.skipped()), entry_state, timings
+
+
+@RULES.register("permissions", (INPUT_MANIFEST,), "HIGH", "permissions")
+def check_permissions(context):
+    """1. Analizar permisos peligrosos"""
+    permissions = context.input(INPUT_MANIFEST).get_permissions()
+    dangerous_found = [p for p in permissions if p in DANGEROUS_PERMISSIONS]
+
+    if not dangerous_found:
+        return []
+
+    return [{
+        "title": "Permisos peligrosos detectados",
+        "description": (
+            f"La aplicacion solicita {len(dangerous_found)} permisos considerados "
+            "peligrosos que pueden comprometer la privacidad del usuario."
+        ),
+        "solution": (
+            "Revisar si todos los permisos son necesarios. Aplicar el principio "
+            "de minimo privilegio."
+        ),
+        "file": "AndroidManifest.xml",
+        "method": "<uses-permission>",
+        "evidence": ", ".join([p.split(".")[-1] for p in dangerous_found]),
+        "severity": "HIGH" if len(dangerous_found) > 3 else "MEDIUM",
+        "category": "permissions"
+    }]
+
+
+@RULES.register("debuggable", (INPUT_MANIFEST,), "HIGH", "config")
+def check_debuggable(context):
+    """2. Verificar modo debug"""
+    debuggable = context.input(INPUT_MANIFEST).get_attribute_value("application", "debuggable")
+    if debuggable != "true":
+        return []
+
+    return [{
+        "title": "Aplicacion en modo debug",
+        "description": (
+            "La aplicacion tiene el flag debuggable activado, permitiendo "
+            "a atacantes depurar y extraer informacion sensible."
+        ),
+        "solution": "Establecer android:debuggable='false' en el manifest.",
+        "file": "AndroidManifest.xml",
+        "method": "<application>",
+        "evidence": "android:debuggable='true'",
+        "severity": "HIGH",
+        "category": "config"
+    }]
+
+
+@RULES.register("allow_backup", (INPUT_MANIFEST,), "MEDIUM", "config")
+def check_allow_backup(context):
+    """3. Verificar backup permitido"""
+    allow_backup = context.input(INPUT_MANIFEST).get_attribute_value("application", "allowBackup")
+    if allow_backup is not None and allow_backup != "true":
+        return []
+
+    return [{
+        "title": "Backup de datos permitido",
+        "description": (
+            "La aplicacion permite backup de datos, lo que puede exponer "
+            "informacion sensible si el dispositivo es comprometido."
+        ),
+        "solution": "Establecer android:allowBackup='false' o implementar reglas de backup.",
+        "file": "AndroidManifest.xml",
+        "method": "<application>",
+        "evidence": "android:allowBackup='true'",
+        "severity": "MEDIUM",
+        "category": "config"
+    }]
+
+
+@RULES.register("http_urls", (INPUT_DEX_STRINGS, INPUT_NATIVE_LIBS), "HIGH", "network")
+def check_http_urls(context):
+    """4. Buscar URLs HTTP inseguras (DEX y librerias nativas)"""
+    vulnerabilities = []
     try:
-        files = apk.get_files()
         http_urls = set()
+        results = context.entry_results()
 
-        for f in files:
-            if f.endswith(".dex"):
-                try:
-                    content = apk.get_file(f)
-                    urls = re.findall(rb'http://[^\s\x00"\'<>]+', content)
-                    for url in urls:
-                        decoded = url.decode('utf-8', errors='ignore')
-                        if not decoded.startswith("http://schemas.android.com"):
-                            http_urls.add(decoded[:60])
-                except:
-                    pass
+        for f in context.input(INPUT_DEX_STRINGS):
+            context.check_time()
+            try:
+                urls = results.get("http_urls", f, lambda: sorted(_dex_http_urls(context, f)))
+                for url in urls:
+                    if not url.startswith("http://schemas.android.com"):
+                        http_urls.add(url)
+            except MemoryError:
+                raise
+            except:
+                pass
 
         if http_urls:
             vulnerabilities.append({
@@ -133,118 +755,356 @@ def analyze_apk(apk_path):
                 "solution": "Usar HTTPS para todas las comunicaciones.",
                 "file": "classes.dex",
                 "method": "Network calls",
-                "evidence": ", ".join(list(http_urls)[:3]),
+                "evidence": ", ".join(sorted(http_urls)[:3]),
                 "severity": "HIGH",
                 "category": "network"
             })
+
+        native_urls = set()
+        native_files = []
+        for info in context.input(INPUT_NATIVE_LIBS):
+            context.check_time()
+            try:
+                urls = results.get(
+                    "http_urls", info.filename, lambda: context.native_scan(info)["urls"]
+                )
+            except MemoryError:
+                raise
+            except Exception:
+                continue
+            urls = [url for url in urls if not url.startswith("http://schemas.android.com")]
+            if urls:
+                native_files.append(info.filename)
+                native_urls.update(urls)
+
+        if native_urls:
+            vulnerabilities.append({
+                "title": "Comunicacion HTTP sin cifrar en librerias nativas",
+                "description": (
+                    f"Se detectaron {len(native_urls)} URLs usando HTTP sin cifrado en "
+                    f"{len(native_files)} librerias nativas, exponiendo datos a ataques "
+                    "Man-in-the-Middle."
+                ),
+                "solution": "Usar HTTPS para todas las comunicaciones.",
+                "file": ", ".join(native_files[:2]),
+                "method": "Native strings",
+                "evidence": ", ".join(sorted(native_urls)[:3]),
+                "severity": "HIGH",
+                "category": "network"
+            })
+    except MemoryError:
+        raise
     except:
         pass
 
-    # 5. Verificar componentes exportados
-    exported_activities = []
-    exported_services = []
-    exported_receivers = []
+    return vulnerabilities
+
 
-    for activity in apk.get_activities():
-        if is_exported(apk, activity, "activity"):
-            exported_activities.append(activity.split(".")[-1])
+def _dex_http_urls(context, name):
+    """URLs HTTP de las constantes de string del DEX (o de sus bytes si no es legible)"""
+    try:
+        return {
+            url
+            for string in context.dex_strings(name) if "http://" in string
+            for url in HTTP_URL_TEXT_RE.findall(string)
+        }
+    except DexFormatError:
+        return {
+            url.decode('utf-8', errors='ignore')[:60]
+            for url in scan_http_urls(context.iter_chunks(name))
+        }
 
-    for service in apk.get_services():
-        if is_exported(apk, service, "service"):
-            exported_services.append(service.split(".")[-1])
 
-    for receiver in apk.get_receivers():
-        if is_exported(apk, receiver, "receiver"):
-            exported_receivers.append(receiver.split(".")[-1])
+@RULES.register("exported_components", (INPUT_MANIFEST,), "HIGH", "components")
+def check_exported_components(context):
+    """5. Verificar componentes exportados"""
+    index = context.components()
+
+    if index is not None:
+        exported_activities, exported_services, exported_receivers = [
+            [
+                name.split(".")[-1]
+                for name, info in index[comp_type].items()
+                if info["exported"] == "true"
+            ]
+            for comp_type in ("activity", "service", "receiver")
+        ]
+    else:
+        apk = context.input(INPUT_MANIFEST)
+        exported_activities = [
+            activity.split(".")[-1] for activity in apk.get_activities()
+            if is_exported(apk, activity, "activity")
+        ]
+        exported_services = [
+            service.split(".")[-1] for service in apk.get_services()
+            if is_exported(apk, service, "service")
+        ]
+        exported_receivers = [
+            receiver.split(".")[-1] for receiver in apk.get_receivers()
+            if is_exported(apk, receiver, "receiver")
+        ]
 
     total_exported = len(exported_activities) + len(exported_services) + len(exported_receivers)
 
-    if total_exported > 0:
-        evidence_parts = []
-        if exported_activities:
-            evidence_parts.append(f"Activities: {', '.join(exported_activities[:2])}")
-        if exported_services:
-            evidence_parts.append(f"Services: {', '.join(exported_services[:2])}")
-        if exported_receivers:
-            evidence_parts.append(f"Receivers: {', '.join(exported_receivers[:2])}")
+    if total_exported == 0:
+        return []
 
-        vulnerabilities.append({
-            "title": "Componentes exportados sin proteccion",
-            "description": (
-                f"Se encontraron {total_exported} componentes exportados que podrian "
-                "ser accedidos por otras aplicaciones maliciosas."
-            ),
-            "solution": (
-                "Agregar permisos personalizados o establecer exported='false' "
-                "si no es necesario."
-            ),
-            "file": "AndroidManifest.xml",
-            "method": "Components",
-            "evidence": "; ".join(evidence_parts),
-            "severity": "MEDIUM" if total_exported < 5 else "HIGH",
-            "category": "components"
-        })
+    evidence_parts = []
+    if exported_activities:
+        evidence_parts.append(f"Activities: {', '.join(exported_activities[:2])}")
+    if exported_services:
+        evidence_parts.append(f"Services: {', '.join(exported_services[:2])}")
+    if exported_receivers:
+        evidence_parts.append(f"Receivers: {', '.join(exported_receivers[:2])}")
+
+    return [{
+        "title": "Componentes exportados sin proteccion",
+        "description": (
+            f"Se encontraron {total_exported} componentes exportados que podrian "
+            "ser accedidos por otras aplicaciones maliciosas."
+        ),
+        "solution": (
+            "Agregar permisos personalizados o establecer exported='false' "
+            "si no es necesario."
+        ),
+        "file": "AndroidManifest.xml",
+        "method": "Components",
+        "evidence": "; ".join(evidence_parts),
+        "severity": "MEDIUM" if total_exported < 5 else "HIGH",
+        "category": "components"
+    }]
+
+
+def find_secret_types(content):
+    """
+    Devuelve los tipos de secreto presentes en content, en el orden de
+    SECRET_PATTERNS, con una unica pasada del matcher combinado.
+    """
+    if not SECRET_PREFILTER.search(content):
+        return []
+
+    found = set()
+    position = 0
+    while len(found) < len(SECRET_PATTERNS):
+        match = SECRET_MATCHER.search(content, position)
+        if match is None:
+            break
+        found.add(match.lastgroup)
+        # Continuar desde el siguiente caracter: "aws_secret = '...'" tambien
+        # contiene un Secret/Token que empieza dentro de la coincidencia
+        position = match.start() + 1
+
+    return [
+        secret_type
+        for index, (_, secret_type) in enumerate(SECRET_PATTERNS)
+        if f"s{index}" in found
+    ]
+
+
+def _entry_cost(info):
+    """Coste estimado: inflar cada byte comprimido y escanear cada byte descomprimido"""
+    return info.compress_size + info.file_size
+
+
+def partition_entries(infos, workers):
+    """
+    Reparte las entradas en `workers` particiones de coste similar.
+
+    Se asignan de mayor a menor coste a la particion menos cargada (LPT), y
+    cada particion queda ordenada de mayor a menor para que las entradas
+    grandes empiecen primero y la cola de entradas pequenas termine pronto.
+    """
+    partitions = [[] for _ in range(max(1, min(workers, len(infos))))]
+    loads = [(0, index) for index in range(len(partitions))]
+    heapq.heapify(loads)
+
+    for info in sorted(infos, key=_entry_cost, reverse=True):
+        load, index = heapq.heappop(loads)
+        partitions[index].append(info.filename)
+        heapq.heappush(loads, (load + _entry_cost(info), index))
+
+    return [partition for partition in partitions if partition]
+
+
+def _scan_secret_partition(apk_path, names, deadline=None):
+    """
+    Escanea una particion de entradas; devuelve (nombre, tipos, segundos).
+    Si vence deadline (Deadline) se dejan de leer las entradas restantes.
+    """
+    results = []
+    with zipfile.ZipFile(apk_path) as zf:
+        for name in names:
+            if deadline is not None and deadline.expired():
+                break
+            start = time.perf_counter()
+            try:
+                content = zf.read(name).decode('utf-8', errors='ignore')
+                secret_types = find_secret_types(content)
+            except MemoryError:
+                raise
+            except Exception:
+                secret_types = []
+            results.append((name, secret_types, time.perf_counter() - start))
+    return results
+
+
+def _scan_secret_entries(context):
+    """
+    Escanea en paralelo las entradas de texto; devuelve {nombre: tipos}.
+    Las entradas sin cambios desde la version previa del paquete no se leen.
+    """
+    entry_results = context.entry_results()
+    found = {}
+    infos = []
+    for info in context.input(INPUT_TEXT_RESOURCES):
+        hit, secret_types = entry_results.lookup("secrets", info.filename)
+        if hit:
+            found[info.filename] = secret_types
+        else:
+            infos.append(info)
+    partitions = partition_entries(infos, SECRET_SCAN_WORKERS)
+    deadline = context.budget.current_deadline()
+
+    if SECRET_SCAN_EXECUTOR == "serial" or len(partitions) <= 1:
+        results = [
+            _scan_secret_partition(context.apk_path, names, deadline) for names in partitions
+        ]
+    else:
+        pool_class = ProcessPoolExecutor if SECRET_SCAN_EXECUTOR == "process" else ThreadPoolExecutor
+        with pool_class(max_workers=len(partitions)) as pool:
+            futures = [
+                pool.submit(_scan_secret_partition, context.apk_path, names, deadline)
+                for names in partitions
+            ]
+            results = [future.result() for future in futures]
+
+    for partition in results:
+        for name, secret_types, seconds in partition:
+            context.entry_timings[name] = seconds
+            found[name] = secret_types
+            entry_results.record("secrets", name, secret_types)
+    if sum(map(len, results)) < len(infos):
+        # Particiones cortadas por el plazo: el escaneo quedo incompleto
+        context.check_time()
+    return found
+
+
+def _scan_native_secrets(context, found):
+    """Anade a found los tipos de secreto de cada libreria nativa"""
+    entry_results = context.entry_results()
+    for info in context.input(INPUT_NATIVE_LIBS):
+        context.check_time()
+        try:
+            found[info.filename] = entry_results.get(
+                "secrets", info.filename, lambda: context.native_scan(info)["secrets"]
+            )
+        except MemoryError:
+            raise
+        except Exception:
+            continue
+    return found
 
-    # 6. Buscar posibles secretos hardcodeados
+
+def _scan_native_strings(strings):
+    """URLs HTTP y tipos de secreto (en el orden de SECRET_PATTERNS) de strings de bytes"""
+    urls = set()
+    secret_types = set()
+    for string in strings:
+        if b"http://" in string:
+            urls.update(url.decode("ascii") for url in HTTP_URL_RE.findall(string))
+        if len(secret_types) < len(SECRET_PATTERNS):
+            secret_types.update(find_secret_types(string.decode("ascii")))
+    return {
+        "urls": sorted(urls),
+        "secrets": [t for _, t in SECRET_PATTERNS if t in secret_types],
+    }
+
+
+@RULES.register("secrets", (INPUT_TEXT_RESOURCES, INPUT_NATIVE_LIBS), "HIGH", "secrets")
+def check_secrets(context):
+    """6. Buscar posibles secretos hardcodeados (recursos de texto y librerias nativas)"""
     try:
-        for f in apk.get_files():
-            if f.endswith((".xml", ".json", ".properties")):
-                try:
-                    content = apk.get_file(f).decode('utf-8', errors='ignore')
-                    for pattern, secret_type in SECRET_PATTERNS:
-                        if re.search(pattern, content):
-                            vulnerabilities.append({
-                                "title": f"Posible {secret_type} hardcodeado",
-                                "description": (
-                                    f"Se detecto un posible {secret_type} en el codigo fuente. "
-                                    "Esto puede exponer credenciales sensibles."
-                                ),
-                                "solution": "Usar variables de entorno o almacenamiento seguro.",
-                                "file": f,
-                                "method": "Hardcoded value",
-                                "evidence": f"Patron detectado: {secret_type}",
-                                "severity": "HIGH",
-                                "category": "secrets"
-                            })
-                            break
-                except:
-                    pass
+        found = _scan_native_secrets(context, _scan_secret_entries(context))
+        names = [info.filename for info in context.zip_entries() if info.filename in found]
+    except zipfile.BadZipFile:
+        # Zip que androguard tolera pero zipfile no: lectura secuencial
+        found = {}
+        names = []
+        try:
+            for f in context.apk.get_files():
+                if f.endswith(SECRET_FILE_EXTENSIONS):
+                    try:
+                        content = context.read_file(f).decode('utf-8', errors='ignore')
+                        found[f] = find_secret_types(content)
+                        names.append(f)
+                    except MemoryError:
+                        raise
+                    except:
+                        pass
+        except MemoryError:
+            raise
+        except:
+            pass
+    except MemoryError:
+        raise
     except:
-        pass
+        return []
 
-    # 7. Verificar version minima de SDK
-    min_sdk = apk.get_min_sdk_version()
-    if min_sdk and int(min_sdk) < 21:
-        vulnerabilities.append({
-            "title": "SDK minimo obsoleto",
-            "description": (
-                f"La aplicacion soporta Android SDK {min_sdk}, que tiene vulnerabilidades "
-                "de seguridad conocidas."
-            ),
-            "solution": "Aumentar minSdkVersion a 21 o superior.",
-            "file": "AndroidManifest.xml",
-            "method": "<uses-sdk>",
-            "evidence": f"minSdkVersion={min_sdk}",
-            "severity": "LOW",
-            "category": "config"
-        })
-
-    # Si no se encontraron vulnerabilidades
-    if not vulnerabilities:
-        vulnerabilities.append({
-            "title": "Analisis completado",
-            "description": "No se detectaron vulnerabilidades obvias en el analisis estatico.",
-            "solution": "Considerar analisis dinamico para una evaluacion mas completa.",
-            "file": "N/A",
-            "method": "N/A",
-            "evidence": "Ninguna vulnerabilidad detectada",
-            "severity": "INFO",
-            "category": "config"
-        })
+    vulnerabilities = []
+    for f in names:
+        for secret_type in found[f]:
+            vulnerabilities.append({
+                "title": f"Posible {secret_type} hardcodeado",
+                "description": (
+                    f"Se detecto un posible {secret_type} en el codigo fuente. "
+                    "Esto puede exponer credenciales sensibles."
+                ),
+                "solution": "Usar variables de entorno o almacenamiento seguro.",
+                "file": f,
+                "method": "Hardcoded value",
+                "evidence": f"Patron detectado: {secret_type}",
+                "severity": "HIGH",
+                "category": "secrets"
+            })
 
     return vulnerabilities
 
 
+@RULES.register("min_sdk", (INPUT_MANIFEST,), "LOW", "config")
+def check_min_sdk(context):
+    """7. Verificar version minima de SDK"""
+    min_sdk = context.input(INPUT_MANIFEST).get_min_sdk_version()
+    if not min_sdk or int(min_sdk) >= 21:
+        return []
+
+    return [{
+        "title": "SDK minimo obsoleto",
+        "description": (
+            f"La aplicacion soporta Android SDK {min_sdk}, que tiene vulnerabilidades "
+            "de seguridad conocidas."
+        ),
+        "solution": "Aumentar minSdkVersion a 21 o superior.",
+        "file": "AndroidManifest.xml",
+        "method": "<uses-sdk>",
+        "evidence": f"minSdkVersion={min_sdk}",
+        "severity": "LOW",
+        "category": "config"
+    }]
+
+
+# Detectores independientes, en el orden en que se combinan sus hallazgos
+DETECTORS = _detectors(RULES)
+
+# Detectores que solo necesitan AndroidManifest.xml (analisis rapido)
+QUICK_DETECTORS = RULES.using_only(INPUT_MANIFEST)
+
+# Perfiles de analisis: nombres de las reglas que activa cada uno
+PROFILES = {
+    "full": RULES.names(),
+    "quick": QUICK_DETECTORS,
+}
+
+
 def is_exported(apk, component, comp_type):
     """Verifica si un componente esta exportado"""
     try:
@@ -261,44 +1121,107 @@ def is_exported(apk, component, comp_type):
 def get_apk_metadata(apk_path):
     """Extrae metadata del APK"""
     try:
-        apk = APK(apk_path)
+        context = AnalysisContext(apk_path)
+    except MemoryError:
+        raise
+    except Exception as e:
+        return _error_metadata(e)
 
-        permissions = apk.get_permissions()
-        dangerous = [p for p in permissions if p in DANGEROUS_PERMISSIONS]
+    try:
+        return _collect_metadata(context)
+    except MemoryError:
+        raise
+    except Exception as e:
+        return _error_metadata(e)
+    finally:
+        context.close()
 
-        # Tamaño del archivo
-        file_size = os.path.getsize(apk_path)
-        if file_size > 1024 * 1024:
-            size_str = f"{file_size / (1024 * 1024):.1f} MB"
-        else:
-            size_str = f"{file_size / 1024:.1f} KB"
 
-        return {
-            "app_name": apk.get_app_name() or "Desconocido",
-            "package": apk.get_package() or "Desconocido",
-            "version_name": apk.get_androidversion_name() or "N/A",
-            "version_code": apk.get_androidversion_code() or "N/A",
-            "min_sdk": apk.get_min_sdk_version() or "N/A",
-            "target_sdk": apk.get_target_sdk_version() or "N/A",
-            "permissions_total": len(permissions),
-            "permissions_dangerous": len(dangerous),
-            "activities": len(apk.get_activities()),
-            "services": len(apk.get_services()),
-            "receivers": len(apk.get_receivers()),
-            "file_size": size_str
-        }
-    except Exception as e:
-        return {
-            "app_name": "Error",
-            "package": str(e),
-            "version_name": "N/A",
-            "version_code": "N/A",
-            "min_sdk": "N/A",
-            "target_sdk": "N/A",
-            "permissions_total": 0,
-            "permissions_dangerous": 0,
-            "activities": 0,
-            "services": 0,
-            "receivers": 0,
-            "file_size": "N/A"
-        }
+def _collect_metadata(context):
+    """Extrae metadata de un APK ya parseado"""
+    apk = context.apk
+
+    permissions = apk.get_permissions()
+    dangerous = [p for p in permissions if p in DANGEROUS_PERMISSIONS]
+
+    # Tamaño del archivo
+    file_size = os.path.getsize(context.apk_path)
+    if file_size > 1024 * 1024:
+        size_str = f"{file_size / (1024 * 1024):.1f} MB"
+    else:
+        size_str = f"{file_size / 1024:.1f} KB"
+
+    return {
+        "app_name": _app_name(context) or "Desconocido",
+        "package": apk.get_package() or "Desconocido",
+        "version_name": apk.get_androidversion_name() or "N/A",
+        "version_code": apk.get_androidversion_code() or "N/A",
+        "min_sdk": apk.get_min_sdk_version() or "N/A",
+        "target_sdk": apk.get_target_sdk_version() or "N/A",
+        "permissions_total": len(permissions),
+        "permissions_dangerous": len(dangerous),
+        "activities": _component_count(context, "activity"),
+        "services": _component_count(context, "service"),
+        "receivers": _component_count(context, "receiver"),
+        "file_size": size_str,
+        "scan_mode": context.scan_mode
+    }
+
+
+def _app_name(context):
+    """
+    Etiqueta de la aplicacion. Si es una referencia (@7F0B0001) solo se
+    resuelve ese id en resources.arsc, sin decodificar la tabla completa;
+    si no se puede resolver se devuelve la referencia tal cual. Con reglas
+    que solo leen el manifest (perfil "quick") no se resuelve: solo se lee
+    AndroidManifest.xml.
+    """
+    apk = context.apk
+    label = apk.get_attribute_value("application", "label")
+    if not isinstance(label, str) or not label.startswith("@"):
+        return apk.get_app_name()
+    if context.inputs is not None and context.inputs <= {INPUT_MANIFEST}:
+        return label
+
+    try:
+        res_id, package = parse_resource_id(label)
+        if package and package != apk.get_package():
+            # Recurso de otro paquete (p. ej. framework): no se puede resolver
+            return label
+        name = context.resource_string(res_id)
+    except MemoryError:
+        raise
+    except Exception:
+        return label
+    return name if name is not None else label
+
+
+def _component_count(context, comp_type):
+    """Numero de componentes de un tipo, desde el indice si esta disponible"""
+    index = context.components()
+    if index is not None:
+        return len(index[comp_type])
+    getter = {
+        "activity": context.apk.get_activities,
+        "service": context.apk.get_services,
+        "receiver": context.apk.get_receivers,
+    }[comp_type]
+    return len(getter())
+
+
+def _error_metadata(error):
+    """Metadata de reemplazo cuando el APK no se pudo parsear"""
+    return {
+        "app_name": "Error",
+        "package": str(error),
+        "version_name": "N/A",
+        "version_code": "N/A",
+        "min_sdk": "N/A",
+        "target_sdk": "N/A",
+        "permissions_total": 0,
+        "permissions_dangerous": 0,
+        "activities": 0,
+        "services": 0,
+        "receivers": 0,
+        "file_size": "N/A"
+    }
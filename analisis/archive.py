@@ -0,0 +1,197 @@
+"""
+Lectura del APK sobre un mmap: entradas guardadas sin copia y comprimidas bajo demanda
+"""
+import hashlib
+import io
+import mmap
+import zipfile
+from contextlib import ExitStack, contextmanager
+
+from analisis.streaming import CHUNK_SIZE, iter_entry_chunks, mapped_data_offset
+
+_MADV_DONTNEED = getattr(mmap, "MADV_DONTNEED", None)
+
+
+class _ViewReader(io.RawIOBase):
+    """Fichero de solo lectura sobre una memoryview (una entrada del mmap)"""
+
+    def __init__(self, view, release):
+        super().__init__()
+        self._view = view
+        self._release = release
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        """Como RawIOBase.read, sin reservar mas de lo que queda en la vista"""
+        remaining = max(0, len(self._view) - self._position)
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self._view[self._position:self._position + size].tobytes()
+        self._position += size
+        return data
+
+    def readinto(self, buffer):
+        size = max(0, min(len(buffer), len(self._view) - self._position))
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError("Posicion negativa")
+        self._position = offset
+        return offset
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._release()
+        super().close()
+
+
+class MappedArchive:
+    """
+    APK abierto con memoria acotada por la mayor entrada que se procesa.
+
+    Del zip solo se lee el directorio central; el fichero se mapea en
+    memoria (mmap) y las entradas guardadas sin comprimir se exponen como
+    memoryview del mapeo, sin copiarlas. Las comprimidas se descomprimen
+    bajo demanda en bloques. Al terminar con una entrada guardada sus
+    paginas se devuelven al sistema (MADV_DONTNEED), asi que el RSS no
+    crece con el tamano del APK. Se puede usar desde varios hilos.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fp = open(path, "rb")
+        try:
+            self._zip = zipfile.ZipFile(self._fp)
+            self._map = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._fp.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def infolist(self):
+        return self._zip.infolist()
+
+    def namelist(self):
+        return self._zip.namelist()
+
+    def getinfo(self, name):
+        return self._zip.getinfo(name)
+
+    def _info(self, entry):
+        return entry if isinstance(entry, zipfile.ZipInfo) else self._zip.getinfo(entry)
+
+    def _release(self, start, end):
+        """Saca del proceso las paginas de [start, end); siguen en la cache de disco"""
+        if _MADV_DONTNEED is None or self._map is None:
+            return
+        start -= start % mmap.PAGESIZE
+        try:
+            self._map.madvise(_MADV_DONTNEED, start, end - start)
+        except (OSError, ValueError):
+            pass
+
+    @contextmanager
+    def view(self, entry):
+        """memoryview del contenido de una entrada guardada sin comprimir"""
+        info = self._info(entry)
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise ValueError(f"{info.filename} no esta guardada sin comprimir")
+        start = mapped_data_offset(self._map, info)
+        end = start + info.file_size
+        if end > len(self._map):
+            raise zipfile.BadZipFile(f"Entrada truncada: {info.filename}")
+        try:
+            with memoryview(self._map) as whole, whole[start:end] as view:
+                yield view
+        finally:
+            self._release(start, end)
+
+    def open(self, entry):
+        """
+        Fichero de lectura de una entrada: sobre la vista del mmap si esta
+        guardada, o el descompresor de zipfile si no.
+        """
+        info = self._info(entry)
+        if info.compress_type != zipfile.ZIP_STORED:
+            return self._zip.open(info)
+        stack = ExitStack()
+        view = stack.enter_context(self.view(info))
+        return _ViewReader(view, stack.close)
+
+    def read(self, entry):
+        """Contenido completo de una entrada (una copia del tamano de la entrada)"""
+        info = self._info(entry)
+        if info.compress_type != zipfile.ZIP_STORED:
+            return self._zip.read(info)
+        with self.view(info) as view:
+            return bytes(view)
+
+    def raw_digest(self, entry, chunk_size=CHUNK_SIZE):
+        """
+        SHA-256 (hex) de los datos de una entrada tal como estan guardados
+        en el zip, sin descomprimir (como raw_entry_digest). A diferencia del
+        CRC32 y el tamano del directorio central, no se puede falsificar
+        para que dos contenidos distintos parezcan iguales.
+        """
+        info = self._info(entry)
+        start = mapped_data_offset(self._map, info)
+        end = start + info.compress_size
+        if end > len(self._map):
+            raise zipfile.BadZipFile(f"Entrada truncada: {info.filename}")
+        digest = hashlib.sha256()
+        try:
+            with memoryview(self._map) as whole:
+                for offset in range(start, end, chunk_size):
+                    with whole[offset:min(offset + chunk_size, end)] as chunk:
+                        digest.update(chunk)
+        finally:
+            self._release(start, end)
+        return digest.hexdigest()
+
+    def iter_chunks(self, entry, chunk_size=CHUNK_SIZE):
+        """
+        Contenido de una entrada en bloques de hasta chunk_size bytes: vistas
+        del mmap si esta guardada (validas solo hasta pedir el siguiente
+        bloque) o bytes descomprimidos.
+        """
+        info = self._info(entry)
+        if info.compress_type != zipfile.ZIP_STORED:
+            yield from iter_entry_chunks(self._zip, info, chunk_size)
+            return
+        with self.view(info) as view:
+            for offset in range(0, len(view), chunk_size):
+                with view[offset:offset + chunk_size] as chunk:
+                    yield chunk
+
+    def close(self):
+        """Cierra el mapeo, el zip y el fichero"""
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Quedan vistas vivas: el mapeo se libera al recolectarlas
+                pass
+            self._map = None
+        self._zip.close()
+        self._fp.close()
@@ -0,0 +1,263 @@
+"""
+Analisis por lotes desde linea de comandos con salida JSONL
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from analisis.analisis_estatico import RULES, RULESET_VERSION, analyze, quick_analyze
+from analisis.ai_classifier import classify_risk
+from analisis.entry_cache import SharedEntryCache
+from analisis.incremental import PackageEntryCache
+from analisis.models import severity_counts
+
+BATCH_WORKERS = int(os.environ.get("DSA_WORKERS", os.cpu_count() or 2))
+# Trabajos enviados al pool por cada worker antes de esperar resultados
+IN_FLIGHT_PER_WORKER = 4
+# Tamano maximo de la carpeta de --incremental (expulsion LRU)
+ENTRY_CACHE_MAX_SIZE = int(os.environ.get("DSA_ENTRY_CACHE_MAX_SIZE", 64 * 1024 * 1024))
+# Resultados maximos en la base de --shared-cache (expulsion LRU)
+SHARED_CACHE_MAX_ENTRIES = int(os.environ.get("DSA_SHARED_CACHE_MAX_ENTRIES", 200000))
+
+
+def collect_apks(targets):
+    """
+    Expande directorios (recursivos), globs y ficheros en una lista de APKs
+    sin duplicados, en orden estable. Las rutas se devuelven absolutas.
+    """
+    paths = []
+    seen = set()
+
+    def add(path):
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            paths.append(path)
+
+    for target in targets:
+        if os.path.isdir(target):
+            for root, dirs, files in os.walk(target):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".apk"):
+                        add(os.path.join(root, name))
+        elif glob.has_magic(target):
+            for path in sorted(glob.glob(target, recursive=True)):
+                if os.path.isfile(path):
+                    add(path)
+        elif os.path.isfile(target):
+            add(target)
+        else:
+            print(f"Aviso: no existe {target}", file=sys.stderr)
+
+    return paths
+
+
+def scan_apk(apk_path, quick=False, rules=None, entry_cache=None, shared_cache=None):
+    """
+    Analiza un APK y devuelve el registro que se escribe como linea JSON.
+    rules limita el analisis a esos nombres de regla; con entry_cache solo
+    se escanean las entradas que cambiaron desde la version previa, y con
+    shared_cache tampoco las ya escaneadas en otros APKs.
+    """
+    start = time.perf_counter()
+    if quick:
+        metadata, vulnerabilities = quick_analyze(apk_path)
+    elif entry_cache is not None or shared_cache is not None:
+        metadata, vulnerabilities = analyze(
+            apk_path, rules or "full", entry_cache=entry_cache, shared_cache=shared_cache
+        )
+    elif rules:
+        metadata, vulnerabilities = analyze(apk_path, rules)
+    else:
+        metadata, vulnerabilities = analyze(apk_path)
+    counts = severity_counts(vulnerabilities)
+    return {
+        "path": apk_path,
+        "size": os.path.getsize(apk_path),
+        "ruleset": RULESET_VERSION,
+        "metadata": metadata,
+        "vulnerabilities": vulnerabilities,
+        "risk": classify_risk(vulnerabilities, counts),
+        "counts": dict(counts),
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+
+def load_completed(output_path):
+    """
+    Rutas ya registradas en un fichero JSONL previo.
+
+    Una ultima linea incompleta (proceso interrumpido a mitad de escritura)
+    se elimina del fichero para poder seguir anadiendo registros.
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+
+    completed = set()
+    for line in data[:end].splitlines():
+        try:
+            completed.add(json.loads(line)["path"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return completed
+
+
+def _init_worker():
+    """Silencia el log de depuracion de androguard en los procesos worker"""
+    try:
+        from loguru import logger
+    except ImportError:
+        return
+    logger.remove()
+
+
+def run_batch(paths, out, workers=BATCH_WORKERS, quick=False,
+              executor_factory=ProcessPoolExecutor, rules=None, entry_cache=None,
+              shared_cache=None):
+    """
+    Reparte los APKs en un pool de procesos y escribe en out una linea
+    JSON por APK segun va terminando. Devuelve el resumen del lote.
+
+    Si un worker muere (crash, OOM killer), los APKs que el pool tenia en
+    curso se registran como errores (BrokenProcessPool) y el lote sigue en
+    un pool nuevo.
+    """
+    start = time.perf_counter()
+    summary = {"apks": 0, "errors": 0, "bytes": 0}
+    pending = iter(paths)
+    in_flight = {}
+
+    def record(path, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"path": path, "error": f"{type(e).__name__}: {e}"}
+            summary["errors"] += 1
+        else:
+            summary["bytes"] += result["size"]
+        summary["apks"] += 1
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    def submit(path):
+        return executor.submit(scan_apk, path, quick, rules, entry_cache, shared_cache)
+
+    executor = executor_factory(max_workers=workers, initializer=_init_worker)
+    try:
+        while True:
+            while len(in_flight) < workers * IN_FLIGHT_PER_WORKER:
+                path = next(pending, None)
+                if path is None:
+                    break
+                try:
+                    future = submit(path)
+                except BrokenProcessPool:
+                    # Sus trabajos en curso ya fallaron con BrokenProcessPool
+                    # y se registran como errores al recogerlos
+                    executor.shutdown(wait=False)
+                    executor = executor_factory(max_workers=workers, initializer=_init_worker)
+                    future = submit(path)
+                in_flight[future] = path
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                record(in_flight.pop(future), future)
+    finally:
+        executor.shutdown()
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def format_summary(summary):
+    """Resumen de rendimiento: APKs/s y MB/s"""
+    seconds = max(summary["seconds"], 1e-9)
+    megabytes = summary["bytes"] / (1024 * 1024)
+    return (
+        f"{summary['apks']} APKs ({summary['errors']} errores), "
+        f"{megabytes:.1f} MB en {summary['seconds']:.1f} s: "
+        f"{summary['apks'] / seconds:.2f} APKs/s, {megabytes / seconds:.2f} MB/s"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m analisis",
+        description="Analiza APKs por lotes y escribe una linea JSON por APK"
+    )
+    parser.add_argument("targets", nargs="+", help="Directorios, globs o ficheros APK")
+    parser.add_argument("-o", "--output", default="-",
+                        help="Fichero JSONL de salida (por defecto stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=BATCH_WORKERS,
+                        help="Procesos worker (por defecto DSA_WORKERS o nº de CPUs)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Omite los APKs ya presentes en el fichero de salida")
+    parser.add_argument("--quick", action="store_true",
+                        help="Analisis rapido: solo AndroidManifest.xml")
+    parser.add_argument("--rules",
+                        help="Reglas a ejecutar separadas por comas "
+                             f"({', '.join(RULES.names())})")
+    parser.add_argument("--incremental", metavar="CARPETA",
+                        help="Reutiliza los resultados por entrada de la version previa "
+                             "de cada paquete guardados en CARPETA")
+    parser.add_argument("--shared-cache", metavar="RUTA",
+                        help="Base SQLite con resultados por entrada compartidos entre APKs")
+    args = parser.parse_args(argv)
+
+    if args.resume and args.output == "-":
+        parser.error("--resume necesita --output")
+    if args.workers < 1:
+        parser.error("--workers debe ser al menos 1")
+    rules = None
+    if args.rules:
+        if args.quick:
+            parser.error("--rules y --quick son incompatibles")
+        rules = [name.strip() for name in args.rules.split(",") if name.strip()]
+        unknown = [name for name in rules if name not in RULES]
+        if unknown:
+            parser.error(f"reglas desconocidas: {', '.join(unknown)}")
+
+    entry_cache = None
+    if args.incremental:
+        if args.quick:
+            parser.error("--incremental y --quick son incompatibles")
+        entry_cache = PackageEntryCache(args.incremental, ENTRY_CACHE_MAX_SIZE, RULESET_VERSION)
+    shared_cache = None
+    if args.shared_cache:
+        if args.quick:
+            parser.error("--shared-cache y --quick son incompatibles")
+        shared_cache = SharedEntryCache(args.shared_cache, SHARED_CACHE_MAX_ENTRIES, RULESET_VERSION)
+
+    paths = collect_apks(args.targets)
+    if args.resume:
+        completed = load_completed(args.output)
+        skipped = len(paths)
+        paths = [path for path in paths if path not in completed]
+        skipped -= len(paths)
+        if skipped:
+            print(f"Reanudando: {skipped} APKs ya analizados", file=sys.stderr)
+
+    if args.output == "-":
+        summary = run_batch(paths, sys.stdout, args.workers, args.quick,
+                            rules=rules, entry_cache=entry_cache, shared_cache=shared_cache)
+    else:
+        with open(args.output, "a" if args.resume else "w", encoding="utf-8") as out:
+            summary = run_batch(paths, out, args.workers, args.quick,
+                                rules=rules, entry_cache=entry_cache,
+                                shared_cache=shared_cache)
+
+    print(format_summary(summary), file=sys.stderr)
+    return 1 if summary["errors"] else 0
@@ -0,0 +1,114 @@
+"""
+Presupuesto de tiempo de un analisis y de cada detector
+"""
+import threading
+import time
+
+
+class BudgetExceeded(Exception):
+    """Se agoto el tiempo del analisis o del detector en curso"""
+
+    def __init__(self, stage):
+        super().__init__(f"Tiempo agotado en {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Instante limite en segundos de time.monotonic, o sin limite si at es
+    None. Se puede enviar a procesos worker: el reloj monotono es comun a
+    todo el sistema.
+    """
+
+    __slots__ = ("at",)
+
+    def __init__(self, at=None):
+        self.at = at
+
+    @classmethod
+    def after(cls, seconds):
+        """Limite dentro de seconds segundos; sin limite si es 0 o None"""
+        return cls(time.monotonic() + seconds if seconds else None)
+
+    def earliest(self, other):
+        """El mas restrictivo de los dos limites"""
+        if self.at is None:
+            return other
+        if other.at is None or self.at <= other.at:
+            return self
+        return other
+
+    def remaining(self):
+        """Segundos restantes (nunca negativos), o None sin limite"""
+        if self.at is None:
+            return None
+        return max(0.0, self.at - time.monotonic())
+
+    def expired(self):
+        return self.at is not None and time.monotonic() >= self.at
+
+
+class Budget:
+    """
+    Presupuesto de tiempo de un analisis: un plazo total (deadline) y
+    detector_timeout segundos por detector, sin superar el total.
+
+    Los detectores llaman a check() entre entradas del APK; si su plazo
+    paso se lanza BudgetExceeded y la etapa queda en skipped. Un detector
+    que sigue ocupado dentro de una sola entrada no se interrumpe, pero el
+    analisis deja de esperarlo al vencer el plazo total (ver
+    _run_detectors).
+    """
+
+    def __init__(self, deadline=None, detector_timeout=None):
+        self.deadline = deadline if deadline is not None else Deadline()
+        self.detector_timeout = detector_timeout
+        self._skipped = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def start(cls, timeout=None, detector_timeout=None):
+        """Presupuesto que empieza ahora; 0 o None es sin limite"""
+        return cls(Deadline.after(timeout), detector_timeout)
+
+    def current_deadline(self):
+        """Plazo del detector en curso en este hilo, o el total"""
+        return getattr(self._local, "deadline", self.deadline)
+
+    def run(self, name, detector, context):
+        """
+        Ejecuta detector(context) con su plazo. Si no llega a empezar o
+        lanza BudgetExceeded devuelve [] y la etapa queda omitida.
+        """
+        if self.deadline.expired():
+            self.skip(name)
+            return []
+        self._local.stage = name
+        self._local.deadline = self.deadline.earliest(Deadline.after(self.detector_timeout))
+        try:
+            return detector(context)
+        except BudgetExceeded:
+            self.skip(name)
+            return []
+        finally:
+            del self._local.stage, self._local.deadline
+
+    def check(self):
+        """Punto de control: lanza BudgetExceeded si vencio el plazo en curso"""
+        if self.current_deadline().expired():
+            stage = getattr(self._local, "stage", "analisis")
+            self.skip(stage)
+            raise BudgetExceeded(stage)
+
+    def skip(self, stage):
+        """Anota una etapa que no se completo"""
+        with self._lock:
+            self._skipped.add(stage)
+
+    def skipped(self, order=()):
+        """Etapas omitidas, en el orden de order y despues el resto ordenado"""
+        with self._lock:
+            skipped = set(self._skipped)
+        first = [stage for stage in order if stage in skipped]
+        return first + sorted(skipped - set(first))
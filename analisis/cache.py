@@ -0,0 +1,91 @@
+"""
+Cache persistente de resultados indexada por el SHA-256 del APK
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path):
+    """Calcula el SHA-256 de un fichero leyendo por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache en disco de analisis completos (metadata, hallazgos, riesgo y recuentos).
+
+    Cada entrada es un JSON cuyo nombre combina el hash del contenido con la
+    version del conjunto de reglas, de modo que cambiar las reglas invalida
+    la cache. Los aciertos actualizan el mtime y, al superar max_size bytes,
+    se eliminan primero las entradas usadas hace mas tiempo (LRU).
+    """
+
+    def __init__(self, folder, max_size, ruleset_version):
+        self.folder = folder
+        self.max_size = max_size
+        self.ruleset_version = ruleset_version
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.folder, f"{digest}-v{self.ruleset_version}.json")
+
+    def get(self, digest):
+        """Devuelve la entrada cacheada o None si no existe"""
+        path = self._path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, digest, entry):
+        """Guarda una entrada de forma atomica y aplica la politica LRU"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(digest))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Elimina las entradas menos usadas hasta quedar bajo max_size"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            total -= size
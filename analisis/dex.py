@@ -0,0 +1,120 @@
+"""
+Lector minimo de la tabla de strings de ficheros DEX
+"""
+import struct
+
+DEX_MAGIC = b"dex\n"
+HEADER_SIZE = 0x70
+BLOCK_SIZE = 256 * 1024
+_STRING_IDS = struct.Struct("<II")
+_STRING_IDS_OFFSET = 0x38
+_FILE_SIZE = struct.Struct("<I")
+_FILE_SIZE_OFFSET = 0x20
+
+
+class DexFormatError(Exception):
+    """El contenido no es un fichero DEX legible"""
+
+
+def _read_exact(fp, size):
+    data = fp.read(size)
+    if len(data) != size:
+        raise DexFormatError("DEX truncado")
+    return data
+
+
+def decode_mutf8(data):
+    """Decodifica MUTF-8 (nulo como C0 80 y pares suplentes en 3 bytes)"""
+    if data.isascii():
+        return data.decode("ascii")
+    text = data.replace(b"\xc0\x80", b"\x00").decode("utf-8", errors="surrogatepass")
+    try:
+        return text.encode("utf-16-le", errors="surrogatepass").decode("utf-16-le")
+    except UnicodeDecodeError:
+        return text.encode("utf-16-le", errors="surrogatepass").decode("utf-16-le", errors="replace")
+
+
+class _BlockReader:
+    """Ventana deslizante sobre un flujo que solo avanza, leida por bloques"""
+
+    def __init__(self, fp, position, block_size):
+        self.fp = fp
+        self.block_size = block_size
+        self.base = position  # offset absoluto de buf[0]
+        self.position = position
+        self.buf = b""
+
+    def _fill(self):
+        """Descarta lo ya consumido y anade un bloque al buffer"""
+        block = self.fp.read(self.block_size)
+        if not block:
+            raise DexFormatError("DEX truncado")
+        self.buf = self.buf[self.position - self.base:] + block
+        self.base = self.position
+
+    def advance(self, offset):
+        """Avanza hasta el offset absoluto indicado"""
+        if offset > self.base + len(self.buf):
+            self.fp.seek(offset)
+            self.base, self.buf = offset, b""
+        self.position = offset
+
+    def read_string_data(self):
+        """Lee un string_data_item: longitud uleb128 y bytes MUTF-8 hasta el nulo"""
+        # La longitud en unidades UTF-16 no hace falta: MUTF-8 nunca contiene
+        # bytes nulos salvo el terminador
+        start = self.position - self.base
+        end = self.buf.find(b"\x00", start)
+        while end < 0:
+            searched = len(self.buf) - (self.position - self.base)
+            self._fill()
+            end = self.buf.find(b"\x00", searched)
+        start = self.position - self.base
+
+        index = start
+        while self.buf[index] >= 0x80:
+            index += 1
+            if index - start >= 5:
+                raise DexFormatError("uleb128 invalido")
+
+        self.position = self.base + end + 1
+        return decode_mutf8(self.buf[index + 1:end])
+
+
+def iter_dex_strings(fp, block_size=BLOCK_SIZE, size=None):
+    """
+    Recorre string_ids y devuelve cada constante de string del DEX.
+
+    fp solo necesita read() y seek() hacia delante (por ejemplo una entrada
+    abierta con ZipFile.open): los string_data se visitan ordenados por
+    offset y se leen en bloques de block_size, asi que el DEX se recorre una
+    unica vez de principio a fin sin cargarlo entero en memoria. Las tablas
+    deben caber en el file_size de la cabecera y en size (tamano real de la
+    entrada, si se conoce): una cabecera manipulada da DexFormatError en
+    lugar de reservar memoria para millones de string_ids inexistentes.
+    """
+    header = _read_exact(fp, HEADER_SIZE)
+    if not header.startswith(DEX_MAGIC):
+        raise DexFormatError("Cabecera DEX no reconocida")
+
+    limit, = _FILE_SIZE.unpack_from(header, _FILE_SIZE_OFFSET)
+    if size is not None:
+        limit = min(limit, size)
+    string_ids_size, string_ids_off = _STRING_IDS.unpack_from(header, _STRING_IDS_OFFSET)
+    if string_ids_size == 0:
+        return
+    if string_ids_off < HEADER_SIZE or string_ids_off + 4 * string_ids_size > limit:
+        raise DexFormatError("string_ids fuera de rango")
+
+    fp.seek(string_ids_off)
+    raw_ids = _read_exact(fp, 4 * string_ids_size)
+    offsets = sorted(set(struct.unpack(f"<{string_ids_size}I", raw_ids)))
+    if offsets[-1] >= limit:
+        raise DexFormatError("string_data fuera de rango")
+
+    reader = _BlockReader(fp, string_ids_off + len(raw_ids), block_size)
+    for offset in offsets:
+        if offset < reader.position:
+            raise DexFormatError("string_data solapado")
+        reader.advance(offset)
+        yield reader.read_string_data()
@@ -0,0 +1,152 @@
+"""
+Cache global de resultados por entrada del zip, compartida entre APKs (SQLite, modo WAL)
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zipfile
+
+from analisis.streaming import entry_data_offset
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    rule TEXT NOT NULL,
+    crc INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    ruleset TEXT NOT NULL,
+    value TEXT NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (rule, crc, size, digest, ruleset)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_used ON entries (used);
+"""
+
+BUSY_TIMEOUT = 10.0
+READ_CHUNK_SIZE = 1024 * 1024
+# Entradas mas pequenas (descomprimidas) se escanean sin consultar la cache
+MIN_ENTRY_SIZE = 4096
+
+
+def raw_entry_digest(fp, info, chunk_size=READ_CHUNK_SIZE):
+    """
+    SHA-256 de los datos tal como estan guardados en el zip (comprimidos o
+    no), leidos de fp sin descomprimir.
+    """
+    fp.seek(entry_data_offset(fp, info))
+
+    digest = hashlib.sha256()
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = fp.read(min(chunk_size, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Entrada truncada: {info.filename}")
+        digest.update(chunk)
+        remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+class SharedEntryCache:
+    """
+    Resultados de reglas por contenido de entrada, compartidos por todos los
+    analisis (p. ej. los mismos recursos de Play Services o segmentos DEX
+    de OkHttp en muchas apps).
+
+    La clave es (regla, CRC32, tamano descomprimido, SHA-256 de los datos
+    guardados, version de reglas): el hash se calcula sobre los bytes
+    comprimidos, por lo que un acierto no descomprime ni escanea la
+    entrada. Se conservan como maximo max_entries resultados, expulsando
+    primero los usados hace mas tiempo (LRU). Las entradas de menos de
+    min_size bytes no compensan la consulta y no se cachean. Cada hilo usa
+    su propia conexion; el objeto se puede enviar a procesos worker.
+    """
+
+    def __init__(self, db_path, max_entries, ruleset_version, min_size=MIN_ENTRY_SIZE):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ruleset_version = ruleset_version
+        self.min_size = min_size
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def __getstate__(self):
+        return {
+            "db_path": self.db_path,
+            "max_entries": self.max_entries,
+            "ruleset_version": self.ruleset_version,
+            "min_size": self.min_size,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, rule, crc, size, digest):
+        """Resultado guardado para esa entrada, o None"""
+        row = self._connect().execute(
+            "SELECT value FROM entries"
+            " WHERE rule = ? AND crc = ? AND size = ? AND digest = ? AND ruleset = ?",
+            (rule, crc, size, digest, self.ruleset_version)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, used, results):
+        """
+        Marca como usadas las claves (regla, crc, tamano, hash) de used,
+        guarda los resultados nuevos [(regla, crc, tamano, hash, valor)] en
+        una sola transaccion y aplica la politica LRU.
+        """
+        if not used and not results:
+            return
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE entries SET used = ?"
+                " WHERE rule = ? AND crc = ? AND size = ? AND digest = ? AND ruleset = ?",
+                [(now,) + tuple(key) + (self.ruleset_version,) for key in used]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (rule, crc, size, digest, ruleset, value, used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (rule, crc, size, digest, self.ruleset_version, json.dumps(value), now)
+                    for rule, crc, size, digest, value in results
+                ]
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        excess = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM entries WHERE rowid IN"
+                " (SELECT rowid FROM entries ORDER BY used LIMIT ?)",
+                (excess,)
+            )
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        """Cierra la conexion del hilo actual"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,183 @@
+"""
+Historial de analisis en SQLite (modo WAL) con migracion desde history.json
+"""
+import json
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL DEFAULT '',
+    filename TEXT,
+    app_name TEXT,
+    package TEXT,
+    risk TEXT,
+    vulns_high INTEGER NOT NULL DEFAULT 0,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_package ON history (package);
+CREATE INDEX IF NOT EXISTS idx_history_risk ON history (risk);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+BUSY_TIMEOUT = 10.0
+
+
+class HistoryStore:
+    """
+    Historial persistente de analisis, del mas reciente al mas antiguo.
+
+    Cada entrada se guarda completa como JSON junto a las columnas
+    indexadas (timestamp, package, risk) que se usan para filtrar. Anadir
+    una entrada es un INSERT, sin reescribir el historial ni limite de
+    entradas. WAL permite lectores concurrentes con un escritor, tambien
+    desde varios procesos. Cada hilo usa su propia conexion.
+    """
+
+    def __init__(self, db_path, legacy_json=None):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        if legacy_json:
+            self._migrate(legacy_json)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, legacy_json):
+        """Importa history.json una sola vez (queda marcado en meta)"""
+        if not os.path.exists(legacy_json):
+            return
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute(
+                "SELECT 1 FROM meta WHERE key = 'migrated_json'"
+            ).fetchone()
+            if not done:
+                with open(legacy_json, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                # El JSON esta ordenado del mas reciente al mas antiguo
+                conn.executemany(
+                    "INSERT INTO history (timestamp, filename, app_name, package, risk, vulns_high, entry)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [self._row(entry) for entry in reversed(entries)]
+                )
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('migrated_json', ?)",
+                    (os.path.abspath(legacy_json),)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _row(entry):
+        return (
+            entry.get("timestamp", ""),
+            entry.get("filename"),
+            entry.get("app_name"),
+            entry.get("package"),
+            entry.get("risk"),
+            entry.get("vulns_high", 0),
+            json.dumps(entry, ensure_ascii=False)
+        )
+
+    def add(self, entry):
+        """Anade una entrada y devuelve su id"""
+        cursor = self._connect().execute(
+            "INSERT INTO history (timestamp, filename, app_name, package, risk, vulns_high, entry)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self._row(entry)
+        )
+        return cursor.lastrowid
+
+    def list(self, limit=None):
+        """Entradas del historial, la mas reciente primero"""
+        query = "SELECT entry FROM history ORDER BY id DESC"
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+        return [json.loads(row[0]) for row in self._connect().execute(query, params)]
+
+    @staticmethod
+    def _where(risk=None, package=None, date_from=None, date_to=None, min_high=None):
+        """Clausula WHERE para los filtros; las fechas son prefijos inclusivos"""
+        clauses = []
+        params = []
+        if risk:
+            clauses.append("risk = ?")
+            params.append(risk)
+        if package:
+            clauses.append("package = ?")
+            params.append(package)
+        if date_from:
+            clauses.append("timestamp >= ?")
+            params.append(date_from)
+        if date_to:
+            # "2025-01-13" incluye todo ese dia: U+FFFF ordena tras cualquier hora
+            clauses.append("timestamp < ?")
+            params.append(date_to + "\uffff")
+        if min_high is not None:
+            clauses.append("vulns_high >= ?")
+            params.append(min_high)
+        return clauses, params
+
+    def page(self, limit, cursor=None, **filters):
+        """
+        Una pagina de entradas filtradas, la mas reciente primero.
+
+        La paginacion es por cursor (keyset sobre el id): devuelve
+        (entradas, cursor) donde cursor se pasa a la siguiente llamada, o
+        es None si no quedan mas entradas. Cada pagina cuesta lo mismo
+        independientemente de lo profunda que sea.
+        """
+        clauses, params = self._where(**filters)
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(cursor)
+
+        query = "SELECT id, entry FROM history"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id DESC LIMIT ?"
+        rows = self._connect().execute(query, params + [limit + 1]).fetchall()
+
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [json.loads(entry) for _, entry in rows[:limit]], next_cursor
+
+    def count(self, **filters):
+        """Numero de entradas que cumplen los filtros (todas si no hay)"""
+        clauses, params = self._where(**filters)
+        query = "SELECT COUNT(*) FROM history"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return self._connect().execute(query, params).fetchone()[0]
+
+    def close(self):
+        """Cierra la conexion del hilo actual"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
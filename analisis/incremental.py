@@ -0,0 +1,206 @@
+"""
+Reanalisis incremental: resultados por entrada del zip de la version previa de cada paquete
+"""
+import hashlib
+import threading
+
+from analisis.cache import ResultCache
+from analisis.entry_cache import raw_entry_digest
+
+
+class PackageEntryCache(ResultCache):
+    """
+    Resultados por entrada de la ultima version analizada de cada paquete.
+
+    Es una ResultCache indexada por el nombre del paquete en lugar del hash
+    del APK: mismo formato en disco, invalidacion por version de reglas y
+    eviccion LRU. Debe usar una carpeta propia.
+    """
+
+    def _path(self, package):
+        digest = hashlib.sha256(package.encode("utf-8")).hexdigest()
+        return super()._path(digest)
+
+
+class EntryResults:
+    """
+    Resultados de las reglas por entrada del zip durante un analisis.
+
+    Una entrada cuyo CRC32, tamano (del directorio central) y hash de sus
+    bytes guardados en apk_path coinciden con los de la version previa del
+    paquete reutiliza su resultado sin descomprimirla ni escanearla (CRC32
+    y tamano solos se pueden falsificar en un APK subido). Si no, se busca
+    en shared_cache (SharedEntryCache, comun a todos los APKs) por el mismo
+    hash. El resto se escanea y se registra. save() guarda la union para la
+    siguiente version y los resultados nuevos en la cache compartida; tras
+    save() o close() los registros de detectores que siguen en marcha
+    (plazo agotado) se descartan sin volver a abrir el APK.
+    """
+
+    def __init__(self, cache, package, infos, shared_cache=None, apk_path=None):
+        self.cache = cache
+        self.package = package
+        self.shared_cache = shared_cache
+        self.apk_path = apk_path
+        self._infos = {info.filename: info for info in infos}
+        previous = cache.get(package) if cache is not None and package else None
+        self._previous = (previous or {}).get("entries", {})
+        self._results = {}
+        self._lock = threading.Lock()
+        self._digests = {}
+        self._digest_lock = threading.Lock()
+        self._fp = None
+        self._closed = False
+        self._shared_used = []
+        self._shared_new = []
+        self.reused = 0
+        self.shared = 0
+        self.scanned = 0
+
+    def _digest(self, name):
+        """SHA-256 de los bytes guardados de la entrada (una vez), o None si no se leen"""
+        with self._digest_lock:
+            if self._closed:
+                return self._digests.get(name)
+            if name not in self._digests:
+                try:
+                    if self._fp is None:
+                        self._fp = open(self.apk_path, "rb")
+                    self._digests[name] = raw_entry_digest(self._fp, self._infos[name])
+                except MemoryError:
+                    raise
+                except Exception:
+                    self._digests[name] = None
+            return self._digests[name]
+
+    def _unchanged(self, name):
+        """Resultados previos de la entrada si no ha cambiado, o None"""
+        info = self._infos.get(name)
+        previous = self._previous.get(name)
+        if info is None or previous is None:
+            return None
+        if previous.get("crc") != info.CRC or previous.get("size") != info.file_size:
+            return None
+        digest = previous.get("digest")
+        if digest is None or digest != self._digest(name):
+            return None
+        return previous.get("results", {})
+
+    def _shared_key(self, rule, name):
+        """Clave de la entrada en la cache compartida, o None si no aplica"""
+        info = self._infos.get(name)
+        if self.shared_cache is None or info is None or info.file_size < self.shared_cache.min_size:
+            return None
+        digest = self._digest(name)
+        if digest is None:
+            return None
+        return (rule, info.CRC, info.file_size, digest)
+
+    def lookup(self, rule, name):
+        """
+        (True, resultado) si la entrada no cambio desde la version previa
+        o su contenido ya se escaneo en otro APK; (False, None) si no.
+        """
+        previous = self._unchanged(name)
+        if previous is not None and rule in previous:
+            with self._lock:
+                self.reused += 1
+            return True, previous[rule]
+
+        key = self._shared_key(rule, name)
+        value = self.shared_cache.get(*key) if key is not None else None
+        if value is None:
+            return False, None
+        with self._lock:
+            self._results.setdefault(name, {})[rule] = value
+            self._shared_used.append(key)
+            self.shared += 1
+        return True, value
+
+    def record(self, rule, name, value):
+        """Registra el resultado (serializable a JSON) de una entrada escaneada"""
+        if self._closed:
+            return
+        key = self._shared_key(rule, name)
+        with self._lock:
+            self._results.setdefault(name, {})[rule] = value
+            if key is not None:
+                self._shared_new.append(key + (value,))
+            self.scanned += 1
+
+    def get(self, rule, name, compute):
+        """Resultado de la entrada: el previo si no cambio, o compute()"""
+        hit, value = self.lookup(rule, name)
+        if hit:
+            return value
+        value = compute()
+        self.record(rule, name, value)
+        return value
+
+    def export(self):
+        """
+        Resultados registrados (y consultas a la cache compartida) desde la
+        ultima llamada, para combinarlos con merge en el EntryResults de
+        otro proceso.
+        """
+        with self._lock:
+            state = {
+                "results": self._results,
+                "shared_used": self._shared_used,
+                "shared_new": self._shared_new,
+                "reused": self.reused,
+                "shared": self.shared,
+                "scanned": self.scanned
+            }
+            self._results, self._shared_used, self._shared_new = {}, [], []
+            self.reused = self.shared = self.scanned = 0
+        return state
+
+    def merge(self, state):
+        """Incorpora el estado devuelto por export en otro proceso"""
+        with self._lock:
+            for name, values in state["results"].items():
+                self._results.setdefault(name, {}).update(values)
+            self._shared_used.extend(state["shared_used"])
+            self._shared_new.extend(state["shared_new"])
+            self.reused += state["reused"]
+            self.shared += state["shared"]
+            self.scanned += state["scanned"]
+
+    def entries(self):
+        """
+        Entradas a guardar: los resultados previos de las entradas sin
+        cambios mas los nuevos, solo para entradas presentes en el APK.
+        """
+        with self._lock:
+            results = {name: dict(values) for name, values in self._results.items()}
+
+        entries = {}
+        for name, info in self._infos.items():
+            merged = dict(self._unchanged(name) or {})
+            merged.update(results.get(name, {}))
+            digest = self._digest(name) if merged else None
+            if digest is not None:
+                entries[name] = {
+                    "crc": info.CRC, "size": info.file_size, "digest": digest, "results": merged
+                }
+        return entries
+
+    def save(self):
+        """Guarda los resultados para la siguiente version del paquete y para otros APKs"""
+        if self.cache is not None and self.package:
+            self.cache.put(self.package, {"package": self.package, "entries": self.entries()})
+        self.close()
+        if self.shared_cache is not None:
+            with self._lock:
+                used, new = self._shared_used, self._shared_new
+                self._shared_used, self._shared_new = [], []
+            self.shared_cache.update(used, new)
+
+    def close(self):
+        """Cierra el APK abierto para calcular hashes; despues record no hace nada"""
+        with self._digest_lock:
+            self._closed = True
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
@@ -0,0 +1,217 @@
+"""
+Cola de trabajos de analisis ejecutada en un pool acotado de procesos
+"""
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from analisis.analisis_estatico import analyze, failed_analysis
+from analisis.ai_classifier import classify_risk
+from analisis.cache import sha256_file
+from analisis.models import severity_counts
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class QueueFullError(Exception):
+    """La cola de analisis alcanzo su capacidad maxima"""
+
+
+def run_analysis(apk_path, filename, result_cache, digest=None, entry_cache=None,
+                 shared_cache=None):
+    """
+    Ejecuta el analisis completo de un APK (pensado para un proceso worker).
+
+    Devuelve un dict con filename, metadata, vulnerabilities, risk y counts
+    (hallazgos por severidad); el informe TXT se genera en streaming a
+    partir de el (ver iter_report).
+    Si el contenido ya esta en la cache no se invoca androguard. digest es
+    el SHA-256 del APK si ya se conoce (calculado durante la subida).
+    Con entry_cache solo se escanean las entradas que cambiaron desde la
+    version previa del mismo paquete, y con shared_cache tampoco las ya
+    escaneadas en otros APKs. Los resultados parciales (metadata["partial"])
+    no se guardan en la cache.
+    """
+    digest = digest or sha256_file(apk_path)
+    cached = result_cache.get(digest)
+
+    if cached:
+        # Entradas antiguas de la cache incluian el informe completo y no
+        # los recuentos
+        cached.pop("report", None)
+        if "counts" not in cached:
+            cached["counts"] = dict(severity_counts(cached["vulnerabilities"]))
+        cached["filename"] = filename
+        return cached
+
+    metadata, vulnerabilities = analyze(
+        apk_path, entry_cache=entry_cache, shared_cache=shared_cache
+    )
+    result = _result(filename, metadata, vulnerabilities)
+    if not metadata.get("partial"):
+        # Un resultado parcial (tiempo agotado) se repite en el siguiente intento
+        result_cache.put(digest, result)
+    return result
+
+
+def crash_result(fn, args, error):
+    """
+    Resultado de un trabajo run_analysis cuyo proceso worker murio o supero
+    sus limites (ver SandboxPool): el hallazgo INFO "Error al analizar APK",
+    como un APK que no se pudo parsear. No se guarda en la cache.
+    """
+    apk_path, filename = args[0], args[1]
+    return _result(filename, *failed_analysis(apk_path, error))
+
+
+def _result(filename, metadata, vulnerabilities):
+    counts = severity_counts(vulnerabilities)
+    return {
+        "filename": filename,
+        "metadata": metadata,
+        "vulnerabilities": vulnerabilities,
+        "risk": classify_risk(vulnerabilities, counts),
+        "counts": dict(counts)
+    }
+
+
+class JobQueue:
+    """
+    Cola acotada de trabajos sobre un executor creado bajo demanda.
+
+    max_pending limita los trabajos en cola o en ejecucion; al superarlo
+    submit lanza QueueFullError. Solo se conservan en memoria los
+    max_finished trabajos terminados mas recientes.
+
+    Con store (una ResultCache indexada por id de trabajo) el estado y el
+    resultado de cada trabajo se guardan tambien en disco, de modo que
+    otros procesos web que comparten la carpeta (o este mismo tras un
+    reinicio) pueden responder por trabajos que no encolaron ellos.
+    """
+
+    def __init__(self, max_workers, max_pending, executor_factory=ProcessPoolExecutor,
+                 max_finished=500, store=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.store = store
+        self._executor_factory = executor_factory
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pending(self):
+        return sum(1 for future in self._jobs.values() if not future.done())
+
+    def depth(self):
+        """Numero de trabajos en cola o en ejecucion"""
+        with self._lock:
+            return self._pending()
+
+    def submit(self, fn, *args, on_done=None):
+        """Encola fn(*args) y devuelve el id del trabajo"""
+        with self._lock:
+            if self._pending() >= self.max_pending:
+                raise QueueFullError(f"Cola llena ({self.max_pending} trabajos)")
+
+            if self._executor is None:
+                self._executor = self._executor_factory(max_workers=self.max_workers)
+
+            job_id = uuid.uuid4().hex
+            if self.store is not None:
+                # Antes de encolar: un trabajo que termina enseguida no debe
+                # quedar sobrescrito como pendiente
+                self.store.put(job_id, {"status": "queued"})
+            future = self._executor.submit(fn, *args)
+            self._jobs[job_id] = future
+            self._trim()
+
+        if on_done is not None or self.store is not None:
+            def callback(f):
+                try:
+                    if on_done is not None and not f.cancelled() and f.exception() is None:
+                        on_done(job_id, f.result())
+                finally:
+                    self._persist(job_id, f)
+            future.add_done_callback(callback)
+
+        return job_id
+
+    def _persist(self, job_id, future):
+        """Guarda en store el estado final de un trabajo"""
+        if self.store is None:
+            return
+        error = _future_error(future)
+        if error is None:
+            record = {"status": "done", "result": future.result()}
+        else:
+            record = {"status": "error", "error": error}
+        self.store.put(job_id, record)
+
+    def _stored(self, job_id):
+        """Registro guardado en store para job_id, o None"""
+        if self.store is None or not _JOB_ID.fullmatch(job_id):
+            return None
+        return self.store.get(job_id)
+
+    def _trim(self):
+        finished = [job_id for job_id, future in self._jobs.items() if future.done()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def status(self, job_id):
+        """Estado del trabajo como dict, o None si el id no existe"""
+        with self._lock:
+            future = self._jobs.get(job_id)
+            depth = self._pending()
+
+        if future is None:
+            record = self._stored(job_id)
+            if record is None:
+                return None
+            state, error = record.get("status"), record.get("error")
+        elif future.done():
+            error = _future_error(future)
+            state = "done" if error is None else "error"
+        elif future.running():
+            state, error = "running", None
+        else:
+            state, error = "queued", None
+
+        status = {
+            "id": job_id,
+            "status": state,
+            "queue_depth": depth,
+            "workers": self.max_workers
+        }
+        if state == "error":
+            status["error"] = error
+        return status
+
+    def result(self, job_id):
+        """Resultado de un trabajo terminado, o None si no esta disponible"""
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is None:
+            record = self._stored(job_id)
+            return record.get("result") if record else None
+        if not future.done() or _future_error(future) is not None:
+            return None
+        return future.result()
+
+    def shutdown(self, wait=True):
+        """Detiene el executor subyacente"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def _future_error(future):
+    """Mensaje de error de un future terminado, o None si acabo bien"""
+    if future.cancelled():
+        return "Cancelado"
+    error = future.exception()
+    return None if error is None else str(error)
@@ -0,0 +1,166 @@
+"""
+Lectura del AndroidManifest.xml: indice de componentes en una sola pasada
+y vista ligera del manifest para el analisis rapido
+"""
+import zipfile
+from androguard.core.axml import AXMLPrinter
+
+NS_ANDROID = "{http://schemas.android.com/apk/res/android}"
+
+COMPONENT_TAGS = ("activity", "activity-alias", "service", "receiver", "provider")
+
+
+def _android_attribute(element, name):
+    """Valor de android:name con fallback al atributo sin namespace"""
+    value = element.get(NS_ANDROID + name)
+    if value is None:
+        value = element.get(name)
+    return value
+
+
+def format_component_name(package, name):
+    """Completa nombres relativos (".Main" o "Main") con el paquete"""
+    if name and package:
+        dot = name.find(".")
+        if dot == 0:
+            return package + name
+        if dot == -1:
+            return package + "." + name
+    return name
+
+
+def build_component_index(root, package):
+    """
+    Recorre el manifest una vez y devuelve {tipo: {nombre: info}}.
+
+    info contiene exported ("true", "false" o None si no se declara),
+    intent_filters (numero de <intent-filter>) y permission. Los nombres
+    se normalizan con el paquete, igual que androguard, y se conservan en
+    orden de aparicion; si un nombre se repite gana la primera declaracion.
+    """
+    index = {tag: {} for tag in COMPONENT_TAGS}
+
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue
+        if tag.startswith(NS_ANDROID):
+            tag = tag[len(NS_ANDROID):]
+        if tag not in index:
+            continue
+
+        name = _android_attribute(element, "name")
+        if name is None:
+            continue
+        name = format_component_name(package, name)
+        if name in index[tag]:
+            continue
+
+        index[tag][name] = {
+            "exported": _android_attribute(element, "exported"),
+            "intent_filters": sum(1 for child in element if child.tag == "intent-filter"),
+            "permission": _android_attribute(element, "permission"),
+        }
+
+    return index
+
+
+class ManifestError(Exception):
+    """El AndroidManifest.xml no se pudo decodificar"""
+
+
+class ManifestView:
+    """
+    Vista minima, compatible con los metodos de APK de androguard que usan
+    los detectores de manifest, construida solo con AndroidManifest.xml.
+
+    No recorre el archivo ni decodifica resources.arsc: solo se extrae la
+    entrada del manifest a partir del directorio central del zip.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.package = root.get("package") or ""
+        self._index = None
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decodifica el XML binario (AXML) del manifest"""
+        printer = AXMLPrinter(data)
+        if not printer.is_valid():
+            raise ManifestError("AndroidManifest.xml no es AXML valido")
+        root = printer.get_xml_obj()
+        if root is None or root.tag != "manifest":
+            raise ManifestError("AndroidManifest.xml no empieza con <manifest>")
+        return cls(root)
+
+    @classmethod
+    def from_apk_file(cls, apk_path):
+        """Lee solo la entrada AndroidManifest.xml del APK"""
+        with zipfile.ZipFile(apk_path) as zf:
+            return cls.from_bytes(zf.read("AndroidManifest.xml"))
+
+    def _tags(self, tag_name):
+        if self.root.tag == tag_name:
+            return [self.root]
+        return [
+            element for element in self.root.iter()
+            if element.tag in (tag_name, NS_ANDROID + tag_name)
+        ]
+
+    def _components(self, comp_type):
+        if self._index is None:
+            self._index = build_component_index(self.root, self.package)
+        return list(self._index[comp_type])
+
+    def get_android_manifest_xml(self):
+        return self.root
+
+    def get_package(self):
+        return self.package
+
+    def get_attribute_value(self, tag_name, attribute):
+        for element in self._tags(tag_name):
+            value = _android_attribute(element, attribute)
+            if value is not None:
+                return value
+        return None
+
+    def get_androidversion_code(self):
+        return self.get_attribute_value("manifest", "versionCode")
+
+    def get_androidversion_name(self):
+        return self.get_attribute_value("manifest", "versionName")
+
+    def get_min_sdk_version(self):
+        return self.get_attribute_value("uses-sdk", "minSdkVersion")
+
+    def get_target_sdk_version(self):
+        return self.get_attribute_value("uses-sdk", "targetSdkVersion")
+
+    def get_permissions(self):
+        permissions = []
+        for element in self._tags("uses-permission"):
+            name = _android_attribute(element, "name")
+            if name is not None and name not in permissions:
+                permissions.append(name)
+        return permissions
+
+    def get_activities(self):
+        return self._components("activity")
+
+    def get_services(self):
+        return self._components("service")
+
+    def get_receivers(self):
+        return self._components("receiver")
+
+    def get_app_name(self):
+        """Etiqueta literal; las referencias a recursos no se resuelven"""
+        label = self.get_attribute_value("application", "label")
+        if label is None or label.startswith("@"):
+            return ""
+        return label
+
+    def get_files(self):
+        return []
@@ -0,0 +1,14 @@
+"""
+Recuentos de los hallazgos de un analisis (dicts con los ocho campos historicos)
+"""
+from collections import Counter
+
+DEFAULT_SEVERITY = "MEDIUM"
+
+
+def severity_counts(vulnerabilities):
+    """
+    Recuentos por severidad de los hallazgos, en una pasada. Un hallazgo
+    sin severidad (o con None) cuenta como DEFAULT_SEVERITY.
+    """
+    return Counter(v.get("severity") or DEFAULT_SEVERITY for v in vulnerabilities)
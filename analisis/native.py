@@ -0,0 +1,60 @@
+"""
+Extraccion de strings imprimibles de librerias nativas (.so) con memoria acotada
+"""
+import re
+import zipfile
+
+from analisis.streaming import CHUNK_SIZE
+
+# Longitud de los strings imprimibles extraidos; los mas largos se trocean
+PRINTABLE_MIN_LENGTH = 6
+PRINTABLE_MAX_LENGTH = 4096
+
+_PRINTABLE_RE = re.compile(
+    rb"[\x20-\x7e]{%d,%d}" % (PRINTABLE_MIN_LENGTH, PRINTABLE_MAX_LENGTH)
+)
+
+
+def _printable_tail(buf):
+    """Inicio del string imprimible al final de buf (a lo sumo PRINTABLE_MAX_LENGTH)"""
+    start = len(buf)
+    limit = max(0, start - PRINTABLE_MAX_LENGTH)
+    while start > limit and 0x20 <= buf[start - 1] <= 0x7e:
+        start -= 1
+    return start
+
+
+def iter_printable_strings(chunks):
+    """
+    Strings ASCII imprimibles (como `strings`) de un flujo de bloques de
+    bytes o memoryviews.
+
+    Solo se copia cada string encontrado, como maximo PRINTABLE_MAX_LENGTH
+    bytes, y el final de bloque que puede continuar en el siguiente; un
+    bloque que es una vista de un mmap se escanea sin copiarlo.
+    """
+    carry = b""
+    for chunk in chunks:
+        buf = carry + chunk if carry else chunk
+        end = len(buf)
+        tail = _printable_tail(buf)
+        if end - tail >= PRINTABLE_MAX_LENGTH:
+            tail = end
+        for match in _PRINTABLE_RE.finditer(buf, 0, tail):
+            yield match.group()
+        carry = bytes(buf[tail:])
+    if len(carry) >= PRINTABLE_MIN_LENGTH:
+        yield carry
+
+
+def iter_library_strings(archive, info, chunk_size=CHUNK_SIZE):
+    """
+    Strings imprimibles de una libreria de un MappedArchive: las guardadas
+    sin comprimir se escanean sobre la vista del mmap sin copia; las
+    comprimidas se descomprimen en bloques de chunk_size.
+    """
+    if info.compress_type == zipfile.ZIP_STORED:
+        with archive.view(info) as view:
+            yield from iter_printable_strings((view,))
+    else:
+        yield from iter_printable_strings(archive.iter_chunks(info, chunk_size))
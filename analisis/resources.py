@@ -0,0 +1,273 @@
+"""
+Resolucion puntual de strings de resources.arsc sin decodificar la tabla completa
+"""
+import struct
+import threading
+import zipfile
+from collections import OrderedDict
+
+RES_STRING_POOL_TYPE = 0x0001
+RES_TABLE_TYPE = 0x0002
+RES_TABLE_PACKAGE_TYPE = 0x0200
+RES_TABLE_TYPE_TYPE = 0x0201
+
+UTF8_FLAG = 0x0100
+TYPE_FLAG_SPARSE = 0x01
+TYPE_FLAG_OFFSET16 = 0x02
+ENTRY_FLAG_COMPLEX = 0x0001
+ENTRY_FLAG_COMPACT = 0x0008
+NO_ENTRY = 0xFFFFFFFF
+NO_ENTRY16 = 0xFFFF
+
+TYPE_REFERENCE = 0x01
+TYPE_STRING = 0x03
+
+MAX_REFERENCE_DEPTH = 8
+# Tablas (por hash de los bytes guardados de resources.arsc) con strings ya resueltos
+CACHE_SIZE = 256
+
+_CHUNK = struct.Struct("<HHI")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+
+class ResourceFormatError(Exception):
+    """resources.arsc no tiene el formato esperado"""
+
+
+def parse_resource_id(value):
+    """Convierte "@7F0B0001" o "@pkg:7F0B0001" en (id, paquete o None)"""
+    if not value.startswith("@"):
+        raise ValueError(f"No es una referencia a recurso: {value!r}")
+    package, _, res_id = value[1:].rpartition(":")
+    if len(res_id) != 8:
+        raise ValueError(f"Id de recurso invalido: {value!r}")
+    return int(res_id, 16), package or None
+
+
+class StringPool:
+    """Pool de strings que solo decodifica los indices que se piden"""
+
+    def __init__(self, data, offset):
+        chunk_type, header_size, size = _CHUNK.unpack_from(data, offset)
+        if chunk_type != RES_STRING_POOL_TYPE:
+            raise ResourceFormatError("Se esperaba un string pool")
+        count, _, flags, strings_start, _ = struct.unpack_from("<IIIII", data, offset + 8)
+        self.data = data
+        self.count = count
+        self.utf8 = bool(flags & UTF8_FLAG)
+        self._offsets_at = offset + header_size
+        self._strings_at = offset + strings_start
+        self._decoded = {}
+
+    def _length8(self, pos):
+        first = self.data[pos]
+        if first & 0x80:
+            return ((first & 0x7F) << 8) | self.data[pos + 1], pos + 2
+        return first, pos + 1
+
+    def _length16(self, pos):
+        (first,) = _U16.unpack_from(self.data, pos)
+        if first & 0x8000:
+            (second,) = _U16.unpack_from(self.data, pos + 2)
+            return ((first & 0x7FFF) << 16) | second, pos + 4
+        return first, pos + 2
+
+    def get(self, index):
+        """Decodifica el string index (solo la primera vez)"""
+        value = self._decoded.get(index)
+        if value is not None:
+            return value
+        if not 0 <= index < self.count:
+            raise ResourceFormatError(f"Indice de string fuera de rango: {index}")
+
+        (relative,) = _U32.unpack_from(self.data, self._offsets_at + 4 * index)
+        pos = self._strings_at + relative
+        if self.utf8:
+            # Longitud en UTF-16 (se ignora) seguida de la longitud en bytes
+            _, pos = self._length8(pos)
+            length, pos = self._length8(pos)
+            value = bytes(self.data[pos:pos + length]).decode("utf-8", errors="replace")
+        else:
+            length, pos = self._length16(pos)
+            value = bytes(self.data[pos:pos + 2 * length]).decode("utf-16-le", errors="replace")
+
+        self._decoded[index] = value
+        return value
+
+
+class ResourceTable:
+    """
+    Vista perezosa de resources.arsc.
+
+    Al construirla solo se recorren las cabeceras de primer nivel; los
+    chunks de tipo de un paquete se indexan la primera vez que se consulta
+    ese paquete y los strings del pool global se decodifican de uno en uno.
+    """
+
+    def __init__(self, data):
+        try:
+            chunk_type, header_size, size = _CHUNK.unpack_from(data, 0)
+        except struct.error:
+            raise ResourceFormatError("resources.arsc truncado")
+        if chunk_type != RES_TABLE_TYPE:
+            raise ResourceFormatError("Cabecera de resources.arsc no reconocida")
+
+        self.data = data
+        self.strings = None
+        self._packages = {}
+        self._types = {}
+
+        for offset, chunk_type, _, _ in self._chunks(header_size, min(size, len(data))):
+            if chunk_type == RES_STRING_POOL_TYPE and self.strings is None:
+                self.strings = StringPool(data, offset)
+            elif chunk_type == RES_TABLE_PACKAGE_TYPE:
+                (package_id,) = _U32.unpack_from(data, offset + 8)
+                self._packages.setdefault(package_id, offset)
+
+        if self.strings is None:
+            raise ResourceFormatError("resources.arsc sin pool de strings")
+
+    def _chunks(self, start, end):
+        """Recorre chunks consecutivos: (offset, tipo, tamano cabecera, tamano)"""
+        pos = start
+        while pos + _CHUNK.size <= end:
+            chunk_type, header_size, size = _CHUNK.unpack_from(self.data, pos)
+            if size < _CHUNK.size or pos + size > end:
+                raise ResourceFormatError(f"Chunk invalido en el offset {pos}")
+            yield pos, chunk_type, header_size, size
+            pos += size
+
+    def _type_chunks(self, package_id):
+        """{id de tipo: [offsets de ResTable_type]} de un paquete"""
+        types = self._types.get(package_id)
+        if types is None:
+            types = self._types[package_id] = {}
+            offset = self._packages.get(package_id)
+            if offset is not None:
+                _, header_size, size = _CHUNK.unpack_from(self.data, offset)
+                for pos, chunk_type, _, _ in self._chunks(offset + header_size, offset + size):
+                    if chunk_type == RES_TABLE_TYPE_TYPE:
+                        types.setdefault(self.data[pos + 8], []).append(pos)
+        return types
+
+    def _is_default_config(self, offset):
+        (config_size,) = _U32.unpack_from(self.data, offset + 20)
+        return not any(self.data[offset + 24:offset + 20 + config_size])
+
+    def _entry_value(self, offset, index):
+        """(dataType, data) de la entrada index de un chunk de tipo, o None"""
+        data = self.data
+        _, header_size, _ = _CHUNK.unpack_from(data, offset)
+        flags = data[offset + 9]
+        count, entries_start = struct.unpack_from("<II", data, offset + 12)
+        offsets_at = offset + header_size
+
+        if flags & TYPE_FLAG_SPARSE:
+            # Pares (indice, offset / 4) ordenados por indice
+            low, high = 0, count
+            entry_offset = None
+            while low < high:
+                middle = (low + high) // 2
+                entry_index, value = struct.unpack_from("<HH", data, offsets_at + 4 * middle)
+                if entry_index < index:
+                    low = middle + 1
+                elif entry_index > index:
+                    high = middle
+                else:
+                    entry_offset = value * 4
+                    break
+            if entry_offset is None:
+                return None
+        elif index >= count:
+            return None
+        elif flags & TYPE_FLAG_OFFSET16:
+            (value,) = _U16.unpack_from(data, offsets_at + 2 * index)
+            if value == NO_ENTRY16:
+                return None
+            entry_offset = value * 4
+        else:
+            (entry_offset,) = _U32.unpack_from(data, offsets_at + 4 * index)
+            if entry_offset == NO_ENTRY:
+                return None
+
+        pos = offset + entries_start + entry_offset
+        entry_size, entry_flags = struct.unpack_from("<HH", data, pos)
+        if entry_flags & ENTRY_FLAG_COMPACT:
+            return entry_flags >> 8, _U32.unpack_from(data, pos + 4)[0]
+        if entry_flags & ENTRY_FLAG_COMPLEX:
+            return None
+        _, _, data_type, value = struct.unpack_from("<HBBI", data, pos + entry_size)
+        return data_type, value
+
+    def _value(self, res_id):
+        """Valor del recurso, preferiendo la configuracion por defecto"""
+        types = self._type_chunks(res_id >> 24)
+        fallback = None
+        for offset in types.get((res_id >> 16) & 0xFF, ()):
+            value = self._entry_value(offset, res_id & 0xFFFF)
+            if value is None:
+                continue
+            if self._is_default_config(offset):
+                return value
+            if fallback is None:
+                fallback = value
+        return fallback
+
+    def resolve_string(self, res_id):
+        """String al que apunta res_id (siguiendo referencias), o None"""
+        try:
+            for _ in range(MAX_REFERENCE_DEPTH):
+                value = self._value(res_id)
+                if value is None:
+                    return None
+                data_type, data = value
+                if data_type == TYPE_STRING:
+                    return self.strings.get(data)
+                if data_type != TYPE_REFERENCE:
+                    return None
+                res_id = data
+        except (struct.error, IndexError):
+            raise ResourceFormatError(f"Entrada invalida para el recurso 0x{res_id:08x}")
+        return None
+
+
+_resolved = OrderedDict()
+_resolved_lock = threading.Lock()
+
+
+def resolve_string(archive, res_id):
+    """
+    Resuelve un string de resources.arsc de archive (MappedArchive)
+    leyendo solo lo necesario.
+
+    Los valores ya resueltos se cachean por el SHA-256 de los bytes
+    guardados de resources.arsc (MappedArchive.raw_digest), de modo que el
+    mismo APK o uno con la misma tabla no vuelve a parsearla; el CRC32 y el
+    tamano del directorio central no sirven de clave porque se pueden
+    falsificar. Una tabla guardada sin comprimir se consulta sobre el mmap
+    sin copiarla. Lanza KeyError si el APK no tiene resources.arsc.
+    """
+    info = archive.getinfo("resources.arsc")
+    key = archive.raw_digest(info)
+
+    with _resolved_lock:
+        strings = _resolved.get(key)
+        if strings is not None:
+            _resolved.move_to_end(key)
+            if res_id in strings:
+                return strings[res_id]
+
+    if info.compress_type == zipfile.ZIP_STORED:
+        with archive.view(info) as data:
+            value = ResourceTable(data).resolve_string(res_id)
+    else:
+        value = ResourceTable(archive.read(info)).resolve_string(res_id)
+
+    with _resolved_lock:
+        strings = _resolved.setdefault(key, {})
+        strings[res_id] = value
+        _resolved.move_to_end(key)
+        while len(_resolved) > CACHE_SIZE:
+            _resolved.popitem(last=False)
+    return value
@@ -0,0 +1,108 @@
+"""
+Registro declarativo de reglas: que entradas del APK necesita cada una
+"""
+from collections import OrderedDict
+
+# Entradas del APK que puede necesitar una regla
+INPUT_MANIFEST = "manifest"
+INPUT_DEX_STRINGS = "dex_strings"
+INPUT_TEXT_RESOURCES = "text_resources"
+INPUT_NATIVE_LIBS = "native_libs"
+
+# Orden en que se cargan las entradas (de la mas barata a la mas cara)
+INPUTS = (INPUT_MANIFEST, INPUT_TEXT_RESOURCES, INPUT_NATIVE_LIBS, INPUT_DEX_STRINGS)
+
+SEVERITIES = ("HIGH", "MEDIUM", "LOW", "INFO")
+
+
+class RuleInputError(RuntimeError):
+    """Una regla pidio una entrada que el conjunto de reglas no declara"""
+
+
+class Rule:
+    """
+    Regla de analisis: el detector y lo que declara.
+
+    inputs son las entradas del APK que lee check(context); severity es la
+    severidad maxima de sus hallazgos y category su categoria.
+    """
+
+    __slots__ = ("name", "check", "inputs", "severity", "category")
+
+    def __init__(self, name, check, inputs, severity, category):
+        unknown = set(inputs) - set(INPUTS)
+        if unknown:
+            raise ValueError(f"Entradas desconocidas en la regla {name}: {sorted(unknown)}")
+        if severity not in SEVERITIES:
+            raise ValueError(f"Severidad desconocida en la regla {name}: {severity}")
+        self.name = name
+        self.check = check
+        self.inputs = frozenset(inputs)
+        self.severity = severity
+        self.category = category
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, inputs={sorted(self.inputs)})"
+
+
+class RuleRegistry:
+    """Reglas por nombre, en el orden en que se combinan sus hallazgos"""
+
+    def __init__(self, rules=()):
+        self._rules = OrderedDict()
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule):
+        if rule.name in self._rules:
+            raise ValueError(f"Regla duplicada: {rule.name}")
+        self._rules[rule.name] = rule
+        return rule
+
+    def register(self, name, inputs, severity, category):
+        """Decorador que registra una funcion detector como regla"""
+        def decorator(check):
+            self.add(Rule(name, check, inputs, severity, category))
+            return check
+        return decorator
+
+    def __iter__(self):
+        return iter(self._rules.values())
+
+    def __len__(self):
+        return len(self._rules)
+
+    def __contains__(self, name):
+        return name in self._rules
+
+    def __getitem__(self, name):
+        return self._rules[name]
+
+    def names(self):
+        return tuple(self._rules)
+
+    def select(self, names=None):
+        """
+        Reglas con esos nombres en el orden del registro (todas si names es
+        None). Un nombre desconocido lanza ValueError.
+        """
+        if names is None:
+            return list(self)
+        names = set(names)
+        unknown = names - set(self._rules)
+        if unknown:
+            raise ValueError(f"Reglas desconocidas: {', '.join(sorted(unknown))}")
+        return [rule for rule in self if rule.name in names]
+
+    def using_only(self, *inputs):
+        """Nombres de las reglas que no necesitan mas entradas que las indicadas"""
+        allowed = set(inputs)
+        return tuple(rule.name for rule in self if rule.inputs <= allowed)
+
+
+def required_inputs(rules):
+    """Entradas que necesitan las reglas, en el orden de carga de INPUTS"""
+    needed = set()
+    for rule in rules:
+        needed |= rule.inputs
+    return tuple(name for name in INPUTS if name in needed)
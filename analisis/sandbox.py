@@ -0,0 +1,231 @@
+"""
+Ejecucion aislada de trabajos en subprocesos reciclados con limites de memoria y CPU
+"""
+import atexit
+import multiprocessing
+import queue
+import signal
+import threading
+from concurrent.futures import Future
+
+try:
+    import resource
+except ImportError:  # Sin rlimits (Windows): solo aislamiento y reciclado
+    resource = None
+
+# Segundos de espera a que un subproceso termine antes de matarlo
+STOP_TIMEOUT = 5.0
+
+# Creacion de subprocesos serializada: un fork no debe heredar el extremo
+# del pipe de otro worker recien creado (impediria detectar su muerte)
+_spawn_lock = threading.Lock()
+
+
+class WorkerCrashed(Exception):
+    """El subproceso de un trabajo murio o supero sus limites"""
+
+
+def _limit_cpu(seconds):
+    """Limite blando de CPU: seconds mas lo ya consumido por el proceso"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + 1 + seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, memory_limit, cpu_limit):
+    """
+    Bucle del subproceso: ejecuta (fn, args) hasta recibir None. Al superar
+    cpu_limit segundos de CPU en un trabajo el sistema lo mata con SIGXCPU;
+    al superar memory_limit bytes de espacio de direcciones las reservas
+    fallan con MemoryError y el subproceso termina tras notificarlo.
+    """
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args = task
+        if cpu_limit and resource is not None:
+            _limit_cpu(cpu_limit)
+        try:
+            reply = ("ok", fn(*args))
+        except MemoryError:
+            reply = ("memory", None)
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Resultado o excepcion que no se pueden serializar
+            conn.send(("error", RuntimeError(f"Resultado no serializable: {e!r}")))
+        if reply[0] == "memory":
+            break
+    conn.close()
+
+
+class _Worker:
+    """Subproceso worker y el extremo del pipe del proceso padre"""
+
+    def __init__(self, context, memory_limit, cpu_limit):
+        with _spawn_lock:
+            self.conn, child = context.Pipe()
+            self.process = context.Process(
+                target=_worker_main, args=(child, memory_limit, cpu_limit)
+            )
+            self.process.start()
+            child.close()
+        self.jobs = 0
+
+    def run(self, fn, args):
+        """Ejecuta un trabajo; EOFError u OSError si el subproceso muere"""
+        self.conn.send((fn, args))
+        return self.conn.recv()
+
+    def exitcode(self):
+        """Codigo de salida tras morir (negativo: senal)"""
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        return self.process.exitcode
+
+    def stop(self):
+        """Pide al subproceso que termine y espera; lo mata si no responde"""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.exitcode()
+        self.conn.close()
+
+
+def crash_reason(exitcode, cpu_limit=None):
+    """Descripcion legible de la muerte de un subproceso"""
+    if exitcode is not None and exitcode < 0:
+        signum = -exitcode
+        if signum == getattr(signal, "SIGXCPU", None):
+            return f"supero el limite de CPU ({cpu_limit} s)"
+        if signum == signal.SIGKILL:
+            return "fue terminado (SIGKILL, posible falta de memoria)"
+        try:
+            return f"termino por la senal {signal.Signals(signum).name}"
+        except ValueError:
+            return f"termino por la senal {signum}"
+    return f"termino con codigo {exitcode}"
+
+
+class SandboxPool:
+    """
+    Executor (submit y shutdown, como ProcessPoolExecutor) que ejecuta
+    cada trabajo en un subproceso aislado.
+
+    Cada worker tiene un limite de espacio de direcciones (memory_limit
+    bytes, RLIMIT_AS) y de CPU por trabajo (cpu_limit segundos,
+    RLIMIT_CPU), y se recicla tras max_jobs trabajos para contener fugas.
+    memory_limit debe cubrir el tamano del proceso padre heredado en el
+    fork y el mmap del APK. Si un worker muere (crash, senal o limite) se
+    reemplaza y el futuro recibe crash_handler(fn, args, WorkerCrashed), o
+    la excepcion WorkerCrashed si no hay crash_handler. Sin rlimits en la
+    plataforma solo se aplica el aislamiento y el reciclado.
+    """
+
+    def __init__(self, max_workers, max_jobs=None, memory_limit=None, cpu_limit=None,
+                 crash_handler=None, mp_context=None):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.crash_handler = crash_handler
+        self._context = mp_context or multiprocessing.get_context()
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._slot, name=f"sandbox-{index}", daemon=True)
+            for index in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        # Antes de que multiprocessing espere a los subprocesos al salir
+        atexit.register(self.shutdown)
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("SandboxPool ya esta cerrado")
+            future = Future()
+            self._tasks.put((future, fn, args))
+        return future
+
+    def _slot(self):
+        """Hilo que atiende trabajos con su propio subproceso worker"""
+        worker = None
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                future, fn, args = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if worker is None:
+                    worker = _Worker(self._context, self.memory_limit, self.cpu_limit)
+
+                try:
+                    status, value = worker.run(fn, args)
+                except (EOFError, OSError):
+                    reason = crash_reason(worker.exitcode(), self.cpu_limit)
+                    worker.conn.close()
+                    worker = None
+                    self._crashed(future, fn, args, reason)
+                    continue
+
+                worker.jobs += 1
+                if status == "memory":
+                    worker.stop()
+                    worker = None
+                    self._crashed(
+                        future, fn, args, f"supero el limite de memoria ({self.memory_limit} bytes)"
+                    )
+                    continue
+                if status == "ok":
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+                if self.max_jobs and worker.jobs >= self.max_jobs:
+                    worker.stop()
+                    worker = None
+        finally:
+            if worker is not None:
+                worker.stop()
+
+    def _crashed(self, future, fn, args, reason):
+        error = WorkerCrashed(f"El proceso de analisis {reason}")
+        if self.crash_handler is None:
+            future.set_exception(error)
+            return
+        try:
+            future.set_result(self.crash_handler(fn, args, error))
+        except Exception as e:
+            future.set_exception(e)
+
+    def shutdown(self, wait=True):
+        """Termina los trabajos ya encolados y detiene los subprocesos"""
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            for _ in self._threads:
+                self._tasks.put(None)
+        atexit.unregister(self.shutdown)
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,95 @@
+"""
+Escaneo en streaming de entradas del APK con memoria acotada
+"""
+import re
+import struct
+import zipfile
+
+CHUNK_SIZE = 256 * 1024
+MAX_URL_LENGTH = 2048
+
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_LOCAL_HEADER_MAGIC = b"PK\x03\x04"
+
+HTTP_URL_RE = re.compile(rb'http://[^\s\x00"\'<>]+')
+_URL_BODY_RE = re.compile(rb'[^\s\x00"\'<>]*')
+_PREFIX_TAIL = len(b"http://")
+
+
+def _data_offset(header, info):
+    """Posicion de los datos a partir de la cabecera local de la entrada"""
+    if len(header) != _LOCAL_HEADER.size:
+        raise zipfile.BadZipFile(f"Cabecera local truncada en {info.filename}")
+    magic, name_length, extra_length = _LOCAL_HEADER.unpack(header)
+    if magic != _LOCAL_HEADER_MAGIC:
+        raise zipfile.BadZipFile(f"Cabecera local invalida en {info.filename}")
+    return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+
+def entry_data_offset(fp, info):
+    """Posicion en el fichero de los datos (guardados) de una entrada del zip"""
+    fp.seek(info.header_offset)
+    return _data_offset(fp.read(_LOCAL_HEADER.size), info)
+
+
+def mapped_data_offset(mapped, info):
+    """Como entry_data_offset, sobre el fichero completo mapeado (sin seek)"""
+    start = info.header_offset
+    return _data_offset(mapped[start:start + _LOCAL_HEADER.size], info)
+
+
+def iter_entry_chunks(zip_file, name, chunk_size=CHUNK_SIZE):
+    """Descomprime una entrada del zip en bloques de chunk_size bytes"""
+    with zip_file.open(name) as fp:
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def scan_http_urls(chunks, found=None, max_length=MAX_URL_LENGTH):
+    """
+    Busca URLs http:// en un flujo de bloques de bytes.
+
+    Las URLs que cruzan el limite entre bloques se reconstruyen; solo se
+    arrastran como maximo max_length bytes, y las URLs mas largas se
+    truncan a esa longitud. Devuelve el conjunto (deduplicado) de URLs.
+    """
+    found = set() if found is None else found
+    carry = b""
+    skipping = False
+
+    for chunk in chunks:
+        if skipping:
+            # Resto de una URL ya truncada a max_length
+            chunk = chunk[_URL_BODY_RE.match(chunk).end():]
+            if not chunk:
+                continue
+            skipping = False
+
+        buf = carry + chunk
+        carry = b""
+        pending = False
+
+        for match in HTTP_URL_RE.finditer(buf):
+            url = match.group()
+            if match.end() < len(buf):
+                found.add(url[:max_length])
+            elif len(url) >= max_length:
+                found.add(url[:max_length])
+                skipping = True
+            else:
+                # Puede continuar en el siguiente bloque
+                carry = url
+                pending = True
+
+        if not pending and not skipping:
+            # Un prefijo parcial ("htt" ... "http://") al final del bloque
+            carry = buf[-_PREFIX_TAIL:]
+
+    if carry:
+        for match in HTTP_URL_RE.finditer(carry):
+            found.add(match.group()[:max_length])
+
+    return found
@@ -0,0 +1,113 @@
+"""
+Recepcion de APKs subidos en streaming: hash, limite de tamano y cabecera zip
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+class HashingUpload:
+    """
+    Destino de un fichero subido.
+
+    Cada bloque recibido se escribe en un temporal dentro de folder y se
+    anade al SHA-256. Si se supera max_size o los primeros bytes no son la
+    cabecera de un zip se aborta la subida sin esperar al resto del cuerpo.
+    finalize() deja el fichero en folder/<sha256>.apk.
+    """
+
+    def __init__(self, folder, max_size):
+        self.folder = folder
+        self.max_size = max_size
+        self.size = 0
+        self.path = None
+        self._hash = hashlib.sha256()
+        self._head = b""
+        fd, self.temp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=folder)
+        self._file = os.fdopen(fd, "w+b")
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(f"El APK supera el tamano maximo ({self.max_size} bytes)")
+
+        if len(self._head) < len(ZIP_MAGIC):
+            self._head += bytes(data[:len(ZIP_MAGIC) - len(self._head)])
+            if not ZIP_MAGIC.startswith(self._head):
+                self.discard()
+                raise BadRequest("El archivo no es un APK valido (cabecera zip incorrecta)")
+
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # seek, read, tell... del temporal (los usa FileStorage)
+        return getattr(self._file, name)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def finalize(self):
+        """Mueve el temporal a su ruta por contenido y la devuelve"""
+        if self.path is not None:
+            return self.path
+        if self._head != ZIP_MAGIC:
+            self.discard()
+            raise BadRequest("El archivo no es un APK valido (cabecera zip incorrecta)")
+
+        self._file.close()
+        path = os.path.join(self.folder, self.sha256 + ".apk")
+        if os.path.exists(path):
+            # Mismo contenido ya subido: se reutiliza
+            os.remove(self.temp_path)
+        else:
+            os.replace(self.temp_path, path)
+        self.temp_path = None
+        self.path = path
+        return path
+
+    def discard(self):
+        """Cierra y elimina el temporal si la subida no se finalizo"""
+        if not self._file.closed:
+            self._file.close()
+        if self.temp_path is not None:
+            try:
+                os.remove(self.temp_path)
+            except FileNotFoundError:
+                pass
+            self.temp_path = None
+
+    def close(self):
+        self.discard()
+
+
+class StreamingUploadRequest(Request):
+    """
+    Request de Flask que vuelca los ficheros subidos a HashingUpload en
+    UPLOAD_FOLDER con el limite MAX_UPLOAD_SIZE de la configuracion. Al
+    cerrar la peticion se eliminan las subidas que no se finalizaron.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        max_size = current_app.config["MAX_UPLOAD_SIZE"]
+        if content_length is not None and content_length > max_size:
+            raise RequestEntityTooLarge(f"El APK supera el tamano maximo ({max_size} bytes)")
+
+        upload = HashingUpload(current_app.config["UPLOAD_FOLDER"], max_size)
+        self.__dict__.setdefault("_uploads", []).append(upload)
+        return upload
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for upload in self.__dict__.get("_uploads", ()):
+                upload.discard()
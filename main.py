@@ -4,117 +4,246 @@ Analiza vulnerabilidades en aplicaciones Android (APK)
 """
 
 import os
-import json
+import re
+import unicodedata
 from datetime import datetime
-from flask import Flask, render_template, request, Response
-from analisis.analisis_estatico import analyze_apk, get_apk_metadata
-from analisis.ai_classifier import classify_risk
-from reports.report_generator import generate_report
+from functools import partial
+from urllib.parse import quote
+from flask import Flask, render_template, request, Response, jsonify, redirect, url_for
+from analisis.analisis_estatico import RULESET_VERSION
+from analisis.cache import ResultCache
+from analisis.entry_cache import SharedEntryCache
+from analisis.history import HistoryStore
+from analisis.incremental import PackageEntryCache
+from analisis.jobs import JobQueue, QueueFullError, crash_result, run_analysis
+from analisis.sandbox import SandboxPool
+from analisis.uploads import StreamingUploadRequest
+from reports.report_generator import iter_report, report_summary
+from reports.report_store import ReportStore
 
 UPLOAD_FOLDER = "uploads"
+# history.json solo se lee para migrarlo a la base de datos
 HISTORY_FILE = "history.json"
+HISTORY_DB = os.environ.get("DSA_HISTORY_DB", "history.db")
+CACHE_FOLDER = os.environ.get("DSA_CACHE_FOLDER", "cache")
+CACHE_MAX_SIZE = int(os.environ.get("DSA_CACHE_MAX_SIZE", 256 * 1024 * 1024))
+ENTRY_CACHE_FOLDER = os.environ.get("DSA_ENTRY_CACHE_FOLDER", "entry_cache")
+ENTRY_CACHE_MAX_SIZE = int(os.environ.get("DSA_ENTRY_CACHE_MAX_SIZE", 64 * 1024 * 1024))
+SHARED_CACHE_DB = os.environ.get("DSA_SHARED_CACHE_DB", "shared_cache.db")
+SHARED_CACHE_MAX_ENTRIES = int(os.environ.get("DSA_SHARED_CACHE_MAX_ENTRIES", 200000))
+ANALYSIS_WORKERS = int(os.environ.get("DSA_WORKERS", os.cpu_count() or 2))
+ANALYSIS_QUEUE_SIZE = int(os.environ.get("DSA_QUEUE_SIZE", 16))
+# Estado y resultado de los trabajos, compartidos entre procesos web
+JOB_FOLDER = os.environ.get("DSA_JOB_FOLDER", "jobs")
+JOB_MAX_SIZE = int(os.environ.get("DSA_JOB_MAX_SIZE", 256 * 1024 * 1024))
+# Limites de cada subproceso de analisis (0: sin limite) y trabajos antes de reciclarlo
+WORKER_MEMORY_LIMIT = int(os.environ.get("DSA_WORKER_MEMORY_LIMIT", 4 * 1024 * 1024 * 1024))
+WORKER_CPU_LIMIT = int(os.environ.get("DSA_WORKER_CPU_LIMIT", 600))
+WORKER_MAX_JOBS = int(os.environ.get("DSA_WORKER_MAX_JOBS", 50))
+MAX_UPLOAD_SIZE = int(os.environ.get("DSA_MAX_UPLOAD_SIZE", 256 * 1024 * 1024))
+REPORT_FOLDER = os.environ.get("DSA_REPORT_FOLDER", "stored_reports")
+REPORT_MEMORY_SIZE = int(os.environ.get("DSA_REPORT_MEMORY_SIZE", 32 * 1024 * 1024))
+REPORT_DISK_SIZE = int(os.environ.get("DSA_REPORT_DISK_SIZE", 256 * 1024 * 1024))
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+DATE_FILTER_RE = re.compile(r"^\d{4}-\d{2}-\d{2}( \d{2}:\d{2})?$")
 
 app = Flask(__name__)
+app.request_class = StreamingUploadRequest
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+app.config["MAX_UPLOAD_SIZE"] = MAX_UPLOAD_SIZE
+# Margen para las cabeceras multipart; rechaza antes de leer el cuerpo
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_SIZE + 64 * 1024
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-last_report = {"content": "", "filename": ""}
+result_cache = ResultCache(CACHE_FOLDER, CACHE_MAX_SIZE, RULESET_VERSION)
+entry_cache = PackageEntryCache(ENTRY_CACHE_FOLDER, ENTRY_CACHE_MAX_SIZE, RULESET_VERSION)
+shared_cache = SharedEntryCache(SHARED_CACHE_DB, SHARED_CACHE_MAX_ENTRIES, RULESET_VERSION)
+job_queue = JobQueue(
+    ANALYSIS_WORKERS, ANALYSIS_QUEUE_SIZE,
+    executor_factory=partial(
+        SandboxPool, max_jobs=WORKER_MAX_JOBS, memory_limit=WORKER_MEMORY_LIMIT,
+        cpu_limit=WORKER_CPU_LIMIT, crash_handler=crash_result
+    ),
+    store=ResultCache(JOB_FOLDER, JOB_MAX_SIZE, RULESET_VERSION)
+)
+history_store = HistoryStore(HISTORY_DB, legacy_json=HISTORY_FILE)
+report_store = ReportStore(REPORT_FOLDER, REPORT_MEMORY_SIZE, REPORT_DISK_SIZE)
 
 
 def load_history():
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    return history_store.list()
 
 
 def save_history(entry):
-    history = load_history()
-    history.insert(0, entry)  # Mas reciente primero
-    history = history[:50]  # Maximo 50 entradas
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+    history_store.add(entry)
+
+
+def record_analysis(job_id, result):
+    """Registra en historial e informe un analisis terminado"""
+    static_results = result["vulnerabilities"]
+    metadata = result["metadata"]
+    counts = result["counts"]
+
+    # Guardar para descarga, con el id del trabajo como id del analisis
+    report_store.put(
+        job_id,
+        result["filename"].replace(".apk", "_report.txt"),
+        iter_report(result["filename"], static_results, result["risk"], counts)
+    )
+
+    # Guardar en historial
+    save_history({
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "filename": result["filename"],
+        "app_name": metadata["app_name"],
+        "package": metadata["package"],
+        "version": metadata["version_name"],
+        "risk": result["risk"],
+        "vulns_total": len(static_results),
+        "vulns_high": counts.get("HIGH", 0),
+        "vulns_medium": counts.get("MEDIUM", 0),
+        "vulns_low": counts.get("LOW", 0),
+        "report_id": job_id
+    })
 
 
 @app.route("/", methods=["GET", "POST"])
 def index():
-    global last_report
-
     if request.method == "POST":
         apk_file = request.files["apk"]
 
         if not apk_file or not apk_file.filename.endswith(".apk"):
             return "Archivo no valido. Debe ser un APK."
 
-        apk_path = os.path.join(app.config["UPLOAD_FOLDER"], apk_file.filename)
-        apk_file.save(apk_path)
-
-        # Extraer metadata
-        metadata = get_apk_metadata(apk_path)
-
-        # Analisis estatico
-        static_results = analyze_apk(apk_path)
-
-        # Clasificacion de riesgo
-        risk_level = classify_risk(static_results)
-
-        # Generacion de informe
-        report = generate_report(apk_file.filename, static_results, risk_level)
-
-        # Guardar para descarga
-        last_report = {
-            "content": report,
-            "filename": apk_file.filename.replace(".apk", "_report.txt")
-        }
-
-        # Contar por severidad
-        high_count = sum(1 for v in static_results if v.get("severity") == "HIGH")
-        medium_count = sum(1 for v in static_results if v.get("severity") == "MEDIUM")
-        low_count = sum(1 for v in static_results if v.get("severity") == "LOW")
-
-        # Guardar en historial
-        save_history({
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-            "filename": apk_file.filename,
-            "app_name": metadata["app_name"],
-            "package": metadata["package"],
-            "version": metadata["version_name"],
-            "risk": risk_level,
-            "vulns_total": len(static_results),
-            "vulns_high": high_count,
-            "vulns_medium": medium_count,
-            "vulns_low": low_count
-        })
-
-        return render_template(
-            "result.html",
-            results=static_results,
-            risk=risk_level,
-            report=report,
-            metadata=metadata
-        )
+        # El APK ya esta en disco y hasheado; se guarda por contenido
+        upload = apk_file.stream
+        apk_path = upload.finalize()
+
+        # El analisis se encola y se ejecuta en un proceso worker
+        try:
+            job_id = job_queue.submit(
+                run_analysis, apk_path, apk_file.filename, result_cache, upload.sha256,
+                entry_cache, shared_cache, on_done=record_analysis
+            )
+        except QueueFullError:
+            return "Cola de analisis llena. Intente de nuevo en unos segundos.", 503
+
+        return redirect(url_for("job", job_id=job_id), code=303)
 
     return render_template("index.html")
 
 
+@app.route("/job/<job_id>")
+def job(job_id):
+    status = job_queue.status(job_id)
+    if status is None:
+        return "Analisis no encontrado", 404
+
+    if status["status"] == "error":
+        return f"Error al analizar APK: {status['error']}", 500
+
+    if status["status"] != "done":
+        return render_template("job.html", status=status)
+
+    result = job_queue.result(job_id)
+    return render_template(
+        "result.html",
+        results=result["vulnerabilities"],
+        risk=result["risk"],
+        report=report_summary(
+            result["filename"], result["vulnerabilities"], result["risk"], result["counts"]
+        ),
+        counts=result["counts"],
+        report_id=job_id,
+        metadata=result["metadata"]
+    )
+
+
+@app.route("/status/<job_id>")
+def job_status(job_id):
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({"error": "Analisis no encontrado"}), 404
+    return jsonify(status)
+
+
+def _history_query(args):
+    """Limite, cursor y filtros de /history; ValueError si no son validos"""
+    limit = int(args.get("limit", HISTORY_PAGE_SIZE))
+    if not 1 <= limit <= HISTORY_MAX_PAGE_SIZE:
+        raise ValueError(f"limit debe estar entre 1 y {HISTORY_MAX_PAGE_SIZE}")
+    cursor = int(args["cursor"]) if args.get("cursor") else None
+
+    filters = {}
+    if args.get("risk"):
+        filters["risk"] = args["risk"].strip().upper()
+    if args.get("package"):
+        filters["package"] = args["package"].strip()
+    for param, key in (("from", "date_from"), ("to", "date_to")):
+        value = args.get(param, "").strip()
+        if value:
+            if not DATE_FILTER_RE.match(value):
+                raise ValueError(f"{param} debe tener el formato AAAA-MM-DD")
+            filters[key] = value
+    if args.get("min_high"):
+        filters["min_high"] = int(args["min_high"])
+    return limit, cursor, filters
+
+
 @app.route("/history")
 def history():
-    return render_template("history.html", history=load_history())
+    as_json = request.args.get("format") == "json"
+    try:
+        limit, cursor, filters = _history_query(request.args)
+    except ValueError as e:
+        if as_json:
+            return jsonify({"error": str(e)}), 400
+        return f"Parametros no validos: {e}", 400
+
+    entries, next_cursor = history_store.page(limit, cursor, **filters)
+    total = history_store.count(**filters)
+
+    if as_json:
+        return jsonify({"items": entries, "next_cursor": next_cursor, "total": total})
+
+    args = {key: value for key, value in request.args.items() if key != "cursor"}
+    next_url = first_url = None
+    if next_cursor is not None:
+        next_url = url_for("history", cursor=next_cursor, **args)
+    if cursor is not None:
+        first_url = url_for("history", **args)
+    return render_template(
+        "history.html", history=entries, total=total, filters=request.args,
+        next_url=next_url, first_url=first_url
+    )
 
 
-@app.route("/download")
-def download():
-    if not last_report["content"]:
+@app.route("/download/<report_id>")
+def download(report_id):
+    report = report_store.open(report_id)
+    if report is None:
         return "No hay informe disponible", 404
 
-    return Response(
-        last_report["content"],
-        mimetype="text/plain",
-        headers={
-            "Content-Disposition": f"attachment; filename={last_report['filename']}"
-        }
+    # El informe se envia por bloques (transferencia chunked)
+    filename, chunks = report
+    response = Response(
+        (chunk.encode("utf-8") for chunk in chunks),
+        mimetype="text/plain"
     )
+    response.headers.set("Content-Disposition", "attachment", **_attachment_options(filename))
+    return response
+
+
+def _attachment_options(filename):
+    """Parametros de Content-Disposition validos tambien para nombres no ASCII"""
+    try:
+        filename.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+        return {"filename": simple, "filename*": "UTF-8''" + quote(filename, safe="!#$&+^`|~")}
+    return {"filename": filename}
 
 
 if __name__ == "__main__":
@@ -1,40 +1,85 @@
-def generate_report(filename, vulnerabilities, risk):
-    report = []
-    report.append("INFORME DE SEGURIDAD - DROIDSECANALYZER")
-    report.append("=" * 60)
-    report.append(f"Aplicacion analizada: {filename}")
-    report.append(f"Nivel de riesgo global: {risk}")
-    report.append(f"Vulnerabilidades encontradas: {len(vulnerabilities)}")
-    report.append("")
+from analisis.models import severity_counts
+
+# Texto acumulado antes de entregar un bloque en iter_report
+REPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _severity_counts(vulnerabilities, counts):
+    """Recuentos por severidad: los dados o recalculados (ver severity_counts)"""
+    if counts is not None:
+        return counts
+    return severity_counts(vulnerabilities)
+
+
+def _summary_lines(filename, vulnerabilities, risk, counts=None):
+    yield "INFORME DE SEGURIDAD - DROIDSECANALYZER"
+    yield "=" * 60
+    yield f"Aplicacion analizada: {filename}"
+    yield f"Nivel de riesgo global: {risk}"
+    yield f"Vulnerabilidades encontradas: {len(vulnerabilities)}"
+    yield ""
 
     # Contar por severidad
-    high = sum(1 for v in vulnerabilities if v.get("severity") == "HIGH")
-    medium = sum(1 for v in vulnerabilities if v.get("severity") == "MEDIUM")
-    low = sum(1 for v in vulnerabilities if v.get("severity") == "LOW")
+    counts = _severity_counts(vulnerabilities, counts)
+    high = counts.get("HIGH", 0)
+    medium = counts.get("MEDIUM", 0)
+    low = counts.get("LOW", 0)
+
+    yield f"Resumen: {high} ALTA | {medium} MEDIA | {low} BAJA"
+    yield "=" * 60
+
 
-    report.append(f"Resumen: {high} ALTA | {medium} MEDIA | {low} BAJA")
-    report.append("=" * 60)
-    report.append("")
+def _report_lines(filename, vulnerabilities, risk, counts):
+    yield from _summary_lines(filename, vulnerabilities, risk, counts)
+    yield ""
 
     for idx, v in enumerate(vulnerabilities, start=1):
         severity = v.get("severity", "MEDIUM")
-        report.append(f"{idx}. [{severity}] {v['title']}")
-        report.append("-" * 60)
-        report.append("Descripcion:")
-        report.append(f"  {v['description']}")
-        report.append("")
-        report.append("Ubicacion:")
-        report.append(f"  Fichero: {v['file']}")
-        report.append(f"  Metodo:  {v['method']}")
-        report.append("")
-        report.append("Evidencia:")
-        report.append(f"  {v['evidence']}")
-        report.append("")
-        report.append("Recomendacion:")
-        report.append(f"  {v['solution']}")
-        report.append("")
-
-    report.append("=" * 60)
-    report.append("Generado por DroidSecAnalyzer (DSA)")
-
-    return "\n".join(report)
+        yield f"{idx}. [{severity}] {v['title']}"
+        yield "-" * 60
+        yield "Descripcion:"
+        yield f"  {v['description']}"
+        yield ""
+        yield "Ubicacion:"
+        yield f"  Fichero: {v['file']}"
+        yield f"  Metodo:  {v['method']}"
+        yield ""
+        yield "Evidencia:"
+        yield f"  {v['evidence']}"
+        yield ""
+        yield "Recomendacion:"
+        yield f"  {v['solution']}"
+        yield ""
+
+    yield "=" * 60
+    yield "Generado por DroidSecAnalyzer (DSA)"
+
+
+def iter_report(filename, vulnerabilities, risk, counts=None, chunk_size=REPORT_CHUNK_SIZE):
+    """
+    Genera el informe TXT en bloques de unos chunk_size caracteres, sin
+    construir el texto completo en memoria. counts son los recuentos por
+    severidad si ya se conocen.
+    """
+    buffer = []
+    size = 0
+    for index, line in enumerate(_report_lines(filename, vulnerabilities, risk, counts)):
+        if index:
+            line = "\n" + line
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def generate_report(filename, vulnerabilities, risk, counts=None):
+    return "".join(iter_report(filename, vulnerabilities, risk, counts))
+
+
+def report_summary(filename, vulnerabilities, risk, counts=None):
+    """Cabecera del informe (aplicacion, riesgo y recuento por severidad)"""
+    return "\n".join(_summary_lines(filename, vulnerabilities, risk, counts))
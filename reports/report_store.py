@@ -0,0 +1,169 @@
+"""
+Almacen de informes por id de analisis: LRU en memoria y copia en disco
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+REPORT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ReportStore:
+    """
+    Informes TXT indexados por el id del analisis.
+
+    put() escribe siempre el informe en disco de forma atomica, de modo que
+    cualquier proceso puede servir la descarga; los informes recientes se
+    conservan tambien en memoria hasta sumar max_memory_size caracteres
+    (LRU). En disco se eliminan primero los informes usados hace mas
+    tiempo al superar max_disk_size bytes.
+    """
+
+    def __init__(self, folder, max_memory_size, max_disk_size):
+        self.folder = folder
+        self.max_memory_size = max_memory_size
+        self.max_disk_size = max_disk_size
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _paths(self, report_id):
+        if not REPORT_ID_RE.match(report_id):
+            raise KeyError(report_id)
+        base = os.path.join(self.folder, report_id)
+        return base + ".txt", base + ".json"
+
+    def _remember(self, report_id, filename, content):
+        size = len(content)
+        with self._lock:
+            previous = self._memory.pop(report_id, None)
+            if previous is not None:
+                self._memory_size -= len(previous[1])
+            if size > self.max_memory_size:
+                return
+            self._memory[report_id] = (filename, content)
+            self._memory_size += size
+            while self._memory_size > self.max_memory_size:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def put(self, report_id, filename, chunks):
+        """
+        Guarda el informe (un str o un iterable de bloques de texto, p. ej.
+        iter_report) escribiendolo a disco segun se genera, y el nombre con
+        el que se descarga. Solo se retiene en memoria si cabe en la LRU.
+        """
+        if isinstance(chunks, str):
+            chunks = (chunks,)
+        content_path, meta_path = self._paths(report_id)
+
+        kept = []
+        kept_size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    if kept is not None:
+                        kept.append(chunk)
+                        kept_size += len(chunk)
+                        if kept_size > self.max_memory_size:
+                            kept = None
+            os.replace(tmp_path, content_path)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"filename": filename}, f)
+            os.replace(tmp_path, meta_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if kept is not None:
+            self._remember(report_id, filename, "".join(kept))
+        else:
+            self._forget(report_id)
+        self.evict()
+
+    def open(self, report_id, chunk_size=READ_CHUNK_SIZE):
+        """
+        (nombre de descarga, iterador de bloques de texto) del informe, o
+        None si no existe. Desde disco se lee por bloques de chunk_size.
+        """
+        try:
+            content_path, meta_path = self._paths(report_id)
+        except KeyError:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(report_id)
+            if entry is not None:
+                self._memory.move_to_end(report_id)
+
+        if entry is not None:
+            try:
+                os.utime(content_path)
+            except OSError:
+                pass
+            return entry[0], iter((entry[1],))
+
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                filename = json.load(f)["filename"]
+            f = open(content_path, "r", encoding="utf-8")
+            os.utime(content_path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        def read_chunks():
+            with f:
+                for chunk in iter(lambda: f.read(chunk_size), ""):
+                    yield chunk
+
+        return filename, read_chunks()
+
+    def get(self, report_id):
+        """(nombre de descarga, contenido completo) del informe, o None"""
+        report = self.open(report_id)
+        if report is None:
+            return None
+        filename, chunks = report
+        return filename, "".join(chunks)
+
+    def _forget(self, report_id):
+        with self._lock:
+            entry = self._memory.pop(report_id, None)
+            if entry is not None:
+                self._memory_size -= len(entry[1])
+
+    def evict(self):
+        """Elimina de disco los informes menos usados hasta quedar bajo max_disk_size"""
+        reports = []
+        total = 0
+        for name in os.listdir(self.folder):
+            if not name.endswith(".txt"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            reports.append((stat.st_mtime, stat.st_size, name[:-len(".txt")]))
+            total += stat.st_size
+
+        reports.sort()
+        for _, size, report_id in reports:
+            if total <= self.max_disk_size:
+                break
+            self._forget(report_id)
+            for path in self._paths(report_id):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
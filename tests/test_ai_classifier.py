@@ -131,6 +131,17 @@ class TestAIClassifier(unittest.TestCase):
         # 0 + 4*2 = 8 < 15, debería ser BAJO
         self.assertEqual(result, "BAJO")
 
+    def test_missing_severity_scores_as_medium(self):
+        """Prueba que un hallazgo sin severidad puntúa como MEDIA"""
+        vulns = [{"severity": "HIGH"}] * 2 + [{"severity": "MEDIUM"}, {"title": "Sin severidad"}]
+        self.assertEqual(classify_risk(vulns), "ALTO")
+        self.assertEqual(classify_risk([{"severity": None}] * 3), "MEDIO")
+
+    def test_given_counts_are_used(self):
+        """Prueba que con counts no se recuentan los hallazgos"""
+        vulns = [{"severity": "LOW"}]
+        self.assertEqual(classify_risk(vulns, {"HIGH": 3}), "ALTO")
+
     def test_severity_scores_constant(self):
         """Prueba que SEVERITY_SCORES tiene los valores esperados"""
         expected = {
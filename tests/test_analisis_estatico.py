@@ -3,13 +3,16 @@ Pruebas unitarias para el módulo analisis_estatico
 Prueba las funciones de análisis estático para vulnerabilidades de seguridad en APK
 """
 
+import os
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 from analisis.analisis_estatico import (
     DANGEROUS_PERMISSIONS,
     SECRET_PATTERNS,
     is_exported,
-    get_apk_metadata
+    get_apk_metadata,
+    analyze,
+    AnalysisContext
 )
 
 
@@ -65,6 +68,41 @@ class TestSecretPatterns(unittest.TestCase):
             self.assertIn(label, pattern_labels)
 
 
+class TestFindSecretTypes(unittest.TestCase):
+    """Pruebas para el matcher combinado de secretos"""
+
+    def test_matches_same_as_individual_patterns(self):
+        """Prueba que el matcher combinado coincide con cada patron por separado"""
+        import re
+        from analisis.analisis_estatico import find_secret_types
+        samples = [
+            'api_key = "abc123"',
+            'PASSWORD: "hunter2"',
+            "token='xyz'",
+            "AWS_ACCESS_KEY_ID",
+            "<string name=\"app_name\">Demo</string>",
+        ]
+        for sample in samples:
+            expected = [label for pattern, label in SECRET_PATTERNS if re.search(pattern, sample)]
+            self.assertEqual(find_secret_types(sample), expected, sample)
+
+    def test_reports_every_type_in_one_file(self):
+        """Prueba que se reportan todos los tipos presentes, no solo el primero"""
+        from analisis.analisis_estatico import find_secret_types
+        content = 'apikey="k"\npwd = "p"\naws_secret = "s"'
+        self.assertEqual(
+            find_secret_types(content),
+            ["API Key", "Password", "Secret/Token", "AWS Credentials"]
+        )
+
+    def test_prefilter_skips_content_without_literals(self):
+        """Prueba que contenido sin literales clave no se escanea"""
+        from analisis.analisis_estatico import find_secret_types
+        with patch('analisis.analisis_estatico.SECRET_MATCHER') as matcher:
+            self.assertEqual(find_secret_types("<resources></resources>"), [])
+        matcher.search.assert_not_called()
+
+
 class TestIsExported(unittest.TestCase):
     """Pruebas para la detección de exportación de componentes"""
 
@@ -144,6 +182,16 @@ class TestGetApkMetadata(unittest.TestCase):
                 result = get_apk_metadata("test.apk")
                 self.assertIsInstance(result, dict)
 
+    def test_metadata_closes_context(self):
+        """Prueba que get_apk_metadata cierra el contexto, también si falla"""
+        for error in (None, ValueError("manifest")):
+            with patch('analisis.analisis_estatico.AnalysisContext') as context_cls:
+                with patch('analisis.analisis_estatico._collect_metadata',
+                           side_effect=error, return_value={"app_name": "Demo"}):
+                    result = get_apk_metadata("test.apk")
+            context_cls.return_value.close.assert_called_once_with()
+            self.assertIn("app_name", result)
+
     def test_metadata_contains_required_fields(self):
         """Prueba que los metadatos contienen todos los campos requeridos"""
         mock_apk = Mock()
@@ -264,5 +312,425 @@ class TestIntegration(unittest.TestCase):
                     self.assertIn(key, vuln)
 
 
+class TestAnalyze(unittest.TestCase):
+    """Pruebas para el punto de entrada combinado analyze()"""
+
+    def _mock_apk(self):
+        mock_apk = Mock()
+        mock_apk.get_app_name.return_value = "Test App"
+        mock_apk.get_package.return_value = "com.test.app"
+        mock_apk.get_androidversion_name.return_value = "1.0.0"
+        mock_apk.get_androidversion_code.return_value = "1"
+        mock_apk.get_min_sdk_version.return_value = "21"
+        mock_apk.get_target_sdk_version.return_value = "33"
+        mock_apk.get_permissions.return_value = ["android.permission.CAMERA"]
+        mock_apk.get_attribute_value.return_value = "false"
+        mock_apk.get_files.return_value = []
+        mock_apk.get_activities.return_value = []
+        mock_apk.get_services.return_value = []
+        mock_apk.get_receivers.return_value = []
+        return mock_apk
+
+    def test_analyze_parses_apk_once(self):
+        """Prueba que analyze construye el APK una sola vez"""
+        with patch('analisis.analisis_estatico.APK', return_value=self._mock_apk()) as apk_cls:
+            with patch('os.path.getsize', return_value=1024):
+                metadata, vulns = analyze("test.apk")
+
+        apk_cls.assert_called_once_with("test.apk")
+        self.assertEqual(metadata["package"], "com.test.app")
+        self.assertEqual(metadata["permissions_dangerous"], 1)
+        self.assertEqual(vulns[0]["title"], "Permisos peligrosos detectados")
+
+    def test_analyze_handles_parse_error(self):
+        """Prueba que analyze devuelve metadata de error y hallazgo INFO"""
+        with patch('analisis.analisis_estatico.APK', side_effect=Exception("Parse error")):
+            metadata, vulns = analyze("invalid.apk")
+
+        self.assertEqual(metadata["app_name"], "Error")
+        self.assertEqual(len(vulns), 1)
+        self.assertEqual(vulns[0]["severity"], "INFO")
+        self.assertEqual(vulns[0]["title"], "Error al analizar APK")
+
+    def test_context_keeps_parsed_apk(self):
+        """Prueba que el contexto conserva el APK parseado y su ruta"""
+        mock_apk = self._mock_apk()
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            context = AnalysisContext("test.apk")
+
+        self.assertIs(context.apk, mock_apk)
+        self.assertEqual(context.apk_path, "test.apk")
+
+
+class TestAppName(unittest.TestCase):
+    """Pruebas para la resolucion puntual del nombre de la app"""
+
+    def _context(self, label):
+        mock_apk = Mock()
+        mock_apk.get_attribute_value.return_value = label
+        mock_apk.get_package.return_value = "com.demo"
+        mock_apk.get_app_name.return_value = "Completo"
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            return AnalysisContext("test.apk")
+
+    def test_reference_resolved_without_full_decode(self):
+        """Prueba que una referencia se resuelve sin llamar a get_app_name"""
+        from analisis.analisis_estatico import _app_name
+        context = self._context("@7F020000")
+        with patch.object(context, 'resource_string', return_value="Demo") as resolve:
+            self.assertEqual(_app_name(context), "Demo")
+
+        resolve.assert_called_once_with(0x7F020000)
+        context.apk.get_app_name.assert_not_called()
+
+    def test_literal_label_and_fallbacks(self):
+        """Prueba etiquetas literales, de otro paquete y errores de resources.arsc"""
+        from analisis.analisis_estatico import _app_name
+        self.assertEqual(_app_name(self._context("Literal")), "Completo")
+        self.assertEqual(_app_name(self._context("@android:01040000")), "@android:01040000")
+
+        context = self._context("@7F020000")
+        with patch.object(context, 'resource_string', side_effect=KeyError("resources.arsc")):
+            self.assertEqual(_app_name(context), "@7F020000")
+
+    def test_manifest_only_rules_do_not_resolve(self):
+        """Prueba que con reglas de solo manifest no se lee resources.arsc"""
+        from analisis.analisis_estatico import _app_name
+        from analisis.rules import INPUT_MANIFEST
+        mock_apk = Mock()
+        mock_apk.get_attribute_value.return_value = "@7F020000"
+        context = AnalysisContext("test.apk", apk=mock_apk, inputs=(INPUT_MANIFEST,))
+        with patch.object(context, 'resource_string') as resolve:
+            self.assertEqual(_app_name(context), "@7F020000")
+        resolve.assert_not_called()
+
+    def test_reference_without_resources_arsc(self):
+        """Prueba que sin resources.arsc se muestra la referencia y no 'Desconocido'"""
+        import shutil
+        import tempfile
+        import zipfile
+        from lxml import etree
+        from analisis.analisis_estatico import _app_name
+        from analisis.manifest import ManifestView
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        apk_path = os.path.join(folder, "app.apk")
+        with zipfile.ZipFile(apk_path, "w") as zf:
+            zf.writestr("classes.dex", b"")
+        view = ManifestView(etree.fromstring(
+            b'<manifest xmlns:android="http://schemas.android.com/apk/res/android" '
+            b'package="com.demo"><application android:label="@7F0B0001"/></manifest>'
+        ))
+        context = AnalysisContext(apk_path, apk=view)
+        self.addCleanup(context.close)
+
+        self.assertEqual(_app_name(context), "@7F0B0001")
+
+
+class TestQuickAnalyze(unittest.TestCase):
+    """Pruebas para el analisis rapido basado solo en el manifest"""
+
+    def _view(self):
+        from lxml import etree
+        from analisis.manifest import ManifestView
+        return ManifestView(etree.fromstring(
+            b'<manifest xmlns:android="http://schemas.android.com/apk/res/android" package="com.demo">'
+            b'<uses-sdk android:minSdkVersion="21"/>'
+            b'<uses-permission android:name="android.permission.CAMERA"/>'
+            b'<application android:label="Demo" android:allowBackup="false">'
+            b'<activity android:name=".Main" android:exported="true"/>'
+            b'</application></manifest>'
+        ))
+
+    def test_quick_skips_apk_loading(self):
+        """Prueba que el modo rapido no construye APK y marca el resultado"""
+        from analisis.analisis_estatico import quick_analyze
+        with patch('analisis.analisis_estatico.ManifestView.from_apk_file', return_value=self._view()):
+            with patch('analisis.analisis_estatico.APK') as apk_cls:
+                with patch('os.path.getsize', return_value=1024):
+                    metadata, vulns = quick_analyze("test.apk")
+
+        apk_cls.assert_not_called()
+        self.assertEqual(metadata["scan_mode"], "quick")
+        self.assertEqual(metadata["app_name"], "Demo")
+        self.assertEqual(metadata["activities"], 1)
+        titles = [v["title"] for v in vulns]
+        self.assertIn("Permisos peligrosos detectados", titles)
+        self.assertIn("Componentes exportados sin proteccion", titles)
+        self.assertEqual(titles[-1], "Analisis rapido (parcial)")
+        self.assertNotIn("Analisis completado", titles)
+
+    def test_quick_handles_missing_manifest(self):
+        """Prueba que un APK sin manifest legible devuelve el hallazgo de error"""
+        from analisis.analisis_estatico import quick_analyze
+        with patch('analisis.analisis_estatico.ManifestView.from_apk_file',
+                   side_effect=KeyError("AndroidManifest.xml")):
+            metadata, vulns = quick_analyze("test.apk")
+
+        self.assertEqual(metadata["app_name"], "Error")
+        self.assertEqual(vulns[0]["title"], "Error al analizar APK")
+
+
+class TestDetectors(unittest.TestCase):
+    """Pruebas para la ejecucion concurrente de detectores"""
+
+    def test_detectors_cover_all_checks(self):
+        """Prueba que existen los siete detectores en orden estable"""
+        from analisis.analisis_estatico import DETECTORS
+        names = [name for name, _ in DETECTORS]
+        self.assertEqual(names, [
+            "permissions", "debuggable", "allow_backup", "http_urls",
+            "exported_components", "secrets", "min_sdk"
+        ])
+
+    def test_findings_merged_in_detector_order(self):
+        """Prueba que los hallazgos respetan el orden de DETECTORS aunque terminen desordenados"""
+        import time
+        from analisis.analisis_estatico import _run_checks
+
+        def slow(context):
+            time.sleep(0.05)
+            return [{"title": "lento", "severity": "LOW"}]
+
+        def fast(context):
+            return [{"title": "rapido", "severity": "LOW"}]
+
+        detectors = [("slow", slow), ("fast", fast)]
+        with patch('analisis.analisis_estatico.DETECTORS', detectors):
+            for executor in ("thread", "serial"):
+                result = _run_checks(Mock(), executor=executor, max_workers=2)
+                self.assertEqual([v["title"] for v in result], ["lento", "rapido"])
+
+    def test_no_findings_adds_completed_info(self):
+        """Prueba que sin hallazgos se agrega el resultado INFO"""
+        from analisis.analisis_estatico import _run_checks
+        with patch('analisis.analisis_estatico.DETECTORS', [("vacio", lambda c: [])]):
+            result = _run_checks(Mock(), executor="serial")
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]["title"], "Analisis completado")
+
+
+
+class TestDexHttpUrls(unittest.TestCase):
+    """Pruebas para la extraccion de URLs HTTP de los DEX"""
+
+    def setUp(self):
+        import tempfile
+        import zipfile
+        from tests.test_dex import build_dex
+        self.folder = tempfile.mkdtemp()
+        self.apk_path = os.path.join(self.folder, "app.apk")
+        self.dex = build_dex([b"http://api.demo.com/v1", b"texto", b"https://ok.com"])
+        with zipfile.ZipFile(self.apk_path, "w") as zf:
+            zf.writestr("classes.dex", self.dex)
+            zf.writestr("truncado.dex", self.dex[:-5] + b" http://bytes.demo.com")
+        self.context = AnalysisContext(self.apk_path, apk=Mock())
+
+    def tearDown(self):
+        import shutil
+        self.context.close()
+        shutil.rmtree(self.folder)
+
+    def test_strings_decoded_lazily_without_lock(self):
+        """Prueba que las strings se recorren sin guardarse ni bloquear las lecturas del APK"""
+        from analisis.analisis_estatico import _dex_http_urls
+        from analisis.dex import iter_dex_strings
+        locked = []
+
+        def decode(fp, **kwargs):
+            for string in iter_dex_strings(fp, **kwargs):
+                locked.append(self.context._read_lock.locked())
+                yield string
+
+        with patch('analisis.analisis_estatico.iter_dex_strings', side_effect=decode) as dex:
+            for _ in range(2):
+                urls = _dex_http_urls(self.context, "classes.dex")
+                self.assertEqual(urls, {"http://api.demo.com/v1"})
+
+        self.assertEqual(dex.call_count, 2)
+        self.assertEqual(locked, [False] * 6)
+
+    def test_unreadable_dex_falls_back_to_bytes(self):
+        """Prueba que un DEX que falla a mitad del recorrido se escanea como bytes"""
+        from analisis.analisis_estatico import _dex_http_urls
+        urls = _dex_http_urls(self.context, "truncado.dex")
+        self.assertIn("http://bytes.demo.com", urls)
+
+class TestRuleProfiles(unittest.TestCase):
+    """Pruebas para la carga de entradas segun las reglas activas"""
+
+    def setUp(self):
+        """Crear un APK (zip) temporal con un DEX y recursos de texto"""
+        import tempfile
+        import zipfile
+        fd, self.apk_path = tempfile.mkstemp(suffix=".apk")
+        os.close(fd)
+        with zipfile.ZipFile(self.apk_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("classes.dex", "no es un dex http://ejemplo.com/api")
+            zf.writestr("res/values/strings.xml", 'api_key = "abc"')
+
+    def tearDown(self):
+        """Eliminar el APK temporal"""
+        os.remove(self.apk_path)
+
+    def _view(self):
+        return TestQuickAnalyze._view(self)
+
+    def test_registry_declares_every_detector(self):
+        """Prueba que cada detector declara entradas, severidad y categoria"""
+        from analisis.analisis_estatico import DETECTORS, PROFILES, QUICK_DETECTORS, RULES
+        from analisis.rules import INPUT_MANIFEST
+        self.assertEqual([rule.name for rule in RULES], [name for name, _ in DETECTORS])
+        self.assertEqual(PROFILES["quick"], QUICK_DETECTORS)
+        for name in QUICK_DETECTORS:
+            self.assertEqual(RULES[name].inputs, {INPUT_MANIFEST})
+        self.assertEqual(RULES["secrets"].category, "secrets")
+
+    def test_manifest_profile_never_reads_dex(self):
+        """Prueba que un perfil de solo manifest no construye APK ni lee DEX"""
+        with patch('analisis.analisis_estatico.ManifestView.from_apk_file', return_value=self._view()):
+            with patch('analisis.analisis_estatico.APK') as apk_cls:
+                with patch('analisis.analisis_estatico.iter_dex_strings') as dex:
+                    metadata, vulns = analyze(self.apk_path, ["permissions", "min_sdk"])
+
+        apk_cls.assert_not_called()
+        dex.assert_not_called()
+        self.assertEqual(metadata["scan_mode"], "custom")
+        self.assertEqual([v["title"] for v in vulns], ["Permisos peligrosos detectados"])
+
+    def test_inputs_loaded_once_and_limited(self):
+        """Prueba que cada entrada se carga una vez y no se sirven entradas no declaradas"""
+        from analisis.rules import INPUT_DEX_STRINGS, INPUT_TEXT_RESOURCES, RuleInputError
+        mock_apk = Mock()
+        mock_apk.get_files.return_value = ["classes.dex", "res/values/strings.xml"]
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            context = AnalysisContext(self.apk_path, inputs=(INPUT_DEX_STRINGS,))
+
+        try:
+            dex_names = context.input(INPUT_DEX_STRINGS)
+            self.assertIs(context.input(INPUT_DEX_STRINGS), dex_names)
+            self.assertEqual(dex_names, ["classes.dex"])
+            # Los nombres salen del directorio central del archivo mapeado
+            mock_apk.get_files.assert_not_called()
+            with self.assertRaises(RuleInputError):
+                context.input(INPUT_TEXT_RESOURCES)
+        finally:
+            context.close()
+
+    def test_unknown_profile(self):
+        """Prueba que un perfil o regla desconocidos son un error"""
+        with self.assertRaises(ValueError):
+            analyze(self.apk_path, "inexistente")
+        with self.assertRaises(ValueError):
+            analyze(self.apk_path, ["permissions", "inexistente"])
+
+
+class TestSecretEntryScanning(unittest.TestCase):
+    """Pruebas para el escaneo paralelo de secretos por entrada"""
+
+    def setUp(self):
+        """Crear un APK (zip) temporal con recursos de texto"""
+        import tempfile
+        import zipfile
+        fd, self.apk_path = tempfile.mkstemp(suffix=".apk")
+        os.close(fd)
+        with zipfile.ZipFile(self.apk_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("res/values/strings.xml", 'api_key = "abc"')
+            zf.writestr("assets/config.json", 'password: "p"\ntoken = "t"')
+            zf.writestr("assets/big.properties", 'secret = "s"' + " " * 5000)
+            zf.writestr("assets/clean.json", '{"a": 1}')
+            zf.writestr("classes.dex", 'api_key = "ignored"')
+
+    def tearDown(self):
+        """Eliminar el APK temporal"""
+        os.remove(self.apk_path)
+
+    def _context(self):
+        with patch('analisis.analisis_estatico.APK', return_value=Mock()):
+            return AnalysisContext(self.apk_path)
+
+    def test_partition_entries_balances_largest_first(self):
+        """Prueba que las particiones se equilibran y empiezan por la entrada mayor"""
+        from analisis.analisis_estatico import partition_entries
+        infos = [Mock(filename=f"f{size}", file_size=size, compress_size=0)
+                 for size in (1, 9, 5, 5, 2, 8)]
+        partitions = partition_entries(infos, 2)
+
+        self.assertEqual(len(partitions), 2)
+        self.assertEqual(sorted(n for p in partitions for n in p),
+                         sorted(i.filename for i in infos))
+        self.assertEqual(partitions[0][0], "f9")
+        loads = [sum(int(n[1:]) for n in p) for p in partitions]
+        self.assertLessEqual(abs(loads[0] - loads[1]), 1)
+
+    def test_reports_every_entry_in_zip_order(self):
+        """Prueba que los hallazgos siguen el orden del zip en todos los modos"""
+        from analisis.analisis_estatico import check_secrets
+        expected = [
+            ("res/values/strings.xml", "Posible API Key hardcodeado"),
+            ("assets/config.json", "Posible Password hardcodeado"),
+            ("assets/config.json", "Posible Secret/Token hardcodeado"),
+            ("assets/big.properties", "Posible Secret/Token hardcodeado"),
+        ]
+        for executor in ("serial", "thread", "process"):
+            with patch('analisis.analisis_estatico.SECRET_SCAN_EXECUTOR', executor):
+                result = check_secrets(self._context())
+            self.assertEqual([(v["file"], v["title"]) for v in result], expected)
+
+    def test_entry_size_limit_and_timings(self):
+        """Prueba que se omiten entradas grandes y se registra el tiempo por entrada"""
+        from analisis.analisis_estatico import check_secrets
+        context = self._context()
+        with patch('analisis.analisis_estatico.SECRET_MAX_ENTRY_SIZE', 1000):
+            result = check_secrets(context)
+
+        self.assertNotIn("assets/big.properties", [v["file"] for v in result])
+        self.assertIn("assets/config.json", context.entry_timings)
+        self.assertNotIn("classes.dex", context.entry_timings)
+
+
+    def test_slowest_entries_in_metadata(self):
+        """Prueba que analyze expone en metadata las entradas más lentas"""
+        from analisis.analisis_estatico import _slowest_entries
+        with patch('analisis.analisis_estatico.APK', return_value=Mock()):
+            with patch('analisis.analisis_estatico.SLOWEST_ENTRIES', 2):
+                metadata, _ = analyze(self.apk_path, ["secrets"])
+
+        slowest = metadata["slowest_entries"]
+        self.assertEqual(len(slowest), 2)
+        scanned = {"res/values/strings.xml", "assets/config.json",
+                   "assets/big.properties", "assets/clean.json"}
+        self.assertTrue({entry["file"] for entry in slowest} <= scanned)
+        self.assertGreaterEqual(slowest[0]["seconds"], slowest[1]["seconds"])
+
+        timings = {"a.xml": 0.01, "b.json": 0.5, "c.xml": 0.123456}
+        self.assertEqual(_slowest_entries(timings, 2), [
+            {"file": "b.json", "seconds": 0.5}, {"file": "c.xml", "seconds": 0.1235}
+        ])
+
+class TestExportedComponents(unittest.TestCase):
+    """Pruebas para la deteccion de componentes exportados con el indice"""
+
+    def test_uses_component_index_without_per_component_queries(self):
+        """Prueba que el indice evita consultar el manifest por componente"""
+        from lxml import etree
+        from analisis.analisis_estatico import check_exported_components
+        manifest = etree.fromstring(
+            b'<manifest xmlns:android="http://schemas.android.com/apk/res/android">'
+            b'<application><activity android:name=".Main" android:exported="true"/>'
+            b'<service android:name=".Svc" android:exported="false"/></application></manifest>'
+        )
+        mock_apk = Mock()
+        mock_apk.get_android_manifest_xml.return_value = manifest
+        mock_apk.get_package.return_value = "com.demo"
+
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            result = check_exported_components(AnalysisContext("test.apk"))
+
+        self.assertEqual(result[0]["evidence"], "Activities: Main")
+        mock_apk.get_attribute_value.assert_not_called()
+        mock_apk.get_activities.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,123 @@
+"""
+Pruebas unitarias para el módulo archive (lectura del APK sobre mmap)
+"""
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from lxml import etree
+
+from analisis.analisis_estatico import AnalysisContext
+from analisis.archive import MappedArchive
+from analisis.manifest import ManifestView
+
+PAYLOAD = b"".join(hashlib.sha256(b"%d" % i).digest() for i in range(3000))
+
+
+class TestMappedArchive(unittest.TestCase):
+    """Pruebas para MappedArchive"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.apk_path = os.path.join(self.folder, "app.apk")
+        with zipfile.ZipFile(self.apk_path, "w") as zf:
+            zf.writestr("AndroidManifest.xml", b"\x00" * 10)
+            zf.writestr("classes.dex", PAYLOAD, compress_type=zipfile.ZIP_STORED)
+            zf.writestr("assets/datos.bin", PAYLOAD, compress_type=zipfile.ZIP_DEFLATED)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_stored_view_is_zero_copy(self):
+        """Prueba que una entrada guardada se expone como vista del mmap"""
+        with MappedArchive(self.apk_path) as archive:
+            with archive.view("classes.dex") as view:
+                self.assertIsInstance(view, memoryview)
+                self.assertIsInstance(view.obj, mmap.mmap)
+                self.assertEqual(view.tobytes(), PAYLOAD)
+            with self.assertRaises(ValueError):
+                with archive.view("assets/datos.bin"):
+                    pass
+
+    def test_read_and_chunks_match_zipfile(self):
+        """Prueba que read e iter_chunks devuelven el contenido de zipfile"""
+        with MappedArchive(self.apk_path) as archive:
+            for name in ("classes.dex", "assets/datos.bin"):
+                self.assertEqual(archive.read(name), PAYLOAD)
+                chunks = [bytes(chunk) for chunk in archive.iter_chunks(name, 4096)]
+                self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+                self.assertEqual(b"".join(chunks), PAYLOAD)
+
+    def test_raw_digest_matches_raw_entry_digest(self):
+        """Prueba que el hash de los bytes guardados coincide con raw_entry_digest"""
+        from analisis.entry_cache import raw_entry_digest
+        with MappedArchive(self.apk_path) as archive, open(self.apk_path, "rb") as fp:
+            for name in ("classes.dex", "assets/datos.bin"):
+                expected = raw_entry_digest(fp, archive.getinfo(name))
+                self.assertEqual(archive.raw_digest(name, chunk_size=1000), expected)
+
+    def test_open_stored_entry(self):
+        """Prueba lectura y seek sobre una entrada guardada"""
+        with MappedArchive(self.apk_path) as archive:
+            with archive.open("classes.dex") as fp:
+                self.assertEqual(fp.read(10), PAYLOAD[:10])
+                fp.seek(5000)
+                self.assertEqual(fp.read(), PAYLOAD[5000:])
+                self.assertEqual(fp.read(10), b"")
+
+    def test_read_past_end_is_capped(self):
+        """Prueba que read con un tamaño enorme devuelve solo lo que queda"""
+        with MappedArchive(self.apk_path) as archive:
+            with archive.open("classes.dex") as fp:
+                fp.seek(len(PAYLOAD) - 10)
+                self.assertEqual(fp.read(1 << 40), PAYLOAD[-10:])
+                self.assertEqual(fp.read(1 << 40), b"")
+
+    def test_close_with_live_view(self):
+        """Prueba que cerrar con una vista aún viva no falla"""
+        archive = MappedArchive(self.apk_path)
+        chunk = next(archive.iter_chunks("classes.dex", 1024))
+        archive.close()
+        del chunk
+
+    def test_context_reads_manifest_without_androguard(self):
+        """Prueba que el contexto decodifica el manifest del archivo sin construir APK"""
+        view = ManifestView(etree.fromstring(b'<manifest package="com.demo"/>'))
+        with patch('analisis.analisis_estatico.ManifestView.from_bytes', return_value=view) as parse:
+            with patch('analisis.analisis_estatico.APK') as apk_cls:
+                context = AnalysisContext(self.apk_path)
+        try:
+            apk_cls.assert_not_called()
+            parse.assert_called_once_with(b"\x00" * 10)
+            self.assertIs(context.apk, view)
+            self.assertEqual(context.input("dex_strings"), ["classes.dex"])
+        finally:
+            context.close()
+
+    def test_context_falls_back_to_androguard(self):
+        """Prueba que un zip que zipfile no lee se delega en APK de androguard"""
+        broken = os.path.join(self.folder, "roto.apk")
+        with open(broken, "wb") as fp:
+            fp.write(b"no es un zip")
+        with patch('analisis.analisis_estatico.APK') as apk_cls:
+            context = AnalysisContext(broken)
+        apk_cls.assert_called_once_with(broken)
+        self.assertIs(context.apk, apk_cls.return_value)
+        context.close()
+
+    def test_context_memory_error_is_not_retried(self):
+        """Prueba que un MemoryError no recurre a APK, que cargaría el APK entero"""
+        with patch('analisis.analisis_estatico.ManifestView.from_bytes', side_effect=MemoryError):
+            with patch('analisis.analisis_estatico.APK') as apk_cls:
+                with self.assertRaises(MemoryError):
+                    AnalysisContext(self.apk_path)
+        apk_cls.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Pruebas unitarias para el analisis por lotes desde linea de comandos
+Prueba la seleccion de APKs, la reanudacion y la salida JSONL
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from analisis.batch import collect_apks, format_summary, load_completed, main, run_batch
+
+
+def fake_analyze(apk_path):
+    if apk_path.endswith("roto.apk"):
+        raise RuntimeError("worker caido")
+    return {"app_name": os.path.basename(apk_path)}, [{"severity": "HIGH"}]
+
+
+def crashing_analyze(apk_path):
+    if apk_path.endswith("crash.apk"):
+        os._exit(1)
+    return fake_analyze(apk_path)
+
+
+class TestCollectApks(unittest.TestCase):
+    """Pruebas para collect_apks"""
+
+    def setUp(self):
+        """Crear un arbol temporal con APKs y otros ficheros"""
+        self.folder = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.folder, "sub"))
+        for name in ("b.apk", "a.APK", "notas.txt", os.path.join("sub", "c.apk")):
+            with open(os.path.join(self.folder, name), "wb") as f:
+                f.write(b"PK")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_directory_is_recursive_and_sorted(self):
+        """Prueba que un directorio se recorre entero y en orden"""
+        paths = collect_apks([self.folder])
+        names = [os.path.relpath(p, self.folder) for p in paths]
+        self.assertEqual(names, ["a.APK", "b.apk", os.path.join("sub", "c.apk")])
+
+    def test_globs_files_and_duplicates(self):
+        """Prueba globs y ficheros sueltos sin duplicados"""
+        paths = collect_apks([
+            os.path.join(self.folder, "*.apk"),
+            os.path.join(self.folder, "b.apk"),
+            os.path.join(self.folder, "no_existe.apk"),
+        ])
+        self.assertEqual(paths, [os.path.join(self.folder, "b.apk")])
+
+
+class TestResume(unittest.TestCase):
+    """Pruebas para load_completed"""
+
+    def setUp(self):
+        fd, self.output = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.output)
+
+    def test_partial_last_line_is_dropped(self):
+        """Prueba que una ultima linea incompleta se descarta del fichero"""
+        with open(self.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"path": "/a.apk"}) + "\n")
+            f.write('{"path": "/b.a')
+
+        self.assertEqual(load_completed(self.output), {"/a.apk"})
+        with open(self.output, encoding="utf-8") as f:
+            self.assertEqual(f.read(), json.dumps({"path": "/a.apk"}) + "\n")
+
+    def test_missing_output(self):
+        """Prueba que sin fichero previo no hay APKs completados"""
+        self.assertEqual(load_completed(self.output + ".nuevo"), set())
+
+
+class TestRunBatch(unittest.TestCase):
+    """Pruebas para run_batch"""
+
+    @patch('os.path.getsize', return_value=1024 * 1024)
+    @patch('analisis.batch.analyze', side_effect=fake_analyze)
+    def test_one_line_per_apk(self, mock_analyze, mock_size):
+        """Prueba que se escribe una linea JSON por APK, incluidos los fallos"""
+        out = io.StringIO()
+        summary = run_batch(
+            ["/x/a.apk", "/x/roto.apk", "/x/b.apk"], out, workers=2,
+            executor_factory=ThreadPoolExecutor
+        )
+
+        records = {r["path"]: r for r in map(json.loads, out.getvalue().splitlines())}
+        self.assertEqual(set(records), {"/x/a.apk", "/x/roto.apk", "/x/b.apk"})
+        self.assertEqual(records["/x/a.apk"]["metadata"]["app_name"], "a.apk")
+        self.assertEqual(records["/x/a.apk"]["risk"], "BAJO")
+        self.assertIn("worker caido", records["/x/roto.apk"]["error"])
+        self.assertEqual(summary["apks"], 3)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["bytes"], 2 * 1024 * 1024)
+
+    @patch('analisis.batch.IN_FLIGHT_PER_WORKER', 1)
+    @patch('os.path.getsize', return_value=10)
+    @patch('analisis.batch.analyze', side_effect=crashing_analyze)
+    def test_crashed_worker_does_not_abort_batch(self, mock_analyze, mock_size):
+        """Prueba que la muerte de un worker se registra como error y el lote sigue"""
+        out = io.StringIO()
+        paths = ["/x/a.apk", "/x/crash.apk", "/x/b.apk", "/x/c.apk"]
+        summary = run_batch(paths, out, workers=1)
+
+        records = {r["path"]: r for r in map(json.loads, out.getvalue().splitlines())}
+        self.assertEqual(set(records), set(paths))
+        self.assertIn("BrokenProcessPool", records["/x/crash.apk"]["error"])
+        for path in ("/x/a.apk", "/x/b.apk", "/x/c.apk"):
+            self.assertNotIn("error", records[path])
+        self.assertEqual(summary["apks"], 4)
+        self.assertEqual(summary["errors"], 1)
+
+    @patch('analisis.batch.quick_analyze', side_effect=fake_analyze)
+    @patch('analisis.batch.analyze')
+    def test_quick_mode(self, mock_analyze, mock_quick):
+        """Prueba que --quick usa el analisis de solo manifest"""
+        with patch('os.path.getsize', return_value=10):
+            run_batch(["/x/a.apk"], io.StringIO(), workers=1, quick=True,
+                      executor_factory=ThreadPoolExecutor)
+        mock_quick.assert_called_once_with("/x/a.apk")
+        mock_analyze.assert_not_called()
+
+    @patch('analisis.batch.analyze', side_effect=lambda path, rules=None: fake_analyze(path))
+    def test_rules_subset(self, mock_analyze):
+        """Prueba que --rules pasa los nombres de regla al analisis"""
+        with patch('os.path.getsize', return_value=10):
+            run_batch(["/x/a.apk"], io.StringIO(), workers=1,
+                      executor_factory=ThreadPoolExecutor, rules=["permissions"])
+        mock_analyze.assert_called_once_with("/x/a.apk", ["permissions"])
+
+    def test_format_summary(self):
+        """Prueba el resumen de rendimiento"""
+        text = format_summary({"apks": 4, "errors": 0, "bytes": 8 * 1024 * 1024, "seconds": 2.0})
+        self.assertIn("2.00 APKs/s", text)
+        self.assertIn("4.00 MB/s", text)
+
+
+class TestMain(unittest.TestCase):
+    """Pruebas para los argumentos de main"""
+
+    def test_resume_requires_output(self):
+        """Prueba que --resume sin --output es un error de uso"""
+        with patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                main(["--resume", "apks/"])
+
+    def test_unknown_rule_is_usage_error(self):
+        """Prueba que una regla desconocida en --rules es un error de uso"""
+        with patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                main(["--rules", "permissions,no_existe", "apks/"])
+
+
+if __name__ == '__main__':
+    unittest.main()
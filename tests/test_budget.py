@@ -0,0 +1,117 @@
+"""
+Pruebas unitarias para el presupuesto de tiempo de los análisis
+"""
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from analisis.budget import Budget, BudgetExceeded, Deadline
+
+
+class TestDeadline(unittest.TestCase):
+    """Pruebas para Deadline"""
+
+    def test_unlimited(self):
+        """Prueba que 0 o None no tienen límite"""
+        for seconds in (0, None):
+            deadline = Deadline.after(seconds)
+            self.assertFalse(deadline.expired())
+            self.assertIsNone(deadline.remaining())
+
+    def test_earliest(self):
+        """Prueba que se elige el límite más restrictivo"""
+        near, far, unlimited = Deadline(10.0), Deadline(20.0), Deadline()
+        self.assertIs(near.earliest(far), near)
+        self.assertIs(far.earliest(near), near)
+        self.assertIs(unlimited.earliest(far), far)
+        self.assertIs(far.earliest(unlimited), far)
+
+    def test_expired(self):
+        """Prueba un límite ya vencido"""
+        deadline = Deadline(time.monotonic() - 1)
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.remaining(), 0.0)
+
+
+class TestBudget(unittest.TestCase):
+    """Pruebas para Budget"""
+
+    def test_detector_timeout_marks_stage(self):
+        """Prueba que un detector que agota su plazo queda omitido sin hallazgos"""
+        budget = Budget.start(detector_timeout=0.01)
+
+        def slow(context):
+            while True:
+                time.sleep(0.005)
+                context.check_time()
+
+        context = Mock()
+        context.check_time.side_effect = budget.check
+        self.assertEqual(budget.run("lento", slow, context), [])
+        self.assertEqual(budget.run("rapido", lambda c: ["ok"], context), ["ok"])
+        self.assertEqual(budget.skipped(["rapido", "lento"]), ["lento"])
+
+    def test_expired_analysis_skips_remaining(self):
+        """Prueba que con el plazo total vencido los detectores no empiezan"""
+        budget = Budget(Deadline(time.monotonic() - 1))
+        detector = Mock()
+        self.assertEqual(budget.run("secrets", detector, Mock()), [])
+        detector.assert_not_called()
+        self.assertEqual(budget.skipped(), ["secrets"])
+
+    def test_check_outside_detector(self):
+        """Prueba el punto de control fuera de un detector"""
+        budget = Budget(Deadline(time.monotonic() - 1))
+        with self.assertRaises(BudgetExceeded) as raised:
+            budget.check()
+        self.assertEqual(raised.exception.stage, "analisis")
+
+
+class TestPartialAnalysis(unittest.TestCase):
+    """Pruebas del resultado parcial de _run_checks"""
+
+    def test_stuck_detector_is_not_awaited(self):
+        """Prueba que al vencer el plazo se devuelven los detectores terminados"""
+        from analisis.analisis_estatico import _run_checks
+        release = threading.Event()
+
+        def stuck(context):
+            release.wait(5)
+            return [{"title": "tarde", "severity": "LOW"}]
+
+        def fast(context):
+            return [{"title": "rapido", "severity": "LOW"}]
+
+        budget = Budget.start(timeout=0.1)
+        start = time.monotonic()
+        try:
+            result = _run_checks(Mock(), executor="thread", max_workers=2,
+                                 detectors=[("atascado", stuck), ("rapido", fast)],
+                                 budget=budget)
+        finally:
+            release.set()
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual([v["title"] for v in result],
+                         ["rapido", "Analisis parcial (tiempo agotado)"])
+        self.assertEqual(result[-1]["evidence"], "Omitidos: atascado")
+        self.assertEqual(budget.skipped(), ["atascado"])
+
+    def test_analyze_marks_partial_metadata(self):
+        """Prueba que analyze marca la metadata como parcial y lista las etapas"""
+        from lxml import etree
+        from analisis.analisis_estatico import analyze
+        from analisis.manifest import ManifestView
+        view = ManifestView(etree.fromstring(b'<manifest package="com.demo"/>'))
+        with patch('analisis.analisis_estatico.ManifestView.from_apk_file', return_value=view):
+            with patch('os.path.getsize', return_value=1024):
+                metadata, vulns = analyze("test.apk", ["permissions", "min_sdk"], timeout=1e-9)
+
+        self.assertTrue(metadata["partial"])
+        self.assertEqual(metadata["skipped"], ["permissions", "min_sdk"])
+        self.assertEqual(vulns[0]["title"], "Analisis parcial (tiempo agotado)")
+
+
+if __name__ == '__main__':
+    unittest.main()
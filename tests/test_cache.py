@@ -0,0 +1,83 @@
+"""
+Pruebas unitarias para la cache de resultados
+Prueba el almacenamiento por hash de contenido y la politica LRU
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from analisis.cache import ResultCache, sha256_file
+
+
+class TestSha256File(unittest.TestCase):
+    """Pruebas para el calculo del hash de contenido"""
+
+    def test_sha256_file_matches_hashlib(self):
+        """Prueba que el hash por bloques coincide con hashlib"""
+        import hashlib
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b"PK\x03\x04" + b"x" * 5000)
+            path = f.name
+        try:
+            expected = hashlib.sha256(b"PK\x03\x04" + b"x" * 5000).hexdigest()
+            self.assertEqual(sha256_file(path), expected)
+        finally:
+            os.remove(path)
+
+
+class TestResultCache(unittest.TestCase):
+    """Pruebas para ResultCache"""
+
+    def setUp(self):
+        """Configurar directorio temporal de cache"""
+        self.test_dir = tempfile.mkdtemp()
+        self.entry = {
+            "filename": "app.apk",
+            "metadata": {"package": "com.test.app"},
+            "vulnerabilities": [{"title": "Test", "severity": "HIGH"}],
+            "risk": "MEDIO",
+            "report": "INFORME"
+        }
+
+    def tearDown(self):
+        """Limpiar directorio temporal"""
+        shutil.rmtree(self.test_dir)
+
+    def test_get_missing_returns_none(self):
+        """Prueba que una entrada inexistente devuelve None"""
+        cache = ResultCache(self.test_dir, 1024 * 1024, "1")
+        self.assertIsNone(cache.get("abc"))
+
+    def test_put_and_get_roundtrip(self):
+        """Prueba guardar y recuperar una entrada"""
+        cache = ResultCache(self.test_dir, 1024 * 1024, "1")
+        cache.put("abc", self.entry)
+        self.assertEqual(cache.get("abc"), self.entry)
+
+    def test_ruleset_version_invalidates_entries(self):
+        """Prueba que otra version de reglas no reutiliza entradas"""
+        ResultCache(self.test_dir, 1024 * 1024, "1").put("abc", self.entry)
+        self.assertIsNone(ResultCache(self.test_dir, 1024 * 1024, "2").get("abc"))
+
+    def test_evicts_least_recently_used(self):
+        """Prueba que se elimina primero la entrada usada hace mas tiempo"""
+        cache = ResultCache(self.test_dir, 1024 * 1024, "1")
+        cache.put("old", self.entry)
+        cache.put("new", self.entry)
+        os.utime(cache._path("old"), (1000, 1000))
+        os.utime(cache._path("new"), (2000, 2000))
+
+        # Un acierto refresca la entrada antigua
+        cache.get("old")
+        entry_size = os.path.getsize(cache._path("old"))
+        cache.max_size = entry_size * 2
+        cache.put("third", self.entry)
+
+        self.assertIsNotNone(cache.get("old"))
+        self.assertIsNone(cache.get("new"))
+        self.assertIsNotNone(cache.get("third"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Pruebas unitarias para el lector de strings DEX
+Prueba el recorrido de string_ids y la decodificacion MUTF-8
+"""
+
+import io
+import struct
+import unittest
+from analisis.dex import DexFormatError, decode_mutf8, iter_dex_strings
+
+
+def _uleb128(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def build_dex(raw_strings, gap=0):
+    """Construye un DEX minimo con la tabla de strings indicada (bytes MUTF-8)"""
+    header = bytearray(0x70)
+    header[0:8] = b"dex\n035\x00"
+    ids_off = 0x70
+    data_off = ids_off + 4 * len(raw_strings) + gap
+    data = bytearray()
+    offsets = []
+    for raw in raw_strings:
+        offsets.append(data_off + len(data))
+        data += _uleb128(len(raw)) + raw + b"\x00"
+    struct.pack_into("<II", header, 0x38, len(raw_strings), ids_off)
+    ids = b"".join(struct.pack("<I", off) for off in offsets)
+    struct.pack_into("<I", header, 0x20, len(header) + len(ids) + gap + len(data))
+    return bytes(header) + ids + b"\xff" * gap + bytes(data)
+
+
+class TestDecodeMutf8(unittest.TestCase):
+    """Pruebas para decode_mutf8"""
+
+    def test_ascii(self):
+        """Prueba la decodificacion de texto ASCII"""
+        self.assertEqual(decode_mutf8(b"http://example.com"), "http://example.com")
+
+    def test_embedded_null(self):
+        """Prueba que C0 80 se decodifica como caracter nulo"""
+        self.assertEqual(decode_mutf8(b"a\xc0\x80b"), "a\x00b")
+
+    def test_surrogate_pair(self):
+        """Prueba que un par suplente en 3+3 bytes se une en un solo caracter"""
+        raw = "\ud83d\ude00".encode("utf-8", "surrogatepass")
+        self.assertEqual(decode_mutf8(raw), "\U0001F600")
+
+
+class TestIterDexStrings(unittest.TestCase):
+    """Pruebas para iter_dex_strings"""
+
+    STRINGS = [b"Lcom/example/Main;", b"http://api.example.com/v1", b"x" * 300,
+               "cañón".encode("utf-8")]
+
+    def test_reads_all_strings(self):
+        """Prueba que se devuelven todas las constantes de string"""
+        dex = build_dex(self.STRINGS)
+        result = list(iter_dex_strings(io.BytesIO(dex)))
+        self.assertEqual(sorted(result), sorted(s.decode("utf-8") for s in self.STRINGS))
+
+    def test_small_blocks_give_same_result(self):
+        """Prueba que el tamano de bloque no cambia el resultado"""
+        dex = build_dex(self.STRINGS, gap=37)
+        expected = list(iter_dex_strings(io.BytesIO(dex)))
+        for block_size in (1, 2, 7, 64):
+            self.assertEqual(list(iter_dex_strings(io.BytesIO(dex), block_size)), expected)
+
+    def test_empty_string_table(self):
+        """Prueba un DEX sin strings"""
+        self.assertEqual(list(iter_dex_strings(io.BytesIO(build_dex([])))), [])
+
+    def test_invalid_magic_raises(self):
+        """Prueba que una cabecera no DEX lanza DexFormatError"""
+        with self.assertRaises(DexFormatError):
+            list(iter_dex_strings(io.BytesIO(b"\x00" * 0x70)))
+
+    def test_truncated_dex_raises(self):
+        """Prueba que un DEX truncado lanza DexFormatError"""
+        dex = build_dex(self.STRINGS)
+        with self.assertRaises(DexFormatError):
+            list(iter_dex_strings(io.BytesIO(dex[:-5])))
+
+    def test_forged_table_sizes_raise(self):
+        """Prueba que string_ids o string_data fuera del tamaño del DEX lanzan DexFormatError"""
+        dex = bytearray(build_dex(self.STRINGS))
+        struct.pack_into("<I", dex, 0x38, 0x3FFFFFFF)
+        with self.assertRaises(DexFormatError):
+            list(iter_dex_strings(io.BytesIO(bytes(dex))))
+
+        dex = build_dex(self.STRINGS)
+        with self.assertRaises(DexFormatError):
+            list(iter_dex_strings(io.BytesIO(dex), size=0x74))
+
+        dex = bytearray(build_dex(self.STRINGS))
+        struct.pack_into("<I", dex, 0x70, len(dex) + 100)
+        with self.assertRaises(DexFormatError):
+            list(iter_dex_strings(io.BytesIO(bytes(dex))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Pruebas unitarias para el módulo entry_cache (cache de resultados por entrada entre APKs)
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import Mock, patch
+
+from analisis.analisis_estatico import analyze
+from analisis.entry_cache import SharedEntryCache, raw_entry_digest
+
+SHARED_CONFIG = 'token = "abc"\n' + '{"licencia": "Apache-2.0"}\n' * 500
+
+
+class TestRawEntryDigest(unittest.TestCase):
+    """Pruebas para raw_entry_digest"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _zip(self, name, entries):
+        path = os.path.join(self.folder, name)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for entry_name, content in entries:
+                zf.writestr(entry_name, content)
+        return path
+
+    def test_hashes_stored_bytes_without_decompressing(self):
+        """Prueba que el hash es el de los bytes comprimidos y no depende de la posición"""
+        first = self._zip("a.apk", [("assets/licencia.json", SHARED_CONFIG)])
+        second = self._zip("b.apk", [("otro.xml", "x" * 100), ("assets/licencia.json", SHARED_CONFIG)])
+
+        digests = []
+        for path in (first, second):
+            with zipfile.ZipFile(path) as zf, open(path, "rb") as fp:
+                info = zf.getinfo("assets/licencia.json")
+                fp.seek(info.header_offset + 30 + len(info.filename.encode()) + len(info.extra))
+                raw = fp.read(info.compress_size)
+                digests.append(raw_entry_digest(fp, info))
+        self.assertEqual(digests[0], digests[1])
+        self.assertEqual(digests[0], hashlib.sha256(raw).hexdigest())
+
+
+class TestSharedEntryCache(unittest.TestCase):
+    """Pruebas para SharedEntryCache"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.folder, "shared.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_get_and_ruleset_isolation(self):
+        """Prueba que un resultado solo se sirve con la misma clave y versión de reglas"""
+        cache = SharedEntryCache(self.db_path, 10, "1")
+        cache.update([], [("secrets", 1, 100, "h", ["API Key"])])
+
+        self.assertEqual(cache.get("secrets", 1, 100, "h"), ["API Key"])
+        self.assertIsNone(cache.get("secrets", 1, 100, "otro"))
+        self.assertIsNone(cache.get("http_urls", 1, 100, "h"))
+        self.assertIsNone(SharedEntryCache(self.db_path, 10, "2").get("secrets", 1, 100, "h"))
+
+    def test_lru_eviction_keeps_recently_used(self):
+        """Prueba que se expulsan primero los resultados usados hace más tiempo"""
+        cache = SharedEntryCache(self.db_path, 2, "1")
+        with patch('analisis.entry_cache.time.time', side_effect=[1.0, 2.0, 3.0, 4.0]):
+            cache.update([], [("secrets", 1, 1, "a", [])])
+            cache.update([], [("secrets", 2, 2, "b", [])])
+            cache.update([("secrets", 1, 1, "a")], [])
+            cache.update([], [("secrets", 3, 3, "c", [])])
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("secrets", 1, 1, "a"), [])
+        self.assertIsNone(cache.get("secrets", 2, 2, "b"))
+
+    def test_can_be_sent_to_workers(self):
+        """Prueba que la cache se puede serializar para procesos worker"""
+        cache = SharedEntryCache(self.db_path, 10, "1")
+        cache.update([], [("secrets", 1, 100, "h", ["Password"])])
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(copy.get("secrets", 1, 100, "h"), ["Password"])
+
+
+class TestSharedCacheAnalyze(unittest.TestCase):
+    """Pruebas de la cache compartida entre APKs de paquetes distintos"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = SharedEntryCache(os.path.join(self.folder, "shared.db"), 100, "1")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _analyze(self, name, package, executor="thread"):
+        path = os.path.join(self.folder, name)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("assets/licencia.json", SHARED_CONFIG)
+            zf.writestr("res/values/strings.xml", f'<string name="app">{package}</string>')
+        mock_apk = Mock()
+        mock_apk.get_package.return_value = package
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            with patch('analisis.analisis_estatico.SECRET_SCAN_EXECUTOR', "serial"), \
+                    patch('analisis.analisis_estatico.DETECTOR_EXECUTOR', executor):
+                return analyze(path, ["secrets"], shared_cache=self.cache)
+
+    def test_identical_entry_scanned_once_across_apks(self):
+        """Prueba que una entrada idéntica en otro APK no se vuelve a leer ni escanear"""
+        metadata, first = self._analyze("uno.apk", "com.uno")
+        self.assertEqual(metadata["incremental"]["shared"], 0)
+
+        with patch('analisis.analisis_estatico.find_secret_types', return_value=[]) as scan:
+            metadata, second = self._analyze("dos.apk", "com.dos")
+
+        # Solo se escanea la entrada pequena (por debajo de min_size)
+        self.assertEqual(scan.call_count, 1)
+        self.assertEqual(metadata["incremental"], {"reused": 0, "shared": 1, "scanned": 1})
+        self.assertEqual([v["title"] for v in second], [v["title"] for v in first])
+        self.assertEqual(second[0]["title"], "Posible Secret/Token hardcodeado")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Pruebas unitarias para el historial en SQLite
+Prueba el orden, la migracion desde history.json y la escritura concurrente
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from analisis.history import HistoryStore
+
+
+class TestHistoryStore(unittest.TestCase):
+    """Pruebas para HistoryStore"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.folder, "history.db")
+        self.json_path = os.path.join(self.folder, "history.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_wal_and_indexes(self):
+        """Prueba que la base usa WAL e indices por timestamp, package y risk"""
+        HistoryStore(self.db_path).close()
+        conn = sqlite3.connect(self.db_path)
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(history)")}
+        conn.close()
+
+        self.assertEqual(mode, "wal")
+        self.assertTrue({"idx_history_timestamp", "idx_history_package",
+                         "idx_history_risk"} <= indexes)
+
+    def test_add_list_and_count(self):
+        """Prueba que las entradas se devuelven completas y la mas reciente primero"""
+        store = HistoryStore(self.db_path)
+        store.add({"timestamp": "1", "package": "a", "extra": [1, 2]})
+        store.add({"timestamp": "2", "package": "b"})
+
+        self.assertEqual(store.count(), 2)
+        self.assertEqual(store.list(), [
+            {"timestamp": "2", "package": "b"},
+            {"timestamp": "1", "package": "a", "extra": [1, 2]},
+        ])
+        self.assertEqual(len(store.list(limit=1)), 1)
+        store.close()
+
+    def test_page_uses_cursor(self):
+        """Prueba que las paginas se encadenan por cursor sin repetir entradas"""
+        store = HistoryStore(self.db_path)
+        for i in range(5):
+            store.add({"timestamp": f"2025-01-0{i + 1} 10:00", "n": i})
+
+        first, cursor = store.page(2)
+        second, cursor = store.page(2, cursor)
+        third, last_cursor = store.page(2, cursor)
+
+        self.assertEqual([e["n"] for e in first + second + third], [4, 3, 2, 1, 0])
+        self.assertIsNone(last_cursor)
+        store.close()
+
+    def test_filters(self):
+        """Prueba los filtros de riesgo, paquete, fechas y minimo de altas"""
+        store = HistoryStore(self.db_path)
+        store.add({"timestamp": "2025-01-10 09:00", "package": "a", "risk": "ALTO", "vulns_high": 3})
+        store.add({"timestamp": "2025-01-13 23:59", "package": "b", "risk": "BAJO", "vulns_high": 0})
+        store.add({"timestamp": "2025-01-14 00:00", "package": "a", "risk": "MEDIO", "vulns_high": 1})
+
+        def packages(**filters):
+            return [(e["package"], e["risk"]) for e in store.page(10, **filters)[0]]
+
+        self.assertEqual(packages(risk="ALTO"), [("a", "ALTO")])
+        self.assertEqual(packages(package="a"), [("a", "MEDIO"), ("a", "ALTO")])
+        self.assertEqual(packages(date_from="2025-01-11", date_to="2025-01-13"), [("b", "BAJO")])
+        self.assertEqual(packages(min_high=1), [("a", "MEDIO"), ("a", "ALTO")])
+        self.assertEqual(store.count(package="a", min_high=2), 1)
+        store.close()
+
+    def test_migrates_json_once(self):
+        """Prueba que history.json se importa una sola vez conservando el orden"""
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump([{"timestamp": "nuevo"}, {"timestamp": "viejo"}], f)
+
+        store = HistoryStore(self.db_path, legacy_json=self.json_path)
+        store.add({"timestamp": "posterior"})
+        store.close()
+        store = HistoryStore(self.db_path, legacy_json=self.json_path)
+
+        self.assertEqual(
+            [e["timestamp"] for e in store.list()],
+            ["posterior", "nuevo", "viejo"]
+        )
+        self.assertTrue(os.path.exists(self.json_path))
+        store.close()
+
+    def test_concurrent_writers_keep_all_entries(self):
+        """Prueba que escritores concurrentes no pierden entradas"""
+        store = HistoryStore(self.db_path)
+
+        def writer(n):
+            for i in range(25):
+                store.add({"timestamp": f"{n}-{i}"})
+            store.close()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(store.count(), 100)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
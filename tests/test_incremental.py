@@ -0,0 +1,193 @@
+"""
+Pruebas unitarias para el módulo incremental (resultados por entrada entre versiones)
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import Mock, patch
+
+from analisis.analisis_estatico import analyze
+from analisis.incremental import EntryResults, PackageEntryCache
+
+
+class TestEntryResults(unittest.TestCase):
+    """Pruebas para EntryResults y PackageEntryCache"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = PackageEntryCache(os.path.join(self.folder, "entries"), 1024 * 1024, "1")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _results(self, entries, package="com.demo", cache=None,
+                 compress_type=zipfile.ZIP_DEFLATED):
+        """EntryResults sobre un APK (zip) nuevo con las entradas indicadas"""
+        fd, path = tempfile.mkstemp(suffix=".apk", dir=self.folder)
+        os.close(fd)
+        with zipfile.ZipFile(path, "w", compress_type) as zf:
+            for name, content in entries.items():
+                zf.writestr(name, content)
+        with zipfile.ZipFile(path) as zf:
+            infos = zf.infolist()
+        results = EntryResults(cache or self.cache, package, infos, apk_path=path)
+        self.addCleanup(results.close)
+        return results
+
+    def test_unchanged_entries_reused_changed_rescanned(self):
+        """Prueba que solo se recalculan las entradas que cambiaron"""
+        first = self._results({"a.xml": "api_key", "b.xml": "limpio"})
+        first.get("secrets", "a.xml", lambda: ["API Key"])
+        first.get("secrets", "b.xml", lambda: [])
+        first.save()
+
+        second = self._results({"a.xml": "api_key", "b.xml": "password"})
+        compute = Mock(return_value=["Password"])
+        self.assertEqual(second.get("secrets", "a.xml", compute), ["API Key"])
+        compute.assert_not_called()
+        self.assertEqual(second.get("secrets", "b.xml", compute), ["Password"])
+        self.assertEqual((second.reused, second.scanned), (1, 1))
+
+    def test_same_crc_and_size_with_other_bytes_is_rescanned(self):
+        """Prueba que CRC32 y tamaño iguales no bastan si los bytes guardados difieren"""
+        first = self._results({"a.xml": "api_key" * 20}, compress_type=zipfile.ZIP_STORED)
+        first.record("secrets", "a.xml", ["API Key"])
+        first.save()
+
+        second = self._results({"a.xml": "api_key" * 20})
+        self.assertEqual(second.lookup("secrets", "a.xml"), (False, None))
+
+    def test_entries_without_digest_are_rescanned(self):
+        """Prueba que resultados guardados sin hash (formato previo o manipulados) no se reutilizan"""
+        results = self._results({"a.xml": "api_key"})
+        info = results._infos["a.xml"]
+        self.cache.put("com.demo", {"package": "com.demo", "entries": {
+            "a.xml": {"crc": info.CRC, "size": info.file_size, "results": {"secrets": []}}
+        }})
+
+        again = self._results({"a.xml": "api_key"})
+        self.assertEqual(again.lookup("secrets", "a.xml"), (False, None))
+
+    def test_saved_entries_follow_current_version(self):
+        """Prueba que se conservan los resultados previos sin cambios y se descartan entradas borradas"""
+        first = self._results({"a.xml": "api_key", "viejo.xml": "v"})
+        first.record("secrets", "a.xml", ["API Key"])
+        first.record("secrets", "viejo.xml", [])
+        first.save()
+
+        second = self._results({"a.xml": "api_key", "classes.dex": "dex"})
+        second.record("http_urls", "classes.dex", ["http://a"])
+        entries = second.entries()
+        self.assertEqual(set(entries), {"a.xml", "classes.dex"})
+        self.assertEqual(entries["a.xml"]["results"], {"secrets": ["API Key"]})
+        self.assertEqual(len(entries["a.xml"]["digest"]), 64)
+
+    def test_packages_and_rulesets_are_isolated(self):
+        """Prueba que otro paquete u otra versión de reglas no reutilizan resultados"""
+        first = self._results({"a.xml": "api_key"})
+        first.record("secrets", "a.xml", ["API Key"])
+        first.save()
+
+        same = self._results({"a.xml": "api_key"})
+        other_package = self._results({"a.xml": "api_key"}, package="com.otra")
+        other_rules = self._results(
+            {"a.xml": "api_key"},
+            cache=PackageEntryCache(os.path.join(self.folder, "entries"), 1024 * 1024, "2")
+        )
+        self.assertEqual(same.lookup("secrets", "a.xml"), (True, ["API Key"]))
+        self.assertEqual(other_package.lookup("secrets", "a.xml"), (False, None))
+        self.assertEqual(other_rules.lookup("secrets", "a.xml"), (False, None))
+
+    def test_export_and_merge_between_processes(self):
+        """Prueba que export entrega lo nuevo una vez y merge lo incorpora a otro EntryResults"""
+        worker = self._results({"a.xml": "uno", "b.xml": "dos"})
+        worker.record("secrets", "a.xml", ["API Key"])
+        state = worker.export()
+        self.assertEqual(worker.export()["results"], {})
+
+        parent = self._results({"a.xml": "uno", "b.xml": "dos"})
+        parent.merge(state)
+        self.assertEqual(parent.scanned, 1)
+        self.assertEqual(parent.entries()["a.xml"]["results"], {"secrets": ["API Key"]})
+        self.assertNotIn("b.xml", parent.entries())
+
+    def test_late_record_after_save_is_ignored(self):
+        """Prueba que un detector que termina tras save no reabre el APK ni registra nada"""
+        results = self._results({"a.xml": "uno", "b.xml": "dos"})
+        results.record("secrets", "a.xml", [])
+        results.save()
+
+        results.record("secrets", "b.xml", ["API Key"])
+        self.assertIsNone(results._fp)
+        self.assertEqual(results.scanned, 1)
+        self.assertNotIn("b.xml", results.entries())
+
+    def test_without_cache_everything_is_scanned(self):
+        """Prueba que sin cache se calcula siempre y save no falla"""
+        results = EntryResults(None, None, [])
+        self.assertEqual(results.get("secrets", "a.xml", lambda: []), [])
+        results.save()
+
+
+class TestIncrementalAnalyze(unittest.TestCase):
+    """Pruebas del reanalisis incremental de dos versiones de un paquete"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = PackageEntryCache(os.path.join(self.folder, "entries"), 1024 * 1024, "1")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _apk(self, name, config):
+        path = os.path.join(self.folder, name)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("res/values/strings.xml", 'api_key = "abc"')
+            zf.writestr("assets/config.json", config)
+            zf.writestr("classes.dex", "no es un dex http://ejemplo.com/api")
+        return path
+
+    def _analyze(self, path, executor="thread"):
+        mock_apk = Mock()
+        mock_apk.get_package.return_value = "com.demo"
+        mock_apk.get_permissions.return_value = []
+        mock_apk.get_attribute_value.return_value = "false"
+        mock_apk.get_min_sdk_version.return_value = "21"
+        mock_apk.get_files.return_value = ["res/values/strings.xml", "assets/config.json", "classes.dex"]
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            with patch('analisis.analisis_estatico.SECRET_SCAN_EXECUTOR', "serial"), \
+                    patch('analisis.analisis_estatico.DETECTOR_EXECUTOR', executor):
+                return analyze(path, ["http_urls", "secrets"], entry_cache=self.cache)
+
+    def test_second_version_rescans_only_changed_entries(self):
+        """Prueba que la nueva versión solo escanea la entrada modificada y combina los hallazgos"""
+        metadata, first = self._analyze(self._apk("v1.apk", '{"a": 1}'))
+        self.assertEqual(metadata["incremental"], {"reused": 0, "shared": 0, "scanned": 3})
+
+        with patch('analisis.analisis_estatico.iter_dex_strings') as dex:
+            metadata, second = self._analyze(self._apk("v2.apk", 'password = "p"'))
+
+        dex.assert_not_called()
+        self.assertEqual(metadata["incremental"], {"reused": 2, "shared": 0, "scanned": 1})
+        titles = [(v["file"], v["title"]) for v in second]
+        self.assertIn(("classes.dex", "Comunicacion HTTP sin cifrar"), titles)
+        self.assertIn(("res/values/strings.xml", "Posible API Key hardcodeado"), titles)
+        self.assertIn(("assets/config.json", "Posible Password hardcodeado"), titles)
+        self.assertEqual(len(second), len(first) + 1)
+
+    def test_process_detectors_keep_entry_results(self):
+        """Prueba que con detectores en procesos los resultados por entrada se combinan y guardan"""
+        metadata, first = self._analyze(self._apk("v1.apk", '{"a": 1}'), "process")
+        self.assertEqual(metadata["incremental"], {"reused": 0, "shared": 0, "scanned": 3})
+
+        metadata, second = self._analyze(self._apk("v2.apk", 'password = "p"'), "process")
+        self.assertEqual(metadata["incremental"], {"reused": 2, "shared": 0, "scanned": 1})
+        self.assertEqual(len(second), len(first) + 1)
+        self.assertEqual([entry["file"] for entry in metadata["slowest_entries"]],
+                         ["assets/config.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
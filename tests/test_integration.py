@@ -4,7 +4,6 @@ Prueba la interacción entre múltiples módulos
 """
 
 import unittest
-import json
 import os
 import tempfile
 from unittest.mock import Mock, patch, MagicMock
@@ -79,7 +78,9 @@ class TestAPKAnalysisWorkflow(unittest.TestCase):
 
     def test_history_workflow(self):
         """Prueba flujo completo de gestión de historial"""
-        with patch('main.HISTORY_FILE', os.path.join(self.test_dir, 'history.json')):
+        from analisis.history import HistoryStore
+        store = HistoryStore(os.path.join(self.test_dir, 'history.db'))
+        with patch('main.history_store', store):
             from main import save_history, load_history
             
             # Crear múltiples entradas
@@ -306,10 +307,11 @@ class TestPerformanceAndBoundaries(unittest.TestCase):
         # 100 * 2 = 200 > 30, debería ser ALTO
         self.assertEqual(result, "ALTO")
 
-    def test_history_size_limit_enforcement(self):
-        """Prueba que el historial respeta el límite de 50 entradas"""
-        temp_file = os.path.join(self.test_dir, 'test_history.json')
-        with patch('main.HISTORY_FILE', temp_file):
+    def test_history_keeps_all_entries(self):
+        """Prueba que el historial conserva todas las entradas (sin límite de 50)"""
+        from analisis.history import HistoryStore
+        store = HistoryStore(os.path.join(self.test_dir, 'test_history.db'))
+        with patch('main.history_store', store):
             from main import save_history, load_history
             
             # Crear 60 entradas
@@ -317,9 +319,8 @@ class TestPerformanceAndBoundaries(unittest.TestCase):
                 save_history({"id": i, "filename": f"app{i}.apk"})
             
             history = load_history()
-            # Debería mantener solo 50
-            self.assertEqual(len(history), 50)
-            # Las entradas más recientes deberían mantenerse
+            self.assertEqual(len(history), 60)
+            # La entrada más reciente aparece primero
             self.assertEqual(history[0]["id"], 59)
 
     def test_report_string_length_reasonable(self):
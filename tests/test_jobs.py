@@ -0,0 +1,186 @@
+"""
+Pruebas unitarias para la cola de trabajos de analisis
+Prueba el encolado acotado, el estado de los trabajos y run_analysis
+"""
+
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+from analisis.cache import ResultCache
+from analisis.jobs import JobQueue, QueueFullError, run_analysis
+
+
+class TestJobQueue(unittest.TestCase):
+    """Pruebas para JobQueue"""
+
+    def setUp(self):
+        """Crear una cola respaldada por hilos"""
+        self.queue = JobQueue(2, 2, executor_factory=ThreadPoolExecutor)
+
+    def tearDown(self):
+        """Detener el executor"""
+        self.queue.shutdown()
+
+    def test_submit_returns_job_id_and_result(self):
+        """Prueba que un trabajo terminado expone su resultado"""
+        job_id = self.queue.submit(lambda x: x * 2, 21)
+        self.queue._jobs[job_id].result(timeout=5)
+
+        self.assertEqual(self.queue.status(job_id)["status"], "done")
+        self.assertEqual(self.queue.result(job_id), 42)
+
+    def test_unknown_job_returns_none(self):
+        """Prueba que un id desconocido devuelve None"""
+        self.assertIsNone(self.queue.status("desconocido"))
+        self.assertIsNone(self.queue.result("desconocido"))
+
+    def test_queue_full_raises(self):
+        """Prueba que se rechazan trabajos por encima de max_pending"""
+        release = threading.Event()
+        self.queue.submit(release.wait)
+        self.queue.submit(release.wait)
+        try:
+            with self.assertRaises(QueueFullError):
+                self.queue.submit(release.wait)
+            self.assertEqual(self.queue.depth(), 2)
+        finally:
+            release.set()
+
+    def test_failed_job_reports_error(self):
+        """Prueba que una excepcion en el worker se refleja en el estado"""
+        def boom():
+            raise ValueError("fallo")
+
+        job_id = self.queue.submit(boom)
+        self.queue._jobs[job_id].exception(timeout=5)
+
+        status = self.queue.status(job_id)
+        self.assertEqual(status["status"], "error")
+        self.assertIn("fallo", status["error"])
+        self.assertIsNone(self.queue.result(job_id))
+
+    def test_on_done_callback_receives_result(self):
+        """Prueba que on_done recibe el id y el resultado"""
+        received = []
+        done = threading.Event()
+
+        def on_done(job_id, result):
+            received.append((job_id, result))
+            done.set()
+
+        job_id = self.queue.submit(lambda: "ok", on_done=on_done)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(received, [(job_id, "ok")])
+
+
+class TestJobQueueStore(unittest.TestCase):
+    """Pruebas para JobQueue con el estado de los trabajos en disco"""
+
+    def setUp(self):
+        """Dos colas (dos procesos web) que comparten la carpeta de trabajos"""
+        self.folder = tempfile.mkdtemp()
+        self.queue = JobQueue(
+            2, 2, executor_factory=ThreadPoolExecutor,
+            store=ResultCache(self.folder, 1024 * 1024, "1")
+        )
+        self.other = JobQueue(
+            2, 2, executor_factory=ThreadPoolExecutor,
+            store=ResultCache(self.folder, 1024 * 1024, "1")
+        )
+
+    def tearDown(self):
+        """Detener los executors y borrar la carpeta"""
+        self.queue.shutdown()
+        self.other.shutdown()
+        shutil.rmtree(self.folder)
+
+    def test_other_queue_sees_pending_and_done_job(self):
+        """Prueba que otro proceso ve el trabajo en cola y luego su resultado"""
+        release = threading.Event()
+        job_id = self.queue.submit(lambda: release.wait() and {"risk": "Bajo"})
+        try:
+            self.assertEqual(self.other.status(job_id)["status"], "queued")
+            self.assertIsNone(self.other.result(job_id))
+        finally:
+            release.set()
+        self.queue.shutdown()
+
+        self.assertEqual(self.other.status(job_id)["status"], "done")
+        self.assertEqual(self.other.result(job_id), {"risk": "Bajo"})
+
+    def test_other_queue_sees_error(self):
+        """Prueba que el error de un trabajo se guarda en disco"""
+        def boom():
+            raise ValueError("fallo")
+
+        job_id = self.queue.submit(boom)
+        self.queue.shutdown()
+
+        status = self.other.status(job_id)
+        self.assertEqual(status["status"], "error")
+        self.assertIn("fallo", status["error"])
+        self.assertIsNone(self.other.result(job_id))
+
+    def test_invalid_job_id_is_not_looked_up(self):
+        """Prueba que un id con otro formato no se busca en disco"""
+        self.assertIsNone(self.other.status("../cache"))
+        self.assertIsNone(self.other.result("0" * 32))
+
+
+class TestRunAnalysis(unittest.TestCase):
+    """Pruebas para run_analysis"""
+
+    def test_cache_miss_runs_analysis_and_stores(self):
+        """Prueba que un fallo de cache analiza y guarda el resultado"""
+        cache = Mock()
+        cache.get.return_value = None
+        vulns = [{"title": "T", "description": "D", "solution": "S", "file": "F",
+                  "method": "M", "evidence": "E", "severity": "HIGH", "category": "config"}]
+
+        with patch('analisis.jobs.sha256_file', return_value="abc"):
+            with patch('analisis.jobs.analyze', return_value=({"package": "p"}, vulns)):
+                result = run_analysis("app.apk", "app.apk", cache)
+
+        self.assertEqual(result["risk"], "BAJO")
+        self.assertEqual(result["filename"], "app.apk")
+        self.assertEqual(result["vulnerabilities"], vulns)
+        self.assertEqual(result["counts"], {"HIGH": 1})
+        self.assertNotIn("report", result)
+        cache.put.assert_called_once_with("abc", result)
+
+    def test_cache_hit_skips_analysis(self):
+        """Prueba que un acierto de cache no invoca el analisis"""
+        cache = Mock()
+        cache.get.return_value = {
+            "filename": "old.apk", "metadata": {}, "vulnerabilities": [],
+            "risk": "BAJO", "report": "old.apk"
+        }
+
+        with patch('analisis.jobs.sha256_file', return_value="abc"):
+            with patch('analisis.jobs.analyze') as analyze:
+                result = run_analysis("new.apk", "new.apk", cache)
+
+        analyze.assert_not_called()
+        self.assertEqual(result["filename"], "new.apk")
+        self.assertEqual(result["counts"], {})
+        self.assertNotIn("report", result)
+
+    def test_partial_result_not_cached(self):
+        """Prueba que un resultado parcial por tiempo agotado no se guarda en cache"""
+        cache = Mock()
+        cache.get.return_value = None
+        metadata = {"package": "p", "partial": True, "skipped": ["secrets"]}
+
+        with patch('analisis.jobs.sha256_file', return_value="abc"):
+            with patch('analisis.jobs.analyze', return_value=(metadata, [])):
+                result = run_analysis("app.apk", "app.apk", cache)
+
+        self.assertTrue(result["metadata"]["partial"])
+        cache.put.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
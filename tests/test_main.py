@@ -4,11 +4,14 @@ Prueba las rutas de la aplicación Flask y funciones de utilidad
 """
 
 import unittest
-import json
 import os
+import shutil
 import tempfile
+from io import BytesIO
 from unittest.mock import patch, MagicMock
-from main import app, load_history, save_history
+from analisis.history import HistoryStore
+from reports.report_store import ReportStore
+from main import app, entry_cache, load_history, save_history, shared_cache
 
 
 class TestHistoryManagement(unittest.TestCase):
@@ -16,29 +19,22 @@ class TestHistoryManagement(unittest.TestCase):
 
     def setUp(self):
         """Configurar fixtures de prueba"""
-        # Crear un directorio temporal para archivos de prueba
+        # Historial en una base de datos temporal
         self.test_dir = tempfile.mkdtemp()
-        self.original_history_file = os.environ.get("HISTORY_FILE")
-        # Esto necesitaría ser configurable en main.py para pruebas adecuadas
-        self.history_file = os.path.join(self.test_dir, "test_history.json")
+        self.store = HistoryStore(os.path.join(self.test_dir, "test_history.db"))
+        self.patcher = patch('main.history_store', self.store)
+        self.patcher.start()
 
     def tearDown(self):
         """Limpiar después de las pruebas"""
-        # Limpiar archivos temporales
-        if os.path.exists(self.history_file):
-            os.remove(self.history_file)
-        os.rmdir(self.test_dir)
+        self.patcher.stop()
+        self.store.close()
+        shutil.rmtree(self.test_dir)
 
     def test_load_history_empty(self):
-        """Probar la carga del historial cuando no existe archivo"""
-        # Asegurar que el archivo no existe
-        if os.path.exists(self.history_file):
-            os.remove(self.history_file)
-        
-        # Simular la ruta HISTORY_FILE
-        with patch('main.HISTORY_FILE', self.history_file):
-            history = load_history()
-            self.assertEqual(history, [])
+        """Probar la carga del historial cuando no hay análisis"""
+        history = load_history()
+        self.assertEqual(history, [])
 
     def test_save_and_load_history(self):
         """Probar guardar y cargar historial"""
@@ -55,40 +51,36 @@ class TestHistoryManagement(unittest.TestCase):
             "vulns_low": 1
         }
 
-        with patch('main.HISTORY_FILE', self.history_file):
-            save_history(test_entry)
-            history = load_history()
-            
-            self.assertEqual(len(history), 1)
-            self.assertEqual(history[0], test_entry)
+        save_history(test_entry)
+        history = load_history()
+
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0], test_entry)
 
     def test_save_history_keeps_most_recent_first(self):
         """Probar que las entradas más recientes aparecen primero en el historial"""
         entry1 = {"timestamp": "2025-01-13 10:00", "filename": "app1.apk"}
         entry2 = {"timestamp": "2025-01-13 10:30", "filename": "app2.apk"}
 
-        with patch('main.HISTORY_FILE', self.history_file):
-            save_history(entry1)
-            save_history(entry2)
-            history = load_history()
-            
-            # entry2 debe ser primero (más reciente)
-            self.assertEqual(history[0]["filename"], "app2.apk")
-            self.assertEqual(history[1]["filename"], "app1.apk")
-
-    def test_save_history_limits_entries(self):
-        """Probar que el historial se limita a 50 entradas"""
-        with patch('main.HISTORY_FILE', self.history_file):
-            # Agregar 60 entradas
-            for i in range(60):
-                save_history({
-                    "timestamp": f"2025-01-13 10:{i:02d}",
-                    "filename": f"app{i}.apk"
-                })
-            
-            history = load_history()
-            # Solo debe mantener 50
-            self.assertEqual(len(history), 50)
+        save_history(entry1)
+        save_history(entry2)
+        history = load_history()
+
+        # entry2 debe ser primero (más reciente)
+        self.assertEqual(history[0]["filename"], "app2.apk")
+        self.assertEqual(history[1]["filename"], "app1.apk")
+
+    def test_save_history_keeps_all_entries(self):
+        """Probar que el historial ya no se limita a 50 entradas"""
+        for i in range(60):
+            save_history({
+                "timestamp": f"2025-01-13 10:{i:02d}",
+                "filename": f"app{i}.apk"
+            })
+
+        history = load_history()
+        self.assertEqual(len(history), 60)
+        self.assertEqual(history[0]["filename"], "app59.apk")
 
 
 class TestFlaskApp(unittest.TestCase):
@@ -130,6 +122,125 @@ class TestFlaskApp(unittest.TestCase):
         # Debe rechazar archivo que no es APK
         self.assertIn(response.status_code, [200, 400])
 
+    def test_index_route_post_apk_enqueues_job(self):
+        """Probar que un APK se encola y redirige a la pagina del trabajo"""
+        with patch('main.UPLOAD_FOLDER', self.test_upload_dir), \
+                patch.dict(self.app.config, {'UPLOAD_FOLDER': self.test_upload_dir}), \
+                patch('main.job_queue') as job_queue:
+            job_queue.submit.return_value = "abc123"
+            response = self.client.post('/', data={
+                'apk': (BytesIO(b'PK\x03\x04'), 'test.apk')
+            })
+
+        self.assertEqual(response.status_code, 303)
+        self.assertTrue(response.headers['Location'].endswith('/job/abc123'))
+
+    def test_upload_is_content_addressed(self):
+        """Probar que el APK se guarda por su SHA-256 y el hash llega al trabajo"""
+        import hashlib
+        content = b'PK\x03\x04' + b'x' * 100000
+        digest = hashlib.sha256(content).hexdigest()
+        with patch.dict(self.app.config, {'UPLOAD_FOLDER': self.test_upload_dir}), \
+                patch('main.job_queue') as job_queue:
+            job_queue.submit.return_value = "abc123"
+            self.client.post('/', data={'apk': (BytesIO(content), '../../otro.apk')})
+
+        self.assertEqual(os.listdir(self.test_upload_dir), [digest + '.apk'])
+        args = job_queue.submit.call_args[0]
+        self.assertEqual(args[1], os.path.join(self.test_upload_dir, digest + '.apk'))
+        self.assertEqual(args[2], '../../otro.apk')
+        self.assertEqual(args[4], digest)
+        self.assertIs(args[5], entry_cache)
+        self.assertIs(args[6], shared_cache)
+
+    def test_upload_rejects_bad_magic(self):
+        """Probar que un archivo sin cabecera zip se rechaza sin dejar temporales"""
+        with patch.dict(self.app.config, {'UPLOAD_FOLDER': self.test_upload_dir}), \
+                patch('main.job_queue') as job_queue:
+            response = self.client.post('/', data={
+                'apk': (BytesIO(b'MZ' + b'x' * 1000), 'test.apk')
+            })
+
+        self.assertEqual(response.status_code, 400)
+        job_queue.submit.assert_not_called()
+        self.assertEqual(os.listdir(self.test_upload_dir), [])
+
+    def test_upload_rejects_oversized_file(self):
+        """Probar que un APK mayor que MAX_UPLOAD_SIZE responde 413"""
+        with patch.dict(self.app.config, {'UPLOAD_FOLDER': self.test_upload_dir,
+                                          'MAX_UPLOAD_SIZE': 1024}), \
+                patch('main.job_queue') as job_queue:
+            response = self.client.post('/', data={
+                'apk': (BytesIO(b'PK\x03\x04' + b'x' * 4096), 'test.apk')
+            })
+
+        self.assertEqual(response.status_code, 413)
+        job_queue.submit.assert_not_called()
+        self.assertEqual(os.listdir(self.test_upload_dir), [])
+
+    def test_index_route_post_queue_full(self):
+        """Probar que la cola llena responde 503"""
+        from analisis.jobs import QueueFullError
+        with patch.dict(self.app.config, {'UPLOAD_FOLDER': self.test_upload_dir}), \
+                patch('main.job_queue') as job_queue:
+            job_queue.submit.side_effect = QueueFullError("llena")
+            response = self.client.post('/', data={
+                'apk': (BytesIO(b'PK\x03\x04'), 'test.apk')
+            })
+
+        self.assertEqual(response.status_code, 503)
+
+    def test_status_unknown_job(self):
+        """Probar que el estado de un trabajo inexistente devuelve 404"""
+        response = self.client.get('/status/desconocido')
+        self.assertEqual(response.status_code, 404)
+
+    def test_job_page_pending(self):
+        """Probar que un trabajo pendiente muestra la pagina de espera"""
+        with patch('main.job_queue') as job_queue:
+            job_queue.status.return_value = {
+                "id": "abc123", "status": "queued", "queue_depth": 1, "workers": 2
+            }
+            response = self.client.get('/job/abc123')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'abc123', response.data)
+
+    def test_history_json_paginated_and_filtered(self):
+        """Probar la variante JSON de /history con filtros y cursor"""
+        store = HistoryStore(os.path.join(self.test_upload_dir, "history.db"))
+        for i in range(3):
+            store.add({"timestamp": f"2025-01-1{i} 10:00", "filename": "a.apk",
+                       "app_name": "A", "package": "com.a", "version": "1.0", "risk": "ALTO",
+                       "vulns_total": i, "vulns_high": i, "vulns_medium": 0, "vulns_low": 0})
+        store.add({"timestamp": "2025-01-13 10:00", "filename": "b.apk", "app_name": "B",
+                   "package": "com.b", "version": "1.0", "risk": "BAJO", "vulns_total": 0,
+                   "vulns_high": 0, "vulns_medium": 0, "vulns_low": 0})
+
+        with patch('main.history_store', store):
+            first = self.client.get('/history?format=json&risk=alto&limit=2').get_json()
+            second = self.client.get(
+                f'/history?format=json&risk=alto&limit=2&cursor={first["next_cursor"]}'
+            ).get_json()
+            high = self.client.get('/history?format=json&min_high=2').get_json()
+            page = self.client.get('/history?package=com.a&limit=1')
+        store.close()
+
+        self.assertEqual(first["total"], 3)
+        self.assertEqual([e["vulns_high"] for e in first["items"]], [2, 1])
+        self.assertEqual([e["vulns_high"] for e in second["items"]], [0])
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(len(high["items"]), 1)
+        self.assertEqual(page.status_code, 200)
+        self.assertIn(b'Siguiente pagina', page.data)
+
+    def test_history_invalid_parameters(self):
+        """Probar que parametros de historial no validos responden 400"""
+        for query in ('limit=0', 'min_high=x', 'from=13/01/2025', 'cursor=abc'):
+            response = self.client.get(f'/history?format=json&{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("error", response.get_json())
+
     def test_upload_folder_created(self):
         """Probar que la carpeta de carga se crea en la inicialización de la aplicación"""
         with patch('main.UPLOAD_FOLDER', self.test_upload_dir):
@@ -140,12 +251,68 @@ class TestFlaskApp(unittest.TestCase):
 class TestMainFunctionality(unittest.TestCase):
     """Tests para funcionalidad principal de la aplicación"""
 
-    def test_last_report_initialization(self):
-        """Probar que last_report está inicializado"""
-        from main import last_report
-        self.assertIsInstance(last_report, dict)
-        self.assertIn("content", last_report)
-        self.assertIn("filename", last_report)
+    def test_report_store_initialization(self):
+        """Probar que el almacén de informes está inicializado"""
+        from main import report_store
+        from reports.report_store import ReportStore
+        self.assertIsInstance(report_store, ReportStore)
+        self.assertIsNone(report_store.get("no-existe"))
+
+    def test_record_analysis_stores_report_per_job(self):
+        """Probar que cada análisis guarda su informe con su propio id"""
+        from main import record_analysis
+        test_dir = tempfile.mkdtemp()
+        store = ReportStore(os.path.join(test_dir, "reports"), 1024, 1024 * 1024)
+        history = HistoryStore(os.path.join(test_dir, "history.db"))
+        result = {
+            "metadata": {"app_name": "App", "package": "com.app", "version_name": "1.0"},
+            "vulnerabilities": [{"title": "T", "description": "D", "solution": "S", "file": "F",
+                                 "method": "M", "evidence": "E", "severity": "HIGH"}],
+            "risk": "BAJO",
+            "counts": {"HIGH": 1},
+        }
+        try:
+            with patch('main.report_store', store), patch('main.history_store', history):
+                record_analysis("job1", dict(result, filename="uno.apk"))
+                record_analysis("job2", dict(result, filename="dos.apk"))
+                client = app.test_client()
+                first = client.get('/download/job1')
+                missing = client.get('/download/job3')
+
+            filename, content = store.get("job2")
+            self.assertEqual(filename, "dos_report.txt")
+            self.assertIn("Aplicacion analizada: dos.apk", content)
+            self.assertEqual(history.list()[0]["report_id"], "job2")
+            self.assertEqual(history.list()[0]["vulns_high"], 1)
+            self.assertIn(b"Aplicacion analizada: uno.apk", first.data)
+            self.assertIn("attachment", first.headers["Content-Disposition"])
+            self.assertIn("uno_report.txt", first.headers["Content-Disposition"])
+            self.assertEqual(first.headers["Content-Type"], "text/plain; charset=utf-8")
+            self.assertEqual(missing.status_code, 404)
+        finally:
+            history.close()
+            shutil.rmtree(test_dir)
+
+    def test_download_streams_large_report_from_disk(self):
+        """Probar que un informe que no cabe en memoria se descarga por bloques"""
+        from reports.report_generator import generate_report, iter_report
+        test_dir = tempfile.mkdtemp()
+        store = ReportStore(test_dir, 1024, 64 * 1024 * 1024)
+        vulns = [{"title": f"Secreto {i}", "description": "D", "solution": "S", "file": "F",
+                  "method": "M", "evidence": "E" * 100, "severity": "HIGH"} for i in range(2000)]
+        try:
+            store.put("big", "informe ñ.txt", iter_report("big.apk", vulns, "ALTO"))
+            self.assertNotIn("big", store._memory)
+            with patch('main.report_store', store):
+                response = app.test_client().get('/download/big')
+                self.assertFalse(response.is_sequence)
+                body = response.get_data(as_text=True)
+
+            self.assertEqual(body, generate_report("big.apk", vulns, "ALTO"))
+            self.assertIn("filename*=UTF-8''informe%20%C3%B1.txt",
+                          response.headers["Content-Disposition"])
+        finally:
+            shutil.rmtree(test_dir)
 
     def test_dangerous_permissions_list_not_empty(self):
         """Probar que la lista de permisos peligrosos está poblada"""
@@ -0,0 +1,108 @@
+"""
+Pruebas unitarias para el indice de componentes del manifest
+Prueba la construccion del indice en una sola pasada y la vista ligera
+"""
+
+import unittest
+from lxml import etree
+from analisis.manifest import ManifestError, ManifestView, build_component_index, format_component_name
+
+MANIFEST = b"""<manifest xmlns:android="http://schemas.android.com/apk/res/android" package="com.demo">
+  <uses-sdk android:minSdkVersion="19" android:targetSdkVersion="30"/>
+  <uses-permission android:name="android.permission.CAMERA"/>
+  <uses-permission android:name="android.permission.INTERNET"/>
+  <uses-permission android:name="android.permission.CAMERA"/>
+  <application android:label="@7F0B0001" android:debuggable="true">
+    <activity android:name=".Main" android:exported="true">
+      <intent-filter><action android:name="android.intent.action.MAIN"/></intent-filter>
+    </activity>
+    <activity android:name="Settings"/>
+    <activity android:name="com.other.External" android:exported="false"/>
+    <service android:name=".Sync" android:exported="true" android:permission="com.demo.SYNC"/>
+    <receiver android:name=".Boot" android:exported="true"/>
+    <receiver android:name=".Boot" android:exported="false"/>
+    <provider android:name=".Files"/>
+  </application>
+</manifest>"""
+
+
+class TestFormatComponentName(unittest.TestCase):
+    """Pruebas para format_component_name"""
+
+    def test_relative_names(self):
+        """Prueba que los nombres relativos se completan con el paquete"""
+        self.assertEqual(format_component_name("com.demo", ".Main"), "com.demo.Main")
+        self.assertEqual(format_component_name("com.demo", "Main"), "com.demo.Main")
+        self.assertEqual(format_component_name("com.demo", "com.x.Main"), "com.x.Main")
+
+
+class TestBuildComponentIndex(unittest.TestCase):
+    """Pruebas para build_component_index"""
+
+    def setUp(self):
+        """Construir el indice del manifest de ejemplo"""
+        self.index = build_component_index(etree.fromstring(MANIFEST), "com.demo")
+
+    def test_components_by_type_in_order(self):
+        """Prueba que los componentes se agrupan por tipo en orden de aparicion"""
+        self.assertEqual(
+            list(self.index["activity"]),
+            ["com.demo.Main", "com.demo.Settings", "com.other.External"]
+        )
+        self.assertEqual(list(self.index["service"]), ["com.demo.Sync"])
+        self.assertEqual(list(self.index["provider"]), ["com.demo.Files"])
+
+    def test_exported_intent_filters_and_permission(self):
+        """Prueba los datos registrados por componente"""
+        main = self.index["activity"]["com.demo.Main"]
+        self.assertEqual(main["exported"], "true")
+        self.assertEqual(main["intent_filters"], 1)
+        self.assertIsNone(self.index["activity"]["com.demo.Settings"]["exported"])
+        self.assertEqual(self.index["service"]["com.demo.Sync"]["permission"], "com.demo.SYNC")
+
+    def test_first_declaration_wins(self):
+        """Prueba que un nombre repetido conserva la primera declaracion"""
+        self.assertEqual(self.index["receiver"]["com.demo.Boot"]["exported"], "true")
+
+
+class TestManifestView(unittest.TestCase):
+    """Pruebas para la vista del manifest usada en el analisis rapido"""
+
+    def setUp(self):
+        self.view = ManifestView(etree.fromstring(MANIFEST))
+
+    def test_attributes(self):
+        """Prueba la lectura de atributos del manifest y de uses-sdk"""
+        self.assertEqual(self.view.get_package(), "com.demo")
+        self.assertEqual(self.view.get_min_sdk_version(), "19")
+        self.assertEqual(self.view.get_target_sdk_version(), "30")
+        self.assertEqual(self.view.get_attribute_value("application", "debuggable"), "true")
+        self.assertIsNone(self.view.get_attribute_value("application", "allowBackup"))
+
+    def test_permissions_without_duplicates(self):
+        """Prueba que los permisos se devuelven sin duplicados y en orden"""
+        self.assertEqual(
+            self.view.get_permissions(),
+            ["android.permission.CAMERA", "android.permission.INTERNET"]
+        )
+
+    def test_components(self):
+        """Prueba que los componentes salen del indice con nombres completos"""
+        self.assertEqual(
+            self.view.get_activities(),
+            ["com.demo.Main", "com.demo.Settings", "com.other.External"]
+        )
+        self.assertEqual(self.view.get_services(), ["com.demo.Sync"])
+
+    def test_app_name_reference_is_not_resolved(self):
+        """Prueba que una etiqueta con referencia a recurso no se resuelve"""
+        self.assertEqual(self.view.get_app_name(), "")
+
+    def test_invalid_axml(self):
+        """Prueba que un manifest que no es AXML lanza ManifestError"""
+        with self.assertRaises(ManifestError):
+            ManifestView.from_bytes(MANIFEST)
+
+
+if __name__ == '__main__':
+    unittest.main()
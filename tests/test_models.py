@@ -0,0 +1,30 @@
+"""
+Pruebas unitarias para el módulo models (recuentos de hallazgos)
+"""
+import unittest
+
+from analisis.models import DEFAULT_SEVERITY, severity_counts
+
+
+class TestSeverityCounts(unittest.TestCase):
+    """Pruebas para severity_counts"""
+
+    def test_counts_by_severity(self):
+        """Prueba los recuentos por severidad en una pasada"""
+        vulns = [{"severity": "HIGH"}, {"severity": "LOW"}, {"severity": "HIGH"}]
+        self.assertEqual(severity_counts(vulns), {"HIGH": 2, "LOW": 1})
+        self.assertEqual(severity_counts(iter(vulns))["HIGH"], 2)
+
+    def test_missing_severity_is_default(self):
+        """Prueba que un hallazgo sin severidad o con None cuenta como MEDIUM"""
+        counts = severity_counts([{"title": "A"}, {"severity": None}, {"severity": "MEDIUM"}])
+        self.assertEqual(DEFAULT_SEVERITY, "MEDIUM")
+        self.assertEqual(counts, {"MEDIUM": 3})
+
+    def test_empty(self):
+        """Prueba una lista sin hallazgos"""
+        self.assertEqual(dict(severity_counts([])), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
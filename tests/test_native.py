@@ -0,0 +1,126 @@
+"""
+Pruebas unitarias para el módulo native (strings de librerías nativas)
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import Mock, patch
+
+from analisis.analisis_estatico import AnalysisContext, analyze
+from analisis.archive import MappedArchive
+from analisis.native import PRINTABLE_MAX_LENGTH, iter_library_strings, iter_printable_strings
+
+LIBRARY = (
+    b"\x7fELF\x02\x01\x01\x00" + b"\x00" * 64
+    + b"http://api.ejemplo.com/v1\x00"
+    + b"\x01\x02api_key = \"abc123\"\x00"
+    + b"".join(hashlib.sha256(b"%d" % i).digest() for i in range(10000))
+    + b"libc.so.6\x00ab\x00"
+)
+
+
+class TestPrintableStrings(unittest.TestCase):
+    """Pruebas para iter_printable_strings"""
+
+    def test_strings_across_chunk_boundaries(self):
+        """Prueba que un string partido entre bloques se reconstruye"""
+        data = b"\x00\x00http://partido.com/ruta\x00xy\x00otro_string\x00"
+        whole = list(iter_printable_strings([data]))
+        for size in (1, 3, 7, 16):
+            chunks = [data[i:i + size] for i in range(0, len(data), size)]
+            self.assertEqual(list(iter_printable_strings(chunks)), whole)
+        self.assertEqual(whole, [b"http://partido.com/ruta", b"otro_string"])
+
+    def test_long_runs_are_bounded(self):
+        """Prueba que ningún string supera PRINTABLE_MAX_LENGTH"""
+        data = b"A" * (PRINTABLE_MAX_LENGTH * 3 + 10)
+        strings = list(iter_printable_strings([data[:5000], data[5000:]]))
+        self.assertTrue(all(len(s) <= PRINTABLE_MAX_LENGTH for s in strings))
+        self.assertEqual(sum(map(len, strings)), len(data))
+
+
+class TestLibraryStrings(unittest.TestCase):
+    """Pruebas de lectura de librerías guardadas y comprimidas"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.apk_path = os.path.join(self.folder, "app.apk")
+        with zipfile.ZipFile(self.apk_path, "w") as zf:
+            zf.writestr("AndroidManifest.xml", b"\x00" * 10)
+            zf.writestr("lib/arm64-v8a/libapp.so", LIBRARY, compress_type=zipfile.ZIP_STORED)
+            zf.writestr("lib/armeabi-v7a/libapp.so", LIBRARY, compress_type=zipfile.ZIP_STORED)
+            zf.writestr("lib/x86/libotra.so", LIBRARY + b"x86\x00", compress_type=zipfile.ZIP_DEFLATED)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_stored_and_deflated_give_same_strings(self):
+        """Prueba que se extraen los mismos strings con y sin compresión"""
+        with MappedArchive(self.apk_path) as archive:
+            stored = list(iter_library_strings(
+                archive, archive.getinfo("lib/arm64-v8a/libapp.so")
+            ))
+            deflated = list(iter_library_strings(
+                archive, archive.getinfo("lib/x86/libotra.so"), chunk_size=4096
+            ))
+        self.assertIn(b"http://api.ejemplo.com/v1", stored)
+        self.assertEqual(deflated, stored)
+
+    def test_identical_abis_scanned_once(self):
+        """Prueba que las librerías idénticas en varias ABIs se escanean una vez"""
+        mock_apk = Mock()
+        mock_apk.get_files.return_value = []
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            context = AnalysisContext(self.apk_path)
+        try:
+            libs = [info.filename for info in context.input("native_libs")]
+            self.assertEqual(libs, ["lib/arm64-v8a/libapp.so", "lib/x86/libotra.so"])
+
+            with patch('analisis.analisis_estatico._scan_native_strings',
+                       return_value={"urls": [], "secrets": []}) as scan:
+                for info in context.input("native_libs"):
+                    context.native_scan(info)
+                    context.native_scan(info)
+            self.assertEqual(scan.call_count, 2)
+        finally:
+            context.close()
+
+    def test_native_findings(self):
+        """Prueba que los detectores de URLs y secretos cubren las librerías nativas"""
+        mock_apk = Mock()
+        mock_apk.get_files.return_value = []
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            metadata, vulns = analyze(self.apk_path, ["http_urls", "secrets"])
+
+        found = [(v["title"], v["file"]) for v in vulns]
+        self.assertIn(("Comunicacion HTTP sin cifrar en librerias nativas",
+                       "lib/arm64-v8a/libapp.so, lib/x86/libotra.so"), found)
+        self.assertIn(("Posible API Key hardcodeado", "lib/arm64-v8a/libapp.so"), found)
+        self.assertNotIn(("Posible API Key hardcodeado", "lib/armeabi-v7a/libapp.so"), found)
+        native = [v for v in vulns if v["title"].endswith("librerias nativas")][0]
+        self.assertEqual(native["evidence"], "http://api.ejemplo.com/v1")
+
+    def test_forged_crc_and_size_are_not_deduplicated(self):
+        """Prueba que una librería con CRC32 y tamaño copiados de otra se escanea igualmente"""
+        hidden = b"http://c2.evil.io/x\x00".ljust(len(LIBRARY), b"\x00")
+        forged = os.path.join(self.folder, "forjado.apk")
+        with zipfile.ZipFile(forged, "w") as zf:
+            zf.writestr("lib/arm64-v8a/libok.so", LIBRARY)
+            with patch('zipfile.crc32', return_value=zipfile.crc32(LIBRARY)):
+                zf.writestr("lib/x86/libhidden.so", hidden)
+
+        mock_apk = Mock()
+        mock_apk.get_files.return_value = []
+        with patch('analisis.analisis_estatico.APK', return_value=mock_apk):
+            _, vulns = analyze(forged, ["http_urls"])
+
+        native = [v for v in vulns if v["title"].endswith("librerias nativas")][0]
+        self.assertIn("lib/x86/libhidden.so", native["file"])
+        self.assertIn("http://c2.evil.io/x", native["evidence"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ Prueba la funcionalidad de generación de reportes
 """
 
 import unittest
-from reports.report_generator import generate_report
+from reports.report_generator import generate_report, report_summary
 
 
 class TestReportGenerator(unittest.TestCase):
@@ -160,5 +160,17 @@ class TestReportGenerator(unittest.TestCase):
         self.assertIn("Test", report)
 
 
+    def test_missing_severity_counts_as_medium(self):
+        """Probar que el resumen cuenta como MEDIA los hallazgos sin severidad, como classify_risk"""
+        vulns = [{"title": "A", "severity": "HIGH"}, {"title": "B"}, {"title": "C", "severity": None}]
+        summary = report_summary("app.apk", vulns, "MEDIO")
+        self.assertIn("Resumen: 1 ALTA | 2 MEDIA | 0 BAJA", summary)
+
+    def test_summary_uses_given_counts(self):
+        """Probar que el resumen usa los recuentos dados sin recorrer la lista"""
+        summary = report_summary("app.apk", [], "ALTO", {"HIGH": 3, "LOW": 1})
+        self.assertIn("Resumen: 3 ALTA | 0 MEDIA | 1 BAJA", summary)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,70 @@
+"""
+Pruebas unitarias para el almacen de informes por analisis
+Prueba la LRU en memoria, la lectura desde disco y la expulsion
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from reports.report_store import ReportStore
+
+
+class TestReportStore(unittest.TestCase):
+    """Pruebas para ReportStore"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_put_and_get(self):
+        """Prueba que cada id devuelve su propio informe"""
+        store = ReportStore(self.folder, 1024, 4096)
+        store.put("a1", "a_report.txt", "informe A")
+        store.put("b2", "b_report.txt", "informe B")
+
+        self.assertEqual(store.get("a1"), ("a_report.txt", "informe A"))
+        self.assertEqual(store.get("b2"), ("b_report.txt", "informe B"))
+        self.assertIsNone(store.get("c3"))
+
+    def test_memory_is_bounded(self):
+        """Prueba que la memoria se limita y los informes expulsados se leen de disco"""
+        store = ReportStore(self.folder, 10, 4096)
+        store.put("a1", "a.txt", "x" * 6)
+        store.put("b2", "b.txt", "y" * 6)
+
+        self.assertEqual(list(store._memory), ["b2"])
+        self.assertLessEqual(store._memory_size, 10)
+        self.assertEqual(store.get("a1"), ("a.txt", "x" * 6))
+
+    def test_shared_between_instances(self):
+        """Prueba que otra instancia (otro proceso) sirve el informe desde disco"""
+        ReportStore(self.folder, 1024, 4096).put("a1", "a.txt", "informe")
+        self.assertEqual(ReportStore(self.folder, 1024, 4096).get("a1"), ("a.txt", "informe"))
+
+    def test_disk_eviction_removes_oldest(self):
+        """Prueba que se expulsan de disco los informes menos usados"""
+        store = ReportStore(self.folder, 1024, 25)
+        store.put("old", "old.txt", "o" * 10)
+        past = time.time() - 60
+        os.utime(os.path.join(self.folder, "old.txt"), (past, past))
+        store.put("mid", "mid.txt", "m" * 10)
+        store.put("new", "new.txt", "n" * 10)
+
+        self.assertIsNone(store.get("old"))
+        self.assertIsNotNone(store.get("new"))
+        self.assertFalse(os.path.exists(os.path.join(self.folder, "old.json")))
+
+    def test_invalid_id(self):
+        """Prueba que ids con rutas no se aceptan"""
+        store = ReportStore(self.folder, 1024, 4096)
+        self.assertIsNone(store.get("../main"))
+        with self.assertRaises(KeyError):
+            store.put("../x", "x.txt", "informe")
+
+
+if __name__ == '__main__':
+    unittest.main()
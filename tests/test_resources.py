@@ -0,0 +1,202 @@
+"""
+Pruebas unitarias para la resolucion puntual de resources.arsc
+Prueba el pool de strings, la busqueda de entradas y la cache por tabla
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from analisis import resources
+from analisis.archive import MappedArchive
+from analisis.resources import (
+    ResourceFormatError, ResourceTable, parse_resource_id, resolve_string
+)
+
+
+def _pool(strings, utf8=True):
+    """Construye un ResStringPool con los strings indicados"""
+    data = b""
+    offsets = []
+    for value in strings:
+        offsets.append(len(data))
+        if utf8:
+            raw = value.encode("utf-8")
+            data += bytes([len(value), len(raw)]) + raw + b"\x00"
+        else:
+            data += struct.pack("<H", len(value)) + value.encode("utf-16-le") + b"\x00\x00"
+    data += b"\x00" * (-len(data) % 4)
+    header_size = 28
+    strings_start = header_size + 4 * len(strings)
+    flags = resources.UTF8_FLAG if utf8 else 0
+    header = struct.pack(
+        "<HHIIIIII", resources.RES_STRING_POOL_TYPE, header_size,
+        strings_start + len(data), len(strings), 0, flags, strings_start, 0
+    )
+    return header + b"".join(struct.pack("<I", o) for o in offsets) + data
+
+
+def _type_chunk(type_id, values, language=b""):
+    """ResTable_type con una entrada simple (dataType, data) o None por indice"""
+    config = struct.pack("<I", 64) + language.ljust(4, b"\x00")[:4] + b"\x00" * 56
+    header_size = 20 + len(config)
+    entries = b""
+    offsets = []
+    for value in values:
+        if value is None:
+            offsets.append(resources.NO_ENTRY)
+            continue
+        offsets.append(len(entries))
+        data_type, data = value
+        entries += struct.pack("<HHI", 8, 0, 0) + struct.pack("<HBBI", 8, 0, data_type, data)
+    entries_start = header_size + 4 * len(values)
+    body = struct.pack("<BBHII", type_id, 0, 0, len(values), entries_start) + config
+    chunk = body + b"".join(struct.pack("<I", o) for o in offsets) + entries
+    return struct.pack("<HHI", resources.RES_TABLE_TYPE_TYPE, header_size, 8 + len(chunk)) + chunk
+
+
+def build_arsc(strings, types, package_id=0x7F, utf8=True):
+    """resources.arsc minimo: pool global y un paquete con los chunks de tipo dados"""
+    type_pool = _pool(["attr", "string"])
+    key_pool = _pool(["app_name"])
+    header_size = 288
+    body = struct.pack("<I", package_id) + "com.demo".encode("utf-16-le").ljust(256, b"\x00")
+    body += struct.pack("<IIIII", header_size, 0, header_size + len(type_pool), 0, 0)
+    package = body + type_pool + key_pool + b"".join(types)
+    package = struct.pack("<HHI", resources.RES_TABLE_PACKAGE_TYPE, header_size, 8 + len(package)) + package
+    table = _pool(strings, utf8) + package
+    return struct.pack("<HHII", resources.RES_TABLE_TYPE, 12, 12 + len(table), 1) + table
+
+
+class TestParseResourceId(unittest.TestCase):
+    """Pruebas para parse_resource_id"""
+
+    def test_plain_and_package_ids(self):
+        """Prueba ids con y sin paquete"""
+        self.assertEqual(parse_resource_id("@7F0B0001"), (0x7F0B0001, None))
+        self.assertEqual(parse_resource_id("@android:01040000"), (0x01040000, "android"))
+
+    def test_invalid_id(self):
+        """Prueba que un id mal formado lanza ValueError"""
+        with self.assertRaises(ValueError):
+            parse_resource_id("Demo")
+        with self.assertRaises(ValueError):
+            parse_resource_id("@7F0B")
+
+
+class TestResourceTable(unittest.TestCase):
+    """Pruebas para ResourceTable"""
+
+    def test_resolves_string_entry(self):
+        """Prueba que se resuelve el string del pool global"""
+        data = build_arsc(["Otro", "Demo App"], [
+            _type_chunk(2, [(resources.TYPE_STRING, 0), (resources.TYPE_STRING, 1)])
+        ])
+        table = ResourceTable(data)
+        self.assertEqual(table.resolve_string(0x7F020001), "Demo App")
+        self.assertEqual(table.strings._decoded, {1: "Demo App"})
+
+    def test_utf16_pool(self):
+        """Prueba un pool de strings en UTF-16"""
+        data = build_arsc(["Aplicación"], [_type_chunk(2, [(resources.TYPE_STRING, 0)])], utf8=False)
+        self.assertEqual(ResourceTable(data).resolve_string(0x7F020000), "Aplicación")
+
+    def test_prefers_default_config(self):
+        """Prueba que se prefiere la configuracion por defecto sobre un idioma"""
+        data = build_arsc(["Demo ES", "Demo"], [
+            _type_chunk(2, [(resources.TYPE_STRING, 0)], language=b"es"),
+            _type_chunk(2, [(resources.TYPE_STRING, 1)]),
+        ])
+        self.assertEqual(ResourceTable(data).resolve_string(0x7F020000), "Demo")
+
+    def test_follows_references(self):
+        """Prueba que una referencia a otro recurso se sigue"""
+        data = build_arsc(["Demo"], [
+            _type_chunk(2, [(resources.TYPE_REFERENCE, 0x7F020001), (resources.TYPE_STRING, 0)])
+        ])
+        self.assertEqual(ResourceTable(data).resolve_string(0x7F020000), "Demo")
+
+    def test_missing_entry(self):
+        """Prueba que una entrada ausente o de otro paquete devuelve None"""
+        data = build_arsc(["Demo"], [_type_chunk(2, [None, (resources.TYPE_STRING, 0)])])
+        table = ResourceTable(data)
+        self.assertIsNone(table.resolve_string(0x7F020000))
+        self.assertIsNone(table.resolve_string(0x7F020005))
+        self.assertIsNone(table.resolve_string(0x01020001))
+
+    def test_invalid_table(self):
+        """Prueba que una tabla no reconocida lanza ResourceFormatError"""
+        with self.assertRaises(ResourceFormatError):
+            ResourceTable(b"PK\x03\x04")
+        with self.assertRaises(ResourceFormatError):
+            ResourceTable(b"")
+
+
+class TestResolveString(unittest.TestCase):
+    """Pruebas para resolve_string sobre el zip del APK"""
+
+    def setUp(self):
+        resources._resolved.clear()
+        self.folder = tempfile.mkdtemp()
+        self.apk_path = self._apk("app.apk", "Demo App")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _apk(self, name, label, crc=None, compression=zipfile.ZIP_STORED):
+        path = os.path.join(self.folder, name)
+        arsc = build_arsc([label], [_type_chunk(2, [(resources.TYPE_STRING, 0)])])
+        with zipfile.ZipFile(path, "w", compression) as zf:
+            if crc is None:
+                zf.writestr("resources.arsc", arsc)
+            else:
+                with patch('zipfile.crc32', return_value=crc):
+                    zf.writestr("resources.arsc", arsc)
+        return path
+
+    def test_resolved_values_are_cached(self):
+        """Prueba que la tabla no se vuelve a parsear para un id ya resuelto"""
+        with MappedArchive(self.apk_path) as archive:
+            self.assertEqual(resolve_string(archive, 0x7F020000), "Demo App")
+            with patch('analisis.resources.ResourceTable') as table:
+                self.assertEqual(resolve_string(archive, 0x7F020000), "Demo App")
+        table.assert_not_called()
+
+    def test_stored_table_is_not_copied(self):
+        """Prueba que una tabla sin comprimir se consulta sobre el mmap y una comprimida se lee"""
+        deflated = self._apk("comprimido.apk", "Otra App", compression=zipfile.ZIP_DEFLATED)
+        with patch.object(MappedArchive, 'read', autospec=True,
+                          side_effect=MappedArchive.read) as read:
+            with MappedArchive(self.apk_path) as archive:
+                self.assertEqual(resolve_string(archive, 0x7F020000), "Demo App")
+            read.assert_not_called()
+            with MappedArchive(deflated) as archive:
+                self.assertEqual(resolve_string(archive, 0x7F020000), "Otra App")
+            self.assertEqual(read.call_count, 1)
+
+    def test_forged_crc_and_size_do_not_share_cache(self):
+        """Prueba que otra tabla con el mismo CRC32 y tamaño declarados no reutiliza la cache"""
+        with zipfile.ZipFile(self.apk_path) as zf:
+            crc = zf.getinfo("resources.arsc").CRC
+        forged = self._apk("forjado.apk", "Phish App", crc=crc)
+
+        with MappedArchive(forged) as archive:
+            self.assertEqual(resolve_string(archive, 0x7F020000), "Phish App")
+        with MappedArchive(self.apk_path) as archive:
+            self.assertEqual(resolve_string(archive, 0x7F020000), "Demo App")
+
+    def test_missing_resources(self):
+        """Prueba que un APK sin resources.arsc lanza KeyError"""
+        path = os.path.join(self.folder, "sin_recursos.apk")
+        with zipfile.ZipFile(path, "w") as zf:
+            zf.writestr("classes.dex", b"")
+        with MappedArchive(path) as archive:
+            with self.assertRaises(KeyError):
+                resolve_string(archive, 0x7F020000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Pruebas unitarias para el módulo rules (registro declarativo de reglas)
+"""
+import unittest
+
+from analisis.rules import (
+    INPUT_DEX_STRINGS, INPUT_MANIFEST, INPUT_TEXT_RESOURCES, Rule, RuleRegistry, required_inputs
+)
+
+
+def _noop(context):
+    return []
+
+
+class TestRuleRegistry(unittest.TestCase):
+    """Pruebas para RuleRegistry"""
+
+    def setUp(self):
+        self.registry = RuleRegistry()
+
+        @self.registry.register("manifest", (INPUT_MANIFEST,), "HIGH", "config")
+        def manifest(context):
+            return []
+
+        self.registry.add(Rule("dex", _noop, (INPUT_DEX_STRINGS,), "HIGH", "network"))
+        self.registry.add(Rule("texto", _noop, (INPUT_TEXT_RESOURCES,), "HIGH", "secrets"))
+
+    def test_select_keeps_registry_order(self):
+        """Prueba que select respeta el orden de registro y no el pedido"""
+        names = [rule.name for rule in self.registry.select(["texto", "manifest"])]
+        self.assertEqual(names, ["manifest", "texto"])
+        self.assertEqual(len(self.registry.select()), 3)
+
+    def test_unknown_and_duplicate_rules(self):
+        """Prueba que una regla desconocida o duplicada es un error"""
+        with self.assertRaises(ValueError):
+            self.registry.select(["no_existe"])
+        with self.assertRaises(ValueError):
+            self.registry.add(Rule("dex", _noop, (INPUT_DEX_STRINGS,), "LOW", "network"))
+
+    def test_invalid_declarations(self):
+        """Prueba que se rechazan entradas o severidades desconocidas"""
+        with self.assertRaises(ValueError):
+            Rule("x", _noop, ("apk_completo",), "HIGH", "config")
+        with self.assertRaises(ValueError):
+            Rule("x", _noop, (INPUT_MANIFEST,), "CRITICAL", "config")
+
+    def test_required_inputs_are_deduplicated_in_load_order(self):
+        """Prueba que cada entrada aparece una vez, en el orden de carga"""
+        rules = self.registry.select()
+        self.assertEqual(required_inputs(rules),
+                         (INPUT_MANIFEST, INPUT_TEXT_RESOURCES, INPUT_DEX_STRINGS))
+        self.assertEqual(required_inputs(self.registry.select(["manifest"])), (INPUT_MANIFEST,))
+        self.assertEqual(self.registry.using_only(INPUT_MANIFEST), ("manifest",))
+
+
+if __name__ == '__main__':
+    unittest.main()
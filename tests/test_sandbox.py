@@ -0,0 +1,162 @@
+"""
+Pruebas unitarias para el módulo sandbox (subprocesos con límites)
+"""
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from lxml import etree
+
+from analisis.analisis_estatico import AnalysisContext, _run_checks, check_secrets
+from analisis.jobs import crash_result
+from analisis.manifest import ManifestView
+from analisis.sandbox import SandboxPool, WorkerCrashed, crash_reason, resource
+
+MIB = 1024 * 1024
+
+
+def _pid():
+    return os.getpid()
+
+
+def _fail():
+    raise ValueError("fallo controlado")
+
+
+def _segfault(*args):
+    os.kill(os.getpid(), signal.SIGSEGV)
+
+
+def _spin():
+    while True:
+        pass
+
+
+def _allocate():
+    return len(bytearray(1024 * 1024 * 1024))
+
+
+def _check_secrets(apk_path):
+    view = ManifestView(etree.fromstring(b'<manifest package="com.demo"/>'))
+    context = AnalysisContext(apk_path, apk=view)
+    try:
+        return _run_checks(context, "serial", detectors=[("secrets", check_secrets)])
+    finally:
+        context.close()
+
+
+def _address_space():
+    """Tamano virtual del proceso en bytes (lo que limita RLIMIT_AS)"""
+    with open("/proc/self/status") as fp:
+        for line in fp:
+            if line.startswith("VmSize:"):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+class TestSandboxPool(unittest.TestCase):
+    """Pruebas para SandboxPool"""
+
+    def _pool(self, **kwargs):
+        pool = SandboxPool(1, **kwargs)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def test_runs_in_subprocess_and_recycles(self):
+        """Prueba que cada worker atiende max_jobs trabajos y se reemplaza"""
+        pool = self._pool(max_jobs=2)
+        pids = [pool.submit(_pid).result(timeout=30) for _ in range(3)]
+
+        self.assertNotIn(os.getpid(), pids)
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def test_exception_is_propagated(self):
+        """Prueba que una excepción del trabajo llega al futuro sin matar el worker"""
+        pool = self._pool()
+        with self.assertRaises(ValueError):
+            pool.submit(_fail).result(timeout=30)
+        self.assertEqual(pool.submit(pow, 2, 3).result(timeout=30), 8)
+
+    def test_crash_is_reported_and_worker_replaced(self):
+        """Prueba que un worker que muere da WorkerCrashed y el pool sigue sirviendo"""
+        pool = self._pool()
+        with self.assertRaises(WorkerCrashed) as raised:
+            pool.submit(_segfault).result(timeout=30)
+        self.assertIn("SIGSEGV", str(raised.exception))
+        self.assertEqual(pool.submit(pow, 2, 3).result(timeout=30), 8)
+
+    def test_cpu_limit(self):
+        """Prueba que un trabajo que no termina se mata al agotar su CPU"""
+        pool = self._pool(cpu_limit=1)
+        with self.assertRaises(WorkerCrashed) as raised:
+            pool.submit(_spin).result(timeout=30)
+        self.assertIn("CPU", str(raised.exception))
+
+    def test_memory_limit(self):
+        """Prueba que superar el límite de memoria se notifica como caída"""
+        pool = self._pool(memory_limit=1024 * 1024 * 1024)
+        with self.assertRaises(WorkerCrashed) as raised:
+            pool.submit(_allocate).result(timeout=30)
+        self.assertIn("memoria", str(raised.exception))
+
+    @unittest.skipIf(resource is None or not os.path.exists("/proc/self/status"),
+                     "requiere rlimits y /proc")
+    def test_memory_limit_in_detector(self):
+        """Prueba que un MemoryError dentro de un detector real no se trata como 'sin hallazgos'"""
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        apk_path = os.path.join(folder, "app.apk")
+        with zipfile.ZipFile(apk_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            with zf.open("res/values/big.xml", "w", force_zip64=True) as fp:
+                block = b" " * (64 * MIB)
+                for _ in range(8):
+                    fp.write(block)
+
+        # Los workers (fork) heredan los limites ampliados para que el
+        # detector lea la entrada de 512 MiB; solo hay 256 MiB de margen
+        fork = multiprocessing.get_context("fork")
+        with patch('analisis.analisis_estatico.SECRET_MAX_ENTRY_SIZE', 1024 * MIB), \
+                patch('analisis.analisis_estatico.SECRET_MAX_COMPRESSION_RATIO', 10 ** 6):
+            size = self._pool(mp_context=fork).submit(_address_space).result(timeout=30)
+            pool = self._pool(memory_limit=size + 256 * MIB, mp_context=fork)
+            with self.assertRaises(WorkerCrashed) as raised:
+                pool.submit(_check_secrets, apk_path).result(timeout=60)
+        self.assertIn("memoria", str(raised.exception))
+
+    def test_crash_handler_builds_error_finding(self):
+        """Prueba que con crash_result la caída se convierte en hallazgo INFO"""
+        pool = self._pool(crash_handler=crash_result)
+        result = pool.submit(_segfault, "app.apk", "app.apk").result(timeout=30)
+
+        self.assertEqual(result["filename"], "app.apk")
+        self.assertEqual(result["metadata"]["app_name"], "Error")
+        self.assertEqual(result["vulnerabilities"][0]["title"], "Error al analizar APK")
+        self.assertEqual(result["vulnerabilities"][0]["severity"], "INFO")
+        self.assertEqual(result["counts"], {"INFO": 1})
+
+    def test_submit_after_shutdown(self):
+        """Prueba que no se aceptan trabajos tras cerrar el pool"""
+        pool = SandboxPool(1)
+        pool.shutdown()
+        with self.assertRaises(RuntimeError):
+            pool.submit(_pid)
+
+
+class TestCrashReason(unittest.TestCase):
+    """Pruebas para crash_reason"""
+
+    def test_reasons(self):
+        """Prueba la descripción de señales y códigos de salida"""
+        self.assertIn("CPU (10 s)", crash_reason(-signal.SIGXCPU, 10))
+        self.assertIn("SIGKILL", crash_reason(-signal.SIGKILL))
+        self.assertIn("codigo 3", crash_reason(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
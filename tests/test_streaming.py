@@ -0,0 +1,72 @@
+"""
+Pruebas unitarias para el escaneo en streaming
+Prueba la deteccion de URLs que cruzan el limite entre bloques
+"""
+
+import io
+import unittest
+import zipfile
+from analisis.streaming import iter_entry_chunks, scan_http_urls
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestScanHttpUrls(unittest.TestCase):
+    """Pruebas para scan_http_urls"""
+
+    DATA = (
+        b"\x00\x01http://api.example.com/v1\x00junk"
+        b"https://secure.example.com\x00http://b.example.org/path?q=1\"tail"
+        b"\x00http://api.example.com/v1\x00"
+    )
+
+    def test_single_chunk(self):
+        """Prueba la deteccion en un unico bloque"""
+        found = scan_http_urls([self.DATA])
+        self.assertEqual(found, {b"http://api.example.com/v1", b"http://b.example.org/path?q=1"})
+
+    def test_every_chunk_size_gives_same_result(self):
+        """Prueba que el resultado no depende de donde se corten los bloques"""
+        expected = scan_http_urls([self.DATA])
+        for size in range(1, len(self.DATA) + 1):
+            self.assertEqual(scan_http_urls(_chunks(self.DATA, size)), expected, size)
+
+    def test_url_at_end_of_stream(self):
+        """Prueba una URL que termina justo al final del flujo"""
+        found = scan_http_urls(_chunks(b"xxhttp://end.example.com", 5))
+        self.assertEqual(found, {b"http://end.example.com"})
+
+    def test_long_url_is_truncated(self):
+        """Prueba que las URLs mas largas que max_length se truncan sin crecer en memoria"""
+        data = b"http://" + b"a" * 500 + b"\x00http://short.example\x00"
+        found = scan_http_urls(_chunks(data, 16), max_length=64)
+        self.assertEqual(found, {(b"http://" + b"a" * 500)[:64], b"http://short.example"})
+
+    def test_accumulates_into_existing_set(self):
+        """Prueba que se deduplica sobre un conjunto existente"""
+        found = {b"http://a.example"}
+        scan_http_urls([b"http://a.example\x00http://b.example\x00"], found)
+        self.assertEqual(found, {b"http://a.example", b"http://b.example"})
+
+
+class TestIterEntryChunks(unittest.TestCase):
+    """Pruebas para iter_entry_chunks"""
+
+    def test_chunks_rebuild_entry(self):
+        """Prueba que los bloques reconstruyen la entrada descomprimida"""
+        payload = b"0123456789" * 1000
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("classes.dex", payload)
+
+        with zipfile.ZipFile(buffer) as zf:
+            chunks = list(iter_entry_chunks(zf, "classes.dex", chunk_size=4096))
+
+        self.assertTrue(all(len(c) <= 4096 for c in chunks))
+        self.assertEqual(b"".join(chunks), payload)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Pruebas unitarias para la recepcion de APKs en streaming
+Prueba el hash sobre la marcha, los limites y el guardado por contenido
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from analisis.uploads import HashingUpload
+
+
+class TestHashingUpload(unittest.TestCase):
+    """Pruebas para HashingUpload"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_hash_and_content_addressed_path(self):
+        """Prueba que el hash se calcula por bloques y nombra el fichero final"""
+        upload = HashingUpload(self.folder, 1024)
+        for chunk in (b"P", b"K\x03", b"\x04resto", b"del apk"):
+            upload.write(chunk)
+        path = upload.finalize()
+
+        expected = hashlib.sha256(b"PK\x03\x04restodel apk").hexdigest()
+        self.assertEqual(upload.sha256, expected)
+        self.assertEqual(path, os.path.join(self.folder, expected + ".apk"))
+        self.assertEqual(os.listdir(self.folder), [expected + ".apk"])
+
+    def test_duplicate_content_reuses_file(self):
+        """Prueba que subir el mismo contenido dos veces deja un solo fichero"""
+        paths = []
+        for _ in range(2):
+            upload = HashingUpload(self.folder, 1024)
+            upload.write(b"PK\x03\x04igual")
+            paths.append(upload.finalize())
+            upload.close()
+
+        self.assertEqual(paths[0], paths[1])
+        self.assertEqual(len(os.listdir(self.folder)), 1)
+
+    def test_bad_magic_aborts_on_first_bytes(self):
+        """Prueba que una cabecera incorrecta se rechaza en el primer bloque"""
+        upload = HashingUpload(self.folder, 1024)
+        with self.assertRaises(BadRequest):
+            upload.write(b"MZ\x90\x00")
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_size_limit(self):
+        """Prueba que superar max_size aborta la subida"""
+        upload = HashingUpload(self.folder, 8)
+        upload.write(b"PK\x03\x04")
+        with self.assertRaises(RequestEntityTooLarge):
+            upload.write(b"12345")
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_too_short_is_rejected(self):
+        """Prueba que un fichero con menos bytes que la cabecera no se acepta"""
+        upload = HashingUpload(self.folder, 1024)
+        upload.write(b"PK")
+        with self.assertRaises(BadRequest):
+            upload.finalize()
+        self.assertEqual(os.listdir(self.folder), [])
+
+
+if __name__ == '__main__':
+    unittest.main()